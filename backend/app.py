@@ -1,33 +1,32 @@
-from flask import Flask, jsonify
+from flask import Flask, Blueprint, Request, jsonify
 from flask_cors import CORS
-from flask_pymongo import PyMongo
+from pymongo.errors import ConnectionFailure
 from config import Config
+from extensions import mongo
+from services.db_indexes import ensure_indexes, verify_query_plans
+from services.ml_service import ml_service
+from services.scan_jobs import scan_jobs
+from services.scan_templates import scan_templates
+from services.food_catalog import food_catalog
+from services.token_cache import token_cache
+from services.password_hasher import password_hasher
+from services.upload_writer import upload_writer
+import io
 import os
 
-# Initialize Flask app
-app = Flask(__name__)
-app.config.from_object(Config)
-
-# Enable CORS
-CORS(app, resources={r"/api/*": {"origins": "*"}})
-
-app.config["MONGO_URI"] = app.config["MONGODB_URI"]
-
-# Initialize MongoDB
-mongo = PyMongo(app)
-
-# Create upload folder if it doesn't exist
-os.makedirs(Config.UPLOAD_FOLDER, exist_ok=True)
-
-# Import routes
-from routes import auth, food, user
+class InMemoryUploadRequest(Request):
+    """
+    Keeps multipart uploads in memory instead of spooling large ones to temp files.
+    Uploads are bounded by MAX_CONTENT_LENGTH and decoded straight from this buffer.
+    """
+    
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return io.BytesIO()
 
-# Register blueprints
-app.register_blueprint(auth.bp, url_prefix='/api/auth')
-app.register_blueprint(food.bp, url_prefix='/api/food')
-app.register_blueprint(user.bp, url_prefix='/api/user')
+# Health, readiness and metrics endpoints
+core_bp = Blueprint('core', __name__)
 
-@app.route('/')
+@core_bp.route('/')
 def index():
     """Health check endpoint"""
     return jsonify({
@@ -36,7 +35,7 @@ def index():
         'version': '1.0.0'
     })
 
-@app.route('/api/health')
+@core_bp.route('/api/health')
 def health():
     """API health check"""
     try:
@@ -52,15 +51,78 @@ def health():
         'environment': Config.FLASK_ENV
     })
 
-@app.errorhandler(404)
+@core_bp.route('/api/ready')
+def ready():
+    """Readiness check: is the food recognition model loaded and warmed up"""
+    readiness = ml_service.get_readiness()
+    return jsonify(readiness), 200 if readiness['ready'] else 503
+
+@core_bp.route('/api/metrics')
+def metrics():
+    """Runtime performance counters"""
+    return jsonify({
+        'inference': ml_service.get_stats(),
+        'scan_jobs': scan_jobs.get_stats(),
+        'scan_templates': scan_templates.get_stats(),
+        'food_catalog': food_catalog.get_stats(),
+        'auth': token_cache.get_stats(),
+        'password_hasher': password_hasher.get_stats(),
+        'upload_writer': upload_writer.get_stats()
+    })
+
+@core_bp.app_errorhandler(404)
 def not_found(error):
     return jsonify({'error': 'Not found'}), 404
 
-@app.errorhandler(500)
+@core_bp.app_errorhandler(500)
 def internal_error(error):
     return jsonify({'error': 'Internal server error'}), 500
 
+def create_app():
+    """Build the Flask app (called once per process; serve.py calls it in each worker)"""
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    app.request_class = InMemoryUploadRequest
+    
+    # Enable CORS
+    CORS(app, resources={r"/api/*": {"origins": "*"}})
+    
+    app.config["MONGO_URI"] = app.config["MONGODB_URI"]
+    
+    # Initialize MongoDB
+    mongo.init_app(app)
+    
+    # Declare indexes and make sure hot queries use them; a COLLSCAN stops startup
+    if Config.MONGO_ENSURE_INDEXES:
+        try:
+            ensure_indexes(mongo.db)
+            verify_query_plans(mongo.db)
+            print("✅ MongoDB indexes in place")
+        except ConnectionFailure as e:
+            print(f"⚠️ MongoDB unreachable, skipped index check: {e}")
+    
+    # Create upload folder if it doesn't exist
+    os.makedirs(Config.UPLOAD_FOLDER, exist_ok=True)
+    
+    # Import routes
+    from routes import auth, food, user
+    
+    # Register blueprints
+    app.register_blueprint(auth.bp, url_prefix='/api/auth')
+    app.register_blueprint(food.bp, url_prefix='/api/food')
+    app.register_blueprint(user.bp, url_prefix='/api/user')
+    app.register_blueprint(core_bp)
+    
+    # Load and warm up the model in the background; other routes serve immediately.
+    # Under serve.py each worker has already started it in post_fork.
+    if ml_service.state == 'not_started':
+        ml_service.start()
+        scan_templates.prebuild_when_ready(ml_service)
+    
+    return app
+
 if __name__ == '__main__':
+    app = create_app()
     app.run(
         host='0.0.0.0',
         port=Config.PORT,
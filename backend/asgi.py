@@ -0,0 +1,121 @@
+"""
+ASGI entry point: serves auth, history, insights and stats from asyncio views
+on the Motor driver, so a slow client or Mongo round trip costs a coroutine
+rather than a thread. Every other route (scans, images, scan job streams)
+is the Flask app from app.py on a thread pool, with inference on its own
+threads as before.
+
+Requires the packages in requirements-async.txt. Run with:
+    hypercorn asgi:app --bind 0.0.0.0:5000
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from quart import Quart, request
+from motor.motor_asyncio import AsyncIOMotorClient
+from asgiref.sync import sync_to_async
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+from werkzeug.exceptions import HTTPException
+from config import Config
+from app import create_app
+from routes import async_views
+
+class AsyncMongo:
+    """Motor client, opened on the serving event loop and closed with it"""
+
+    def __init__(self):
+        self.client = None
+        self.db = None
+
+    def open(self):
+        self.client = AsyncIOMotorClient(Config.MONGODB_URI, maxPoolSize=Config.ASYNC_MONGO_MAX_POOL_SIZE)
+        self.db = self.client.get_default_database()
+
+    def close(self):
+        if self.client is not None:
+            self.client.close()
+        self.client = self.db = None
+
+class ThreadedWsgiToAsgiInstance(WsgiToAsgiInstance):
+    """WsgiToAsgiInstance that runs the WSGI call on the given executor"""
+
+    def __init__(self, wsgi_application, executor):
+        super().__init__(wsgi_application)
+        self.executor = executor
+
+    async def run_wsgi_app(self, body):
+        await sync_to_async(self._run_wsgi_app, thread_sensitive=False, executor=self.executor)(body)
+
+    def _run_wsgi_app(self, body):
+        """Run the WSGI app and send its response (start_response is called on this same thread)"""
+        environ = self.build_environ(self.scope, body)
+        bytes_sent = 0
+        for output in self.wsgi_application(environ, self.start_response):
+            if not self.response_started:
+                self.response_started = True
+                self.sync_send(self.response_start)
+            # Never send more than the Content-Length the app declared
+            if self.response_content_length is not None:
+                output = output[:self.response_content_length - bytes_sent]
+            self.sync_send({'type': 'http.response.body', 'body': output, 'more_body': True})
+            bytes_sent += len(output)
+            if bytes_sent == self.response_content_length:
+                break
+        if not self.response_started:
+            self.response_started = True
+            self.sync_send(self.response_start)
+        self.sync_send({'type': 'http.response.body'})
+
+class ThreadedWsgiToAsgi(WsgiToAsgi):
+    """
+    WsgiToAsgi that runs requests on a pool of threads. asgiref's default
+    runs every WSGI call on one shared thread, which would serialize all
+    Flask routes (and let one scan job stream block the rest).
+    """
+
+    def __init__(self, wsgi_application, threads):
+        super().__init__(wsgi_application)
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='wsgi')
+
+    async def __call__(self, scope, receive, send):
+        await ThreadedWsgiToAsgiInstance(self.wsgi_application, self.executor)(scope, receive, send)
+
+mongo = AsyncMongo()
+
+quart_app = Quart(__name__, static_folder=None)
+quart_app.config.from_object(Config)
+quart_app.register_blueprint(async_views.bp)
+
+@quart_app.before_serving
+async def open_mongo():
+    mongo.open()
+    print("✅ Async MongoDB client ready")
+
+@quart_app.after_serving
+async def close_mongo():
+    mongo.close()
+
+@quart_app.after_request
+async def add_cors_headers(response):
+    """Same CORS answer flask_cors gives the Flask routes"""
+    if request.headers.get('Origin'):
+        response.headers['Access-Control-Allow-Origin'] = '*'
+    return response
+
+wsgi_app = ThreadedWsgiToAsgi(create_app(), threads=Config.ASGI_WSGI_THREADS)
+
+def is_async_route(scope):
+    """True if an HTTP request matches one of the async views (preflight stays with flask_cors)"""
+    if scope['method'] == 'OPTIONS':
+        return False
+    try:
+        quart_app.url_map.bind('').match(scope['path'], scope['method'])
+    except HTTPException:
+        return False
+    return True
+
+async def app(scope, receive, send):
+    """ASGI application: lifespan and async routes go to Quart, everything else to Flask"""
+    if scope['type'] == 'lifespan' or (scope['type'] == 'http' and is_async_route(scope)):
+        await quart_app(scope, receive, send)
+    else:
+        await wsgi_app(scope, receive, send)
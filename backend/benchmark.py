@@ -0,0 +1,135 @@
+"""
+Micro-benchmarks for the NutriScan backend hot paths
+
+Usage:
+    python benchmark.py preprocess [image ...] [--iterations N]
+    python benchmark.py score [--rows N]
+"""
+
+import argparse
+import glob
+import os
+import threading
+import time
+import tracemalloc
+
+import numpy as np
+
+from config import Config
+
+
+def _time_calls(fn, args, iterations):
+    """Return (mean ms per call, peak traced bytes) for fn over all args"""
+    fn(args[0])  # warm up caches / lazy imports
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    for _ in range(iterations):
+        for arg in args:
+            fn(arg)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return elapsed * 1000 / (iterations * len(args)), peak
+
+
+def bench_preprocess(images, iterations):
+    """Compare the legacy and fast image preprocessing paths"""
+    from services.ml_service import MLService
+
+    # Only the preprocessing methods are needed, skip model loading
+    service = MLService.__new__(MLService)
+    service._buffers = threading.local()
+
+    print(f"🖼️  Preprocessing {len(images)} image(s) x {iterations} iteration(s)")
+
+    legacy_ms, legacy_peak = _time_calls(service._preprocess_image_legacy, images, iterations)
+    fast_ms, fast_peak = _time_calls(service._preprocess_image_fast, images, iterations)
+
+    # Sanity check: both paths must produce the same tensor shape and range
+    legacy = service._preprocess_image_legacy(images[0])
+    fast = service._preprocess_image_fast(images[0])
+    max_diff = float(np.abs(legacy.astype(np.float32) - fast).max())
+
+    print(f"   legacy: {legacy_ms:8.2f} ms/image   peak {legacy_peak / 1024 / 1024:7.2f} MB   dtype {legacy.dtype}")
+    print(f"   fast:   {fast_ms:8.2f} ms/image   peak {fast_peak / 1024 / 1024:7.2f} MB   dtype {fast.dtype}")
+    print(f"   speedup: {legacy_ms / fast_ms:.2f}x   max pixel difference: {max_diff:.4f}")
+
+
+def _random_nutrition(rows, seed=0):
+    """Nutrition dicts spread across every scoring band, including exact thresholds"""
+    from services.nutrition_catalog import NUTRIENT_COLUMNS
+
+    rng = np.random.default_rng(seed)
+    upper = {'calories': 1200, 'protein': 40, 'carbs': 100, 'fat': 60, 'sugar': 60, 'fiber': 12, 'sodium': 3000}
+    thresholds = [Config.HEALTHY_THRESHOLDS, Config.MODERATE_THRESHOLDS]
+
+    foods = []
+    for _ in range(rows):
+        food = {}
+        for name in NUTRIENT_COLUMNS:
+            if name in Config.MODERATE_THRESHOLDS and rng.random() < 0.1:
+                food[name] = thresholds[rng.integers(2)][name]
+            else:
+                food[name] = round(float(rng.uniform(0, upper[name])), int(rng.integers(0, 3)))
+        foods.append(food)
+    return foods
+
+
+def bench_score(rows):
+    """Compare HealthScorer.calculate_score row by row with score_batch"""
+    from services.health_scorer import health_scorer
+
+    foods = _random_nutrition(rows)
+    matrix = health_scorer.nutrition_matrix(foods)
+    print(f"🧮 Scoring {rows} foods")
+
+    started = time.perf_counter()
+    scalar = [health_scorer.calculate_score(food) for food in foods]
+    scalar_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    batch = health_scorer.score_batch(matrix)
+    batch_s = time.perf_counter() - started
+
+    mismatches = sum(
+        1 for i, result in enumerate(scalar)
+        if result['score'] != batch['score'][i]
+        or result['status'] != batch['status'][i]
+        or any(value != batch['detailed_scores'][name][i] for name, value in result['detailed_scores'].items())
+    )
+
+    print(f"   scalar: {rows / scalar_s:12,.0f} foods/s   ({scalar_s * 1000:.1f} ms)")
+    print(f"   batch:  {rows / batch_s:12,.0f} foods/s   ({batch_s * 1000:.1f} ms)")
+    print(f"   speedup: {scalar_s / batch_s:.1f}x   mismatches: {mismatches}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='NutriScan micro-benchmarks')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    preprocess = subparsers.add_parser('preprocess', help='legacy vs fast image preprocessing')
+    preprocess.add_argument('images', nargs='*', help=f'image files (default: {Config.UPLOAD_FOLDER}/*)')
+    preprocess.add_argument('--iterations', type=int, default=10)
+
+    score = subparsers.add_parser('score', help='scalar vs vectorized health scoring')
+    score.add_argument('--rows', type=int, default=100000)
+
+    args = parser.parse_args()
+
+    if args.command == 'preprocess':
+        images = args.images or sorted(
+            path for path in glob.glob(os.path.join(Config.UPLOAD_FOLDER, '*'))
+            if path.rsplit('.', 1)[-1].lower() in Config.ALLOWED_EXTENSIONS
+        )
+        if not images:
+            print("❌ No images to benchmark")
+            return
+        bench_preprocess(images, args.iterations)
+    elif args.command == 'score':
+        bench_score(args.rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -8,25 +8,114 @@ class Config:
     
     # MongoDB
     MONGODB_URI = os.getenv('MONGODB_URI', 'mongodb://localhost:27017/NutriScan')
+    MONGO_ENSURE_INDEXES = os.getenv('MONGO_ENSURE_INDEXES', 'true').lower() == 'true'  # create indexes and check query plans at startup
+    INSIGHTS_FROM_ROLLUPS = os.getenv('INSIGHTS_FROM_ROLLUPS', 'false').lower() == 'true'  # serve /insights from daily rollups; run manage.py reconcile-rollups once to backfill existing scans before enabling
     
     # JWT
     JWT_SECRET = os.getenv('JWT_SECRET', 'your-secret-key-change-in-production')
     JWT_ALGORITHM = 'HS256'
     JWT_EXPIRATION_HOURS = 24
+    TOKEN_CACHE_MAX_ENTRIES = int(os.getenv('TOKEN_CACHE_MAX_ENTRIES', 10000))  # verified tokens kept until they expire, 0 = off
+    
+    # Password hashing (bcrypt on its own bounded pool)
+    BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS', 12))  # work factor, see manage.py calibrate-bcrypt; logins rehash older costs
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 2))
+    PASSWORD_HASH_MAX_PENDING = int(os.getenv('PASSWORD_HASH_MAX_PENDING', 32))  # queued + running hashes before answering 503
+    PASSWORD_HASH_TIMEOUT = float(os.getenv('PASSWORD_HASH_TIMEOUT', 5))  # seconds a request waits for its hash
     
     # Flask
     FLASK_ENV = os.getenv('FLASK_ENV', 'development')
     PORT = int(os.getenv('PORT', 5000))
     DEBUG = FLASK_ENV == 'development'
     
+    # ASGI mode (hypercorn asgi:app): async routes on Motor, the rest on a WSGI thread pool
+    ASYNC_MONGO_MAX_POOL_SIZE = int(os.getenv('ASYNC_MONGO_MAX_POOL_SIZE', 100))  # connections shared by all in-flight async requests
+    ASGI_WSGI_THREADS = int(os.getenv('ASGI_WSGI_THREADS', 32))  # threads running the Flask routes (scans, images, SSE)
+    
+    # Production server (python serve.py: gunicorn, model loaded once before forking)
+    WEB_BIND = os.getenv('WEB_BIND', f'0.0.0.0:{PORT}')
+    WEB_WORKERS = int(os.getenv('WEB_WORKERS', 2))
+    WEB_THREADS = int(os.getenv('WEB_THREADS', 8))  # request threads per worker
+    WEB_TIMEOUT = int(os.getenv('WEB_TIMEOUT', 60))  # seconds a silent worker gets before it is restarted
+    WEB_GRACEFUL_TIMEOUT = int(os.getenv('WEB_GRACEFUL_TIMEOUT', 30))  # seconds to finish requests on restart/shutdown
+    WEB_KEEPALIVE = int(os.getenv('WEB_KEEPALIVE', 5))
+    PRELOAD_MODEL = os.getenv('PRELOAD_MODEL', 'true').lower() == 'true'  # read model files and labels in the master before forking; false: each worker reads its own
+    TF_INTRA_OP_THREADS = int(os.getenv('TF_INTRA_OP_THREADS', 0))  # per worker, 0 = CPU cores / WEB_WORKERS
+    TF_INTER_OP_THREADS = int(os.getenv('TF_INTER_OP_THREADS', 1))  # per worker
+    
     # Upload settings
-    UPLOAD_FOLDER = 'uploads'
+    UPLOAD_FOLDER = 'uploads'  # legacy flat uploads, still served
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
+    UPLOAD_WRITER_THREADS = int(os.getenv('UPLOAD_WRITER_THREADS', 2))
+    UPLOAD_WRITER_MAX_PENDING = int(os.getenv('UPLOAD_WRITER_MAX_PENDING', 64))  # background writes in flight
+    UPLOAD_MIN_FREE_BYTES = int(os.getenv('UPLOAD_MIN_FREE_BYTES', 100 * 1024 * 1024))  # refuse uploads below this
+    
+    # Image blob store (content-addressed, deduplicated, reference-counted)
+    BLOB_STORE = os.getenv('BLOB_STORE', 'local')  # 'local' or 's3'
+    BLOB_STORE_ROOT = os.getenv('BLOB_STORE_ROOT', os.path.join(UPLOAD_FOLDER, 'blobs'))
+    S3_BUCKET = os.getenv('S3_BUCKET')
+    S3_PREFIX = os.getenv('S3_PREFIX', 'uploads')
+    S3_ENDPOINT_URL = os.getenv('S3_ENDPOINT_URL') or None  # for MinIO and other S3-compatible stores
+    BLOB_GC_GRACE_SECONDS = int(os.getenv('BLOB_GC_GRACE_SECONDS', 3600))  # keep unreferenced blobs this long
+    
+    # Image serving
+    IMAGE_DERIVATIVE_SIZES = {'thumb': 160, 'medium': 640}  # longest side in pixels, generated on first request
+    IMAGE_CACHE_MAX_AGE = 365 * 24 * 3600  # blob keys are content hashes, so responses never change
+    USE_X_SENDFILE = os.getenv('USE_X_SENDFILE', 'false').lower() == 'true'  # Apache/lighttpd X-Sendfile
+    UPLOAD_ACCEL_REDIRECT_PREFIX = os.getenv('UPLOAD_ACCEL_REDIRECT_PREFIX')  # nginx internal location mapped to BLOB_STORE_ROOT
     
     # ML Model
     MODEL_PATH = 'ml_models/food_classifier.h5'
     MODEL_LABELS_PATH = 'ml_models/food_labels.txt'
+    NUTRITION_CATALOG_PATH = os.getenv('NUTRITION_CATALOG_PATH', 'ml_models/nutrition_catalog.bin')  # built by manage.py build-catalog
+    INFERENCE_BACKEND = os.getenv('INFERENCE_BACKEND', 'keras')  # 'keras', 'tflite' or 'tflite-int8'
+    TFLITE_MODEL_PATH = os.getenv('TFLITE_MODEL_PATH', 'ml_models/food_classifier.tflite')  # float32 or float16 export
+    TFLITE_INT8_MODEL_PATH = os.getenv('TFLITE_INT8_MODEL_PATH', 'ml_models/food_classifier_int8.tflite')
+    TFLITE_NUM_THREADS = int(os.getenv('TFLITE_NUM_THREADS', 0)) or None  # None: serve.py's per-worker share, or TFLite decides
+    
+    # Inference pool: 'local' loads the model in every web process, 'pool' sends
+    # inputs to the worker processes started by inference_server.py
+    INFERENCE_MODE = os.getenv('INFERENCE_MODE', 'local')
+    INFERENCE_POOL_ADDRESS = os.getenv('INFERENCE_POOL_ADDRESS', '/tmp/nutriscan-inference.sock')  # socket path or host:port
+    INFERENCE_POOL_WORKERS = int(os.getenv('INFERENCE_POOL_WORKERS', 2))
+    INFERENCE_POOL_AUTHKEY = os.getenv('INFERENCE_POOL_AUTHKEY')  # required in pool mode: a long random secret shared by web and pool
+    INFERENCE_POOL_CONNECT_TIMEOUT = float(os.getenv('INFERENCE_POOL_CONNECT_TIMEOUT', 300))  # seconds to keep retrying an unreachable pool before failing
+    
+    MODEL_WARMUP_ENABLED = os.getenv('MODEL_WARMUP_ENABLED', 'true').lower() == 'true'
+    MODEL_READY_TIMEOUT = float(os.getenv('MODEL_READY_TIMEOUT', 10))  # seconds a scan waits for the model, 0 = fail fast
+    
+    # Image preprocessing
+    PREPROCESS_MODE = os.getenv('PREPROCESS_MODE', 'fast')  # 'fast' or 'legacy'
+    MAX_IMAGE_PIXELS = int(os.getenv('MAX_IMAGE_PIXELS', 50_000_000))  # reject larger images from headers
+    
+    # Multi-image scans (POST /api/food/scan/batch, all images in one forward pass)
+    SCAN_BATCH_MAX_IMAGES = int(os.getenv('SCAN_BATCH_MAX_IMAGES', 10))
+    SCAN_BATCH_DECODE_THREADS = int(os.getenv('SCAN_BATCH_DECODE_THREADS', 4))
+    
+    # Inference batching (concurrent scans share one forward pass)
+    INFERENCE_BATCHING_ENABLED = os.getenv('INFERENCE_BATCHING_ENABLED', 'true').lower() == 'true'
+    INFERENCE_BATCH_MAX_SIZE = int(os.getenv('INFERENCE_BATCH_MAX_SIZE', 16))
+    INFERENCE_BATCH_MAX_WAIT_MS = float(os.getenv('INFERENCE_BATCH_MAX_WAIT_MS', 10))
+    INFERENCE_QUEUE_MAX_SIZE = int(os.getenv('INFERENCE_QUEUE_MAX_SIZE', 256))
+    INFERENCE_RESULT_TIMEOUT = float(os.getenv('INFERENCE_RESULT_TIMEOUT', 30))  # seconds
+    
+    # Asynchronous scan jobs (POST /api/food/scan?async=1)
+    SCAN_JOB_WORKERS = int(os.getenv('SCAN_JOB_WORKERS', 4))
+    SCAN_JOB_MAX_PENDING = int(os.getenv('SCAN_JOB_MAX_PENDING', 64))  # queued + running
+    SCAN_JOB_TTL_SECONDS = int(os.getenv('SCAN_JOB_TTL_SECONDS', 600))  # how long a job stays available after its last change
+    SCAN_JOB_KEEPALIVE_SECONDS = 15  # SSE comment interval while a job is running
+    SCAN_JOB_POLL_SECONDS = float(os.getenv('SCAN_JOB_POLL_SECONDS', 0.5))  # how often event streams check jobs run by another worker
+    
+    # Prediction cache (keyed by image content hash + model version)
+    PREDICTION_CACHE_ENABLED = os.getenv('PREDICTION_CACHE_ENABLED', 'true').lower() == 'true'
+    PREDICTION_CACHE_MAX_BYTES = int(os.getenv('PREDICTION_CACHE_MAX_BYTES', 16 * 1024 * 1024))
+    PREDICTION_CACHE_DIR = os.getenv('PREDICTION_CACHE_DIR') or None  # optional on-disk tier
+    
+    # Per-food scan result templates (nutrition, score, alternatives)
+    SCAN_TEMPLATE_MAX_ENTRIES = int(os.getenv('SCAN_TEMPLATE_MAX_ENTRIES', 10000))  # non-label foods kept (LRU)
+    SCAN_TEMPLATE_CHECK_SECONDS = float(os.getenv('SCAN_TEMPLATE_CHECK_SECONDS', 5))  # how often to look for threshold/catalog changes
+    FOOD_CATALOG_CACHE_ENTRIES = int(os.getenv('FOOD_CATALOG_CACHE_ENTRIES', 20000))  # food_catalog versions kept in memory for hydrating scans
     
     # Health scoring thresholds
     HEALTHY_THRESHOLDS = {
@@ -0,0 +1,146 @@
+"""
+TFLite Export Script - Converts the trained Keras model for fast CPU inference
+Produces float32, float16 and int8 (post-training quantized) models
+
+Usage:
+    python export_tflite.py [--calibration-samples N] [--evaluate]
+
+Then select the backend in .env:
+    INFERENCE_BACKEND=tflite        # uses TFLITE_MODEL_PATH (float32 or float16 export)
+    INFERENCE_BACKEND=tflite-int8   # uses TFLITE_INT8_MODEL_PATH
+"""
+
+import argparse
+import os
+import time
+from itertools import zip_longest
+import numpy as np
+import tensorflow as tf
+from PIL import Image
+
+from config import Config
+
+IMG_SIZE = 224
+DATA_DIR = 'food_data'  # Same dataset directory as quick_train.py
+FLOAT16_MODEL_PATH = 'ml_models/food_classifier_fp16.tflite'
+
+def load_image(path):
+    """Preprocess exactly like MLService: RGB, 224x224, scaled to [0, 1]"""
+    img = Image.open(path).convert('RGB').resize((IMG_SIZE, IMG_SIZE))
+    return np.asarray(img, dtype=np.float32) / 255.0
+
+def list_validation_images(limit=None):
+    """Return (path, class_index) pairs from food_data/validation in label order"""
+    val_dir = f'{DATA_DIR}/validation'
+    if not os.path.exists(val_dir):
+        return []
+
+    classes = sorted(d for d in os.listdir(val_dir) if os.path.isdir(os.path.join(val_dir, d)))
+    per_class = []
+    for class_index, class_name in enumerate(classes):
+        class_dir = os.path.join(val_dir, class_name)
+        per_class.append([
+            (os.path.join(class_dir, filename), class_index)
+            for filename in sorted(os.listdir(class_dir))
+            if filename.rsplit('.', 1)[-1].lower() in Config.ALLOWED_EXTENSIONS
+        ])
+
+    # Interleave classes so a small calibration sample still covers all of them
+    samples = [sample for group in zip_longest(*per_class) for sample in group if sample]
+    return samples[:limit] if limit else samples
+
+def representative_dataset(samples):
+    """Calibration data for int8 quantization"""
+    def generator():
+        for path, _ in samples:
+            yield [np.expand_dims(load_image(path), axis=0)]
+    return generator
+
+def convert(model, mode, calibration_samples=None):
+    """Convert the Keras model to TFLite (mode: float32, float16 or int8)"""
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+
+    if mode == 'float16':
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.target_spec.supported_types = [tf.float16]
+    elif mode == 'int8':
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = representative_dataset(calibration_samples)
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        converter.inference_input_type = tf.int8
+        converter.inference_output_type = tf.int8
+
+    return converter.convert()
+
+def evaluate(model_path, samples):
+    """Top-1 accuracy and mean latency of an exported model on the validation set"""
+    from services.inference_backends import TFLiteBackend
+
+    backend = TFLiteBackend(model_path, num_threads=Config.TFLITE_NUM_THREADS)
+    backend.load()
+
+    correct = 0
+    started = time.perf_counter()
+    for path, class_index in samples:
+        probabilities = backend.predict_batch(np.expand_dims(load_image(path), axis=0))[0]
+        correct += int(np.argmax(probabilities) == class_index)
+    elapsed = time.perf_counter() - started
+
+    return correct / len(samples), elapsed * 1000 / len(samples)
+
+def export(calibration_count, run_evaluation):
+    print("=" * 60)
+    print("📦 TFLite Export")
+    print("=" * 60)
+
+    if not os.path.exists(Config.MODEL_PATH):
+        print(f"\n❌ Model not found at '{Config.MODEL_PATH}'")
+        print("💡 Train one first with 'python quick_train.py'")
+        return
+
+    model = tf.keras.models.load_model(Config.MODEL_PATH)
+    print(f"\n✅ Loaded {Config.MODEL_PATH}")
+
+    outputs = {
+        'float32': Config.TFLITE_MODEL_PATH,
+        'float16': FLOAT16_MODEL_PATH,
+        'int8': Config.TFLITE_INT8_MODEL_PATH
+    }
+
+    calibration = list_validation_images(calibration_count)
+    if not calibration:
+        print(f"\n⚠️ No images in '{DATA_DIR}/validation', skipping int8 export (it needs calibration data)")
+        del outputs['int8']
+    else:
+        print(f"📁 Using {len(calibration)} validation images for int8 calibration")
+
+    for mode, path in outputs.items():
+        print(f"\n🔧 Converting ({mode})...")
+        tflite_model = convert(model, mode, calibration)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(tflite_model)
+        print(f"✅ Saved {path} ({len(tflite_model) / 1024 / 1024:.1f} MB)")
+
+    if run_evaluation:
+        samples = list_validation_images()
+        if not samples:
+            print("\n⚠️ No validation images, skipping evaluation")
+            return
+
+        print(f"\n📊 Evaluating on {len(samples)} validation images")
+        for mode, path in outputs.items():
+            accuracy, latency = evaluate(path, samples)
+            print(f"   {mode:8s} accuracy {accuracy * 100:6.2f}%   {latency:7.2f} ms/image")
+
+    print("\n💡 Set INFERENCE_BACKEND=tflite or INFERENCE_BACKEND=tflite-int8 and restart the backend")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Export the food classifier to TFLite')
+    parser.add_argument('--calibration-samples', type=int, default=200,
+                        help='validation images used to calibrate int8 quantization')
+    parser.add_argument('--evaluate', action='store_true',
+                        help='report accuracy and latency of each export on food_data/validation')
+    args = parser.parse_args()
+
+    export(args.calibration_samples, args.evaluate)
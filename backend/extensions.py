@@ -0,0 +1,4 @@
+from flask_pymongo import PyMongo
+
+# Bound to the app in create_app(), so each worker process opens its own client
+mongo = PyMongo()
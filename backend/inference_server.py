@@ -0,0 +1,30 @@
+"""
+Inference Server - Runs the model-holding worker pool used when INFERENCE_MODE=pool
+
+Each worker loads the model once (INFERENCE_BACKEND) and serves every web
+process, so model memory stays fixed no matter how many web workers run.
+
+INFERENCE_POOL_AUTHKEY must be set to the same random secret here and in
+the web processes; the Unix socket is created readable by its owner only.
+
+Usage:
+    python inference_server.py [--workers N] [--address PATH_OR_HOST:PORT]
+"""
+
+import argparse
+from config import Config
+from services.inference_pool import serve, PoolAuthKeyError
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='NutriScan inference worker pool')
+    parser.add_argument('--workers', type=int, default=Config.INFERENCE_POOL_WORKERS,
+                        help='number of model-holding worker processes')
+    parser.add_argument('--address', default=Config.INFERENCE_POOL_ADDRESS,
+                        help='Unix socket path or host:port to listen on')
+    args = parser.parse_args()
+
+    try:
+        serve(address=args.address, workers=args.workers)
+    except PoolAuthKeyError as e:
+        print(f"❌ {e}")
+        raise SystemExit(1)
@@ -0,0 +1,238 @@
+"""
+Maintenance commands for the NutriScan backend
+
+Usage:
+    python manage.py migrate-uploads [--delete-originals]
+    python manage.py gc-blobs [--grace-seconds N]
+    python manage.py build-catalog [SOURCE] [--output PATH]
+    python manage.py ensure-indexes
+    python manage.py rebuild-user-stats [--user USER_ID]
+    python manage.py reconcile-rollups [--user USER_ID] [--days N] [--dry-run]
+    python manage.py migrate-scans [--batch-size N] [--dry-run]
+    python manage.py calibrate-bcrypt [--target-ms N]
+"""
+
+import argparse
+import os
+from pymongo import MongoClient
+
+from config import Config
+
+
+def get_db():
+    """Database named in MONGODB_URI"""
+    return MongoClient(Config.MONGODB_URI).get_database()
+
+
+def migrate_uploads(db, delete_originals):
+    """Move legacy flat uploads into the blob store and point scans at their keys"""
+    from services.blob_store import image_store, BlobStore
+
+    migrated = missing = 0
+    imported = {}  # legacy path -> key, so each file is read once
+
+    for scan in db.scan_history.find({'image_path': {'$nin': [None, '']}}, {'image_path': 1}):
+        path = scan['image_path']
+        if BlobStore.is_key(path):
+            continue
+
+        if path in imported:
+            key = imported[path]
+            image_store.add_reference(db, key, os.path.getsize(path))
+        elif os.path.exists(path):
+            key = imported[path] = image_store.import_file(db, path)
+        else:
+            missing += 1
+            continue
+
+        db.scan_history.update_one({'_id': scan['_id']}, {'$set': {'image_path': key}})
+        migrated += 1
+
+    if delete_originals:
+        for path in imported:
+            os.remove(path)
+
+    print(f"✅ Migrated {migrated} scan image(s) into {len(set(imported.values()))} blob(s)")
+    if missing:
+        print(f"⚠️ {missing} scan(s) point at files that no longer exist, left unchanged")
+
+
+def gc_blobs(db, grace_seconds):
+    """Delete images no scan has referenced for grace_seconds"""
+    from services.blob_store import image_store
+
+    deleted = image_store.collect_garbage(db, grace_seconds)
+    print(f"🧹 Deleted {deleted} unreferenced blob(s)")
+
+
+def build_catalog(source, output):
+    """Compile a CSV/JSON nutrition source (default: the built-in table) into a catalog file"""
+    from services.nutrition_catalog import build_catalog as write_catalog, load_records
+
+    if source:
+        records = load_records(source)
+    else:
+        from services.nutrition_service import nutrition_service
+        records = nutrition_service.fallback_data.items()
+
+    # Write beside the target and rename, so running workers never map a half-written file
+    tmp_path = f"{output}.{os.getpid()}.tmp"
+    rows, duplicates = write_catalog(records, tmp_path)
+    os.replace(tmp_path, output)
+
+    print(f"✅ Wrote {rows} foods to {output} ({os.path.getsize(output)} bytes)")
+    if duplicates:
+        print(f"⚠️ Skipped {duplicates} duplicate or unnamed row(s)")
+
+
+def ensure_indexes(db):
+    """Create the declared indexes and show the plan of every hot query"""
+    from services.db_indexes import ensure_indexes as create_indexes, verify_query_plans, IndexVerificationError
+
+    print(f"✅ Indexes: {', '.join(create_indexes(db))}")
+    try:
+        plans = verify_query_plans(db)
+    except IndexVerificationError as e:
+        print(f"❌ {e}")
+        raise SystemExit(1)
+
+    for name, stages in plans.items():
+        print(f"   {name}: {' <- '.join(stages)}")
+
+
+def rebuild_user_stats(db, user_id):
+    """Recompute the per-user counters behind /api/user/stats from scan_history"""
+    from bson import ObjectId
+    from services.user_stats import user_stats
+
+    written = user_stats.rebuild(db, ObjectId(user_id) if user_id else None)
+    print(f"✅ Rebuilt stats for {written} user(s)")
+
+
+def reconcile_rollups(db, user_id, days, dry_run):
+    """Find and fix daily rollups that disagree with scan_history"""
+    from datetime import datetime, timedelta
+    from bson import ObjectId
+    from services.daily_rollups import daily_rollups
+
+    since = datetime.utcnow() - timedelta(days=days) if days else None
+    result = daily_rollups.reconcile(db, ObjectId(user_id) if user_id else None, since, dry_run)
+
+    action = 'would fix' if dry_run else 'fixed'
+    print(f"✅ Checked {result['checked']} day(s): {action} {result['fixed']}, "
+          f"{'would remove' if dry_run else 'removed'} {result['removed']} without scans")
+
+
+def migrate_scans(db, batch_size, dry_run):
+    """Convert fully embedded scan documents to compact ones referencing food_catalog"""
+    from pymongo import UpdateOne
+    from services.food_catalog import food_catalog
+
+    migrated = 0
+    versions = set()
+    query = {'catalog_ref': {'$exists': False}, 'nutrition_data': {'$exists': True}}
+    fields = {'food_name': 1, 'nutrition_data': 1, 'health_score': 1, 'alternatives': 1}
+
+    while True:
+        # Walk in _id order so each batch query starts where the last one stopped
+        batch = list(db.scan_history.find(query, fields).sort('_id', 1).limit(batch_size))
+        if not batch:
+            break
+
+        operations = []
+        for scan in batch:
+            # Each scan keeps the payload it was stored with, not today's values
+            payload = (scan['food_name'], scan['nutrition_data'], scan['health_score'], scan.get('alternatives', []))
+            if dry_run:
+                version = food_catalog.version_of(*payload)
+            else:
+                version = food_catalog.store(db, *payload)
+            versions.add(version)
+            operations.append(UpdateOne(
+                {'_id': scan['_id'], 'catalog_ref': {'$exists': False}},
+                {
+                    '$set': {
+                        'catalog_ref': version,
+                        'score': scan['health_score'].get('score'),
+                        'status': scan['health_score'].get('status')
+                    },
+                    '$unset': {'nutrition_data': '', 'health_score': '', 'alternatives': ''}
+                }
+            ))
+
+        if not dry_run:
+            db.scan_history.bulk_write(operations, ordered=False)
+        migrated += len(batch)
+        query['_id'] = {'$gt': batch[-1]['_id']}
+
+    action = 'Would migrate' if dry_run else 'Migrated'
+    print(f"✅ {action} {migrated} scan(s) onto {len(versions)} food catalog entr{'y' if len(versions) == 1 else 'ies'}")
+
+
+def calibrate_bcrypt(target_ms):
+    """Find the bcrypt cost that keeps one hash within target_ms on this host"""
+    from services.password_hasher import calibrate
+
+    rounds, timings = calibrate(target_ms)
+    for cost, ms in timings.items():
+        print(f"   cost {cost}: {ms} ms{'  <-' if cost == rounds else ''}")
+    print(f"✅ Set BCRYPT_ROUNDS={rounds} (currently {Config.BCRYPT_ROUNDS}); existing hashes are upgraded at login")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='NutriScan maintenance commands')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    migrate = subparsers.add_parser('migrate-uploads', help='move legacy uploads into the blob store')
+    migrate.add_argument('--delete-originals', action='store_true', help='remove the flat files once imported')
+
+    gc = subparsers.add_parser('gc-blobs', help='delete unreferenced images')
+    gc.add_argument('--grace-seconds', type=int, default=Config.BLOB_GC_GRACE_SECONDS)
+
+    catalog = subparsers.add_parser('build-catalog', help='compile nutrition data into a memory-mapped catalog')
+    catalog.add_argument('source', nargs='?', help='.csv or .json nutrition source (default: built-in table)')
+    catalog.add_argument('--output', default=Config.NUTRITION_CATALOG_PATH)
+
+    subparsers.add_parser('ensure-indexes', help='create indexes and verify hot queries use them')
+
+    stats = subparsers.add_parser('rebuild-user-stats', help='recompute per-user scan counters')
+    stats.add_argument('--user', help='only this user id')
+
+    reconcile = subparsers.add_parser('reconcile-rollups', help='rebuild daily rollups that drifted from the scans')
+    reconcile.add_argument('--user', help='only this user id')
+    reconcile.add_argument('--days', type=int, help='only the last N days')
+    reconcile.add_argument('--dry-run', action='store_true', help='report without writing')
+
+    scans = subparsers.add_parser('migrate-scans', help='convert embedded scan documents to the compact schema')
+    scans.add_argument('--batch-size', type=int, default=500)
+    scans.add_argument('--dry-run', action='store_true', help='report without writing')
+
+    bcrypt_cost = subparsers.add_parser('calibrate-bcrypt', help='pick the bcrypt cost for a target hash time')
+    bcrypt_cost.add_argument('--target-ms', type=float, default=250)
+
+    args = parser.parse_args()
+    if args.command == 'build-catalog':
+        build_catalog(args.source, args.output)
+        return
+    if args.command == 'calibrate-bcrypt':
+        calibrate_bcrypt(args.target_ms)
+        return
+
+    db = get_db()
+
+    if args.command == 'migrate-uploads':
+        migrate_uploads(db, args.delete_originals)
+    elif args.command == 'gc-blobs':
+        gc_blobs(db, args.grace_seconds)
+    elif args.command == 'ensure-indexes':
+        ensure_indexes(db)
+    elif args.command == 'rebuild-user-stats':
+        rebuild_user_stats(db, args.user)
+    elif args.command == 'reconcile-rollups':
+        reconcile_rollups(db, args.user, args.days, args.dry_run)
+    elif args.command == 'migrate-scans':
+        migrate_scans(db, args.batch_size, args.dry_run)
+
+
+if __name__ == '__main__':
+    main()
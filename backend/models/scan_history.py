@@ -1,20 +1,49 @@
-from datetime import datetime
+import base64
+import binascii
+import json
+from datetime import datetime, timedelta
 from bson import ObjectId
+from bson.errors import InvalidId
+
+EPOCH = datetime(1970, 1, 1)
+
+# Health status of a compact or legacy (fully embedded) scan document
+STATUS_EXPR = {'$ifNull': ['$status', '$health_score.status']}
 
 class ScanHistory:
     """Scan history model for MongoDB"""
     
-    def __init__(self, user_id, food_name, image_path, nutrition_data, health_score, alternatives=None):
+    def __init__(self, user_id, food_name, image_path, nutrition_data, health_score, alternatives=None,
+                 confidence=None, model_version=None):
         self.user_id = ObjectId(user_id) if isinstance(user_id, str) else user_id
         self.food_name = food_name
         self.image_path = image_path
         self.nutrition_data = nutrition_data
         self.health_score = health_score
         self.alternatives = alternatives or []
+        self.confidence = confidence
+        self.model_version = model_version
         self.scanned_at = datetime.utcnow()
     
+    def to_compact_dict(self, catalog_ref):
+        """
+        Document as stored: the per-food payload lives in food_catalog under
+        catalog_ref, only what differs per scan or is queried is kept here
+        """
+        return {
+            'user_id': self.user_id,
+            'food_name': self.food_name,
+            'image_path': self.image_path,
+            'catalog_ref': catalog_ref,
+            'score': self.health_score['score'],
+            'status': self.health_score['status'],
+            'confidence': self.confidence,
+            'model_version': self.model_version,
+            'scanned_at': self.scanned_at
+        }
+    
     def to_dict(self):
-        """Convert scan history to dictionary"""
+        """Convert scan history to dictionary (fully embedded, as hydrated documents look)"""
         return {
             'user_id': self.user_id,
             'food_name': self.food_name,
@@ -27,7 +56,7 @@ class ScanHistory:
     
     @staticmethod
     def serialize(scan_doc):
-        """Serialize scan document for JSON response"""
+        """Serialize scan document for JSON response (compact documents must be hydrated first)"""
         return {
             'id': str(scan_doc['_id']),
             'user_id': str(scan_doc['user_id']),
@@ -39,6 +68,142 @@ class ScanHistory:
             'scanned_at': scan_doc['scanned_at'].isoformat() if scan_doc.get('scanned_at') else None
         }
     
+    # Fields needed for a history list row
+    SUMMARY_PROJECTION = {
+        'food_name': 1,
+        'image_path': 1,
+        'scanned_at': 1,
+        'status': 1,
+        'score': 1,
+        'health_score.status': 1,
+        'health_score.score': 1
+    }
+    
+    @staticmethod
+    def serialize_summary(scan_doc):
+        """Serialize a history list row (full detail comes from /history/<scan_id>)"""
+        health_score = scan_doc.get('health_score') or {}
+        return {
+            'id': str(scan_doc['_id']),
+            'food_name': scan_doc['food_name'],
+            'image_path': scan_doc.get('image_path'),
+            'health_score': {
+                'status': scan_doc.get('status', health_score.get('status')),
+                'score': scan_doc.get('score', health_score.get('score'))
+            },
+            'scanned_at': scan_doc['scanned_at'].isoformat() if scan_doc.get('scanned_at') else None
+        }
+    
+    @staticmethod
+    def encode_cursor(scan_doc):
+        """Opaque position after scan_doc in newest-first order"""
+        millis = (scan_doc['scanned_at'] - EPOCH) // timedelta(milliseconds=1)
+        raw = json.dumps([millis, str(scan_doc['_id'])]).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+    
+    @staticmethod
+    def decode_cursor(cursor):
+        """(scanned_at, _id) from encode_cursor(), raises ValueError if malformed"""
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            millis, scan_id = json.loads(raw)
+            return EPOCH + timedelta(milliseconds=int(millis)), ObjectId(scan_id)
+        except (binascii.Error, UnicodeDecodeError, ValueError, TypeError, InvalidId):
+            raise ValueError('Invalid cursor')
+    
+    @staticmethod
+    def page_query(user_id, cursor=None):
+        """Filter for a user's scans after cursor, for a (scanned_at, _id) descending sort"""
+        query = {'user_id': user_id}
+        if cursor:
+            scanned_at, scan_id = ScanHistory.decode_cursor(cursor)
+            query['$or'] = [
+                {'scanned_at': {'$lt': scanned_at}},
+                {'scanned_at': scanned_at, '_id': {'$lt': scan_id}}
+            ]
+        return query
+    
+    @staticmethod
+    def hydrate_stages():
+        """
+        Aggregation stages giving compact scans the nutrition_data of their
+        food_catalog entry and every scan a top-level status
+        """
+        return [
+            {'$lookup': {'from': 'food_catalog', 'localField': 'catalog_ref', 'foreignField': '_id', 'as': '_catalog'}},
+            {'$addFields': {
+                'nutrition_data': {'$ifNull': ['$nutrition_data', {'$arrayElemAt': ['$_catalog.nutrition_data', 0]}]},
+                'status': STATUS_EXPR
+            }},
+            {'$project': {'_catalog': 0}}
+        ]
+    
+    @staticmethod
+    def insights_pipeline(user_id, start_date, top_foods=5):
+        """
+        Aggregation computing everything /insights needs for a user's scans since
+        start_date in one pass: totals, per-day buckets and the most scanned foods.
+        Only the four fields used are projected out of each (hydrated) scan.
+        """
+        is_status = lambda status: {'$cond': [{'$eq': ['$status', status]}, 1, 0]}
+        
+        return [
+            {'$match': {'user_id': user_id, 'scanned_at': {'$gte': start_date}}},
+            *ScanHistory.hydrate_stages(),
+            {'$project': {
+                '_id': 0,
+                'scanned_at': 1,
+                'food_name': 1,
+                'calories': {'$ifNull': ['$nutrition_data.calories', 0]},
+                'status': 1
+            }},
+            {'$facet': {
+                'stats': [
+                    {'$group': {
+                        '_id': None,
+                        'total_scans': {'$sum': 1},
+                        'total_calories': {'$sum': '$calories'},
+                        'healthy_count': {'$sum': is_status('healthy')},
+                        'unhealthy_count': {'$sum': is_status('unhealthy')}
+                    }}
+                ],
+                'daily_breakdown': [
+                    # UTC day, same key the Python version built with strftime
+                    {'$group': {
+                        '_id': {'$dateToString': {'format': '%Y-%m-%d', 'date': '$scanned_at'}},
+                        'scans': {'$sum': 1},
+                        'calories': {'$sum': '$calories'},
+                        'healthy': {'$sum': is_status('healthy')},
+                        'unhealthy': {'$sum': is_status('unhealthy')}
+                    }},
+                    {'$sort': {'_id': 1}},
+                    {'$project': {'_id': 0, 'date': '$_id', 'scans': 1, 'calories': 1, 'healthy': 1, 'unhealthy': 1}}
+                ],
+                'top_foods': [
+                    # Like $sortByCount, but ties go to the food scanned first
+                    {'$group': {'_id': '$food_name', 'count': {'$sum': 1}, 'first_scanned': {'$min': '$scanned_at'}}},
+                    {'$sort': {'count': -1, 'first_scanned': 1, '_id': 1}},
+                    {'$limit': top_foods},
+                    {'$project': {'_id': 0, 'name': '$_id', 'count': 1}}
+                ]
+            }}
+        ]
+    
+    @staticmethod
+    def stats_from_totals(totals):
+        """The get_weekly_stats() dict from the insights pipeline's 'stats' facet"""
+        if not totals or not totals['total_scans']:
+            return ScanHistory.get_weekly_stats([])
+        
+        total_scans = totals['total_scans']
+        return {
+            'total_scans': total_scans,
+            'avg_calories': round(totals['total_calories'] / total_scans, 2),
+            'healthy_count': totals['healthy_count'],
+            'unhealthy_count': totals['unhealthy_count'],
+            'moderate_count': total_scans - totals['healthy_count'] - totals['unhealthy_count']
+        }
+    
     @staticmethod
     def get_weekly_stats(scans):
         """Calculate weekly nutrition statistics"""
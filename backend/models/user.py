@@ -1,6 +1,6 @@
 from datetime import datetime
 from bson import ObjectId
-import bcrypt
+from services.password_hasher import password_hasher
 
 class User:
     """User model for MongoDB"""
@@ -13,16 +13,13 @@ class User:
         self.updated_at = datetime.utcnow()
     
     def _hash_password(self, password):
-        """Hash password using bcrypt"""
-        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        """Hash password using bcrypt (on the password hashing pool)"""
+        return password_hasher.hash(password)
     
     @staticmethod
     def verify_password(plain_password, hashed_password):
-        """Verify password against hash"""
-        return bcrypt.checkpw(
-            plain_password.encode('utf-8'),
-            hashed_password.encode('utf-8')
-        )
+        """Verify password against hash (on the password hashing pool)"""
+        return password_hasher.verify(plain_password, hashed_password)
     
     def to_dict(self):
         """Convert user to dictionary"""
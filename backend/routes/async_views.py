@@ -0,0 +1,266 @@
+"""
+asyncio versions of the I/O-bound API routes, served by asgi.py on the Motor
+driver: auth, history, insights and stats. Paths, status codes and JSON bodies
+match the Flask views in auth.py, food.py and user.py, which still serve
+every other route.
+"""
+
+from quart import Blueprint, request, jsonify, g
+from functools import wraps
+from bson import ObjectId
+from models.user import User
+from models.scan_history import ScanHistory
+from services.password_hasher import password_hasher, PasswordHasherBusy
+from services.user_stats import user_stats, UserStats
+from services.daily_rollups import daily_rollups
+from services.food_catalog import food_catalog
+from routes.auth import create_token, bearer_token, authenticate
+from routes.common import (
+    HISTORY_SORT, credentials, profile_updates, history_params, history_projection, history_page,
+    history_response, insights_start_date, insights_from_pipeline, insights_response
+)
+from config import Config
+
+bp = Blueprint('async_api', __name__)
+
+def get_db():
+    """Get async (Motor) database instance"""
+    from asgi import mongo
+    return mongo.db
+
+def require_auth(view):
+    """Async counterpart of routes.auth.require_auth (sets g.user_id and g.user_oid)"""
+    @wraps(view)
+    async def wrapper(*args, **kwargs):
+        token = bearer_token(request)
+        if not token:
+            return jsonify({'error': 'No token provided'}), 401
+
+        user = authenticate(token)
+        if user is None:
+            return jsonify({'error': 'Invalid or expired token'}), 401
+
+        g.user_id, g.user_oid = user
+        return await view(*args, **kwargs)
+    return wrapper
+
+@bp.route('/api/auth/register', methods=['POST'])
+async def register():
+    """Register a new user"""
+    try:
+        data = await request.get_json()
+        print(f"📝 Registration request received: {data.get('email') if data else 'No data'}")
+
+        # Validate input
+        if not credentials(data):
+            print("❌ Validation failed: Missing email or password")
+            return jsonify({'error': 'Email and password are required'}), 400
+
+        email, password = credentials(data)
+        name = data.get('name', email.split('@')[0])
+
+        # Check if user already exists
+        db = get_db()
+        if await db.users.find_one({'email': email}):
+            print(f"⚠️ User already exists: {email}")
+            return jsonify({'error': 'User already exists'}), 400
+
+        # Hash on the password pool without holding the event loop
+        try:
+            hashed = await password_hasher.wait_async(password_hasher.submit_hash(password))
+        except PasswordHasherBusy as e:
+            return jsonify({'error': str(e)}), 503, {'Retry-After': '2'}
+
+        user = User.from_dict({'email': email, 'password': hashed, 'name': name})
+        result = await db.users.insert_one(user.to_dict())
+
+        print(f"✅ User created with ID: {result.inserted_id}")
+
+        return jsonify({
+            'message': 'User registered successfully',
+            'token': create_token(result.inserted_id),
+            'user': {
+                'id': str(result.inserted_id),
+                'email': email,
+                'name': name
+            }
+        }), 201
+
+    except Exception as e:
+        print(f"❌ Registration error: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/auth/login', methods=['POST'])
+async def login():
+    """Login user"""
+    try:
+        data = await request.get_json()
+
+        # Validate input
+        if not credentials(data):
+            return jsonify({'error': 'Email and password are required'}), 400
+
+        email, password = credentials(data)
+
+        # Find user
+        db = get_db()
+        user = await db.users.find_one({'email': email})
+
+        if not user:
+            return jsonify({'error': 'Invalid credentials'}), 401
+
+        # Verify password
+        try:
+            if not await password_hasher.wait_async(password_hasher.submit_verify(password, user['password'])):
+                return jsonify({'error': 'Invalid credentials'}), 401
+        except PasswordHasherBusy as e:
+            return jsonify({'error': str(e)}), 503, {'Retry-After': '2'}
+
+        # Upgrade hashes made with another cost while the plain password is at hand
+        if password_hasher.needs_rehash(user['password']):
+            try:
+                hashed = await password_hasher.wait_async(password_hasher.submit_hash(password, rehash=True))
+                await db.users.update_one(
+                    {'_id': user['_id'], 'password': user['password']},
+                    {'$set': {'password': hashed}}
+                )
+            except PasswordHasherBusy:
+                pass  # the next login will try again
+
+        return jsonify({
+            'message': 'Login successful',
+            'token': create_token(user['_id']),
+            'user': User.serialize(user)
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/auth/profile', methods=['GET'])
+@require_auth
+async def get_profile():
+    """Get user profile"""
+    try:
+        user = await get_db().users.find_one({'_id': g.user_oid})
+
+        if not user:
+            return jsonify({'error': 'User not found'}), 404
+
+        return jsonify({
+            'user': User.serialize(user)
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/auth/profile', methods=['PUT'])
+@require_auth
+async def update_profile():
+    """Update user profile"""
+    try:
+        update_fields = profile_updates(await request.get_json())
+
+        if not update_fields:
+            return jsonify({'error': 'No fields to update'}), 400
+
+        db = get_db()
+        result = await db.users.update_one(
+            {'_id': g.user_oid},
+            {'$set': update_fields}
+        )
+
+        if result.modified_count == 0:
+            return jsonify({'error': 'No changes made'}), 400
+
+        user = await db.users.find_one({'_id': g.user_oid})
+
+        return jsonify({
+            'message': 'Profile updated successfully',
+            'user': User.serialize(user)
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/food/history', methods=['GET'])
+@require_auth
+async def get_history():
+    """Get user's scan history"""
+    try:
+        limit, cursor, full, include_total = history_params(request.args)
+
+        try:
+            query = ScanHistory.page_query(g.user_oid, cursor)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        db = get_db()
+        scans, has_more = history_page(await (
+            db.scan_history.find(query, history_projection(full)).sort(HISTORY_SORT).limit(limit + 1).to_list(None)
+        ), limit)
+
+        if full:
+            await food_catalog.hydrate_many_async(db, scans)
+        response = history_response(scans, has_more, full)
+
+        if include_total:
+            response['total'] = (await user_stats.get_async(db, g.user_oid))['total_scans']
+
+        return jsonify(response), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/food/history/<scan_id>', methods=['GET'])
+@require_auth
+async def get_scan_detail(scan_id):
+    """Get detailed information about a specific scan"""
+    try:
+        db = get_db()
+        scan = await db.scan_history.find_one({
+            '_id': ObjectId(scan_id),
+            'user_id': g.user_oid
+        })
+
+        if not scan:
+            return jsonify({'error': 'Scan not found'}), 404
+
+        await food_catalog.hydrate_many_async(db, [scan])
+        return jsonify({
+            'scan': ScanHistory.serialize(scan)
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/food/insights', methods=['GET'])
+@require_auth
+async def get_insights():
+    """Get nutrition insights and statistics"""
+    try:
+        period = request.args.get('period', 'week')  # week, month, all
+        start_date = insights_start_date(period)
+
+        db = get_db()
+        if Config.INSIGHTS_FROM_ROLLUPS:
+            stats, daily_breakdown, top_foods = await daily_rollups.get_insights_async(db, g.user_oid, start_date)
+        else:
+            result = await db.scan_history.aggregate(ScanHistory.insights_pipeline(g.user_oid, start_date)).to_list(1)
+            stats, daily_breakdown, top_foods = insights_from_pipeline(result[0])
+
+        return jsonify(insights_response(period, stats, daily_breakdown, top_foods)), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/api/user/stats', methods=['GET'])
+@require_auth
+async def get_user_stats():
+    """Get user statistics"""
+    try:
+        stats = await user_stats.get_async(get_db(), g.user_oid)
+
+        return jsonify(UserStats.serialize(stats)), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
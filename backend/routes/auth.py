@@ -1,15 +1,21 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, g
 from datetime import datetime, timedelta
+from functools import wraps
+import time
 import jwt
 from bson import ObjectId
+from bson.errors import InvalidId
 from models.user import User
+from services.token_cache import token_cache
+from services.password_hasher import password_hasher, PasswordHasherBusy
+from routes.common import credentials, profile_updates
 from config import Config
 
 bp = Blueprint('auth', __name__)
 
 def get_db():
     """Get database instance"""
-    from app import mongo
+    from extensions import mongo
     return mongo.db
 
 def create_token(user_id):
@@ -21,15 +27,62 @@ def create_token(user_id):
     return jwt.encode(payload, Config.JWT_SECRET, algorithm=Config.JWT_ALGORITHM)
 
 def verify_token(token):
-    """Verify JWT token"""
+    """Verify JWT token, returns its user id or None (verified tokens are cached until they expire)"""
+    started = time.perf_counter()
+    user_id = token_cache.get(token)
+    if user_id is not None:
+        token_cache.observe('hit', time.perf_counter() - started)
+        return user_id
+    
     try:
         payload = jwt.decode(token, Config.JWT_SECRET, algorithms=[Config.JWT_ALGORITHM])
-        return payload['user_id']
-    except jwt.ExpiredSignatureError:
+        user_id = payload['user_id']
+    except (jwt.InvalidTokenError, KeyError):  # includes ExpiredSignatureError
+        token_cache.observe('rejected', time.perf_counter() - started)
         return None
-    except jwt.InvalidTokenError:
+    
+    token_cache.put(token, user_id, payload.get('exp'))
+    token_cache.observe('miss', time.perf_counter() - started)
+    return user_id
+
+def bearer_token(req, query_token=False):
+    """Token from the Authorization header (or ?token= when query_token), None if absent"""
+    auth_header = req.headers.get('Authorization')
+    if auth_header and auth_header.startswith('Bearer '):
+        return auth_header.split(' ')[1]
+    return req.args.get('token') if query_token else None
+
+def authenticate(token):
+    """(user_id, user ObjectId) for a valid token, None otherwise"""
+    user_id = verify_token(token)
+    try:
+        return (user_id, ObjectId(user_id)) if user_id else None
+    except (InvalidId, TypeError):
         return None
 
+def require_auth(view=None, query_token=False):
+    """
+    Decorator for routes that need a logged-in user: answers 401 without a
+    valid Bearer token, otherwise sets g.user_id (str) and g.user_oid (ObjectId).
+    With query_token=True the token may also come as ?token= (EventSource).
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            token = bearer_token(request, query_token)
+            if not token:
+                return jsonify({'error': 'No token provided'}), 401
+            
+            user = authenticate(token)
+            if user is None:
+                return jsonify({'error': 'Invalid or expired token'}), 401
+            
+            g.user_id, g.user_oid = user
+            return view(*args, **kwargs)
+        return wrapper
+    
+    return decorator(view) if view is not None else decorator
+
 @bp.route('/register', methods=['POST'])
 def register():
     """Register a new user"""
@@ -38,12 +91,11 @@ def register():
         print(f"📝 Registration request received: {data.get('email') if data else 'No data'}")
         
         # Validate input
-        if not data or not data.get('email') or not data.get('password'):
+        if not credentials(data):
             print("❌ Validation failed: Missing email or password")
             return jsonify({'error': 'Email and password are required'}), 400
         
-        email = data['email'].lower().strip()
-        password = data['password']
+        email, password = credentials(data)
         name = data.get('name', email.split('@')[0])
         
         print(f"📧 Checking if user exists: {email}")
@@ -58,7 +110,10 @@ def register():
         print(f"👤 Creating new user: {email}")
         
         # Create new user
-        user = User(email=email, password=password, name=name)
+        try:
+            user = User(email=email, password=password, name=name)
+        except PasswordHasherBusy as e:
+            return jsonify({'error': str(e)}), 503, {'Retry-After': '2'}
         result = db.users.insert_one(user.to_dict())
         
         print(f"✅ User created with ID: {result.inserted_id}")
@@ -91,11 +146,10 @@ def login():
         data = request.get_json()
         
         # Validate input
-        if not data or not data.get('email') or not data.get('password'):
+        if not credentials(data):
             return jsonify({'error': 'Email and password are required'}), 400
         
-        email = data['email'].lower().strip()
-        password = data['password']
+        email, password = credentials(data)
         
         # Find user
         db = get_db()
@@ -105,8 +159,21 @@ def login():
             return jsonify({'error': 'Invalid credentials'}), 401
         
         # Verify password
-        if not User.verify_password(password, user['password']):
-            return jsonify({'error': 'Invalid credentials'}), 401
+        try:
+            if not User.verify_password(password, user['password']):
+                return jsonify({'error': 'Invalid credentials'}), 401
+        except PasswordHasherBusy as e:
+            return jsonify({'error': str(e)}), 503, {'Retry-After': '2'}
+        
+        # Upgrade hashes made with another cost while the plain password is at hand
+        if password_hasher.needs_rehash(user['password']):
+            try:
+                db.users.update_one(
+                    {'_id': user['_id'], 'password': user['password']},
+                    {'$set': {'password': password_hasher.rehash(password)}}
+                )
+            except PasswordHasherBusy:
+                pass  # the next login will try again
         
         # Create token
         token = create_token(user['_id'])
@@ -121,23 +188,13 @@ def login():
         return jsonify({'error': str(e)}), 500
 
 @bp.route('/profile', methods=['GET'])
+@require_auth
 def get_profile():
     """Get user profile"""
     try:
-        # Get token from header
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
-            return jsonify({'error': 'No token provided'}), 401
-        
-        token = auth_header.split(' ')[1]
-        user_id = verify_token(token)
-        
-        if not user_id:
-            return jsonify({'error': 'Invalid or expired token'}), 401
-        
         # Get user
         db = get_db()
-        user = db.users.find_one({'_id': ObjectId(user_id)})
+        user = db.users.find_one({'_id': g.user_oid})
         
         if not user:
             return jsonify({'error': 'User not found'}), 404
@@ -150,36 +207,21 @@ def get_profile():
         return jsonify({'error': str(e)}), 500
 
 @bp.route('/profile', methods=['PUT'])
+@require_auth
 def update_profile():
     """Update user profile"""
     try:
-        # Get token from header
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
-            return jsonify({'error': 'No token provided'}), 401
-        
-        token = auth_header.split(' ')[1]
-        user_id = verify_token(token)
-        
-        if not user_id:
-            return jsonify({'error': 'Invalid or expired token'}), 401
-        
         # Get update data
         data = request.get_json()
-        update_fields = {}
-        
-        if data.get('name'):
-            update_fields['name'] = data['name']
+        update_fields = profile_updates(data)
         
         if not update_fields:
             return jsonify({'error': 'No fields to update'}), 400
         
-        update_fields['updated_at'] = datetime.utcnow()
-        
         # Update user
         db = get_db()
         result = db.users.update_one(
-            {'_id': ObjectId(user_id)},
+            {'_id': g.user_oid},
             {'$set': update_fields}
         )
         
@@ -187,7 +229,7 @@ def update_profile():
             return jsonify({'error': 'No changes made'}), 400
         
         # Get updated user
-        user = db.users.find_one({'_id': ObjectId(user_id)})
+        user = db.users.find_one({'_id': g.user_oid})
         
         return jsonify({
             'message': 'Profile updated successfully',
@@ -0,0 +1,67 @@
+"""
+Request parsing and response shaping shared by the Flask views and the
+async views in routes/async_views.py, so both serve the same JSON.
+Nothing here does I/O.
+"""
+
+from datetime import datetime, timedelta
+from models.scan_history import ScanHistory
+
+# Newest first; _id breaks ties between scans with the same timestamp
+HISTORY_SORT = [('scanned_at', -1), ('_id', -1)]
+
+# Days of scans /insights covers for each ?period=
+INSIGHTS_PERIOD_DAYS = {'week': 7, 'month': 30}
+INSIGHTS_DEFAULT_DAYS = 365
+
+def credentials(data):
+    """(email, password) from a login/register body, None if either is missing"""
+    if not data or not data.get('email') or not data.get('password'):
+        return None
+    return data['email'].lower().strip(), data['password']
+
+def profile_updates(data):
+    """Fields a profile update may set (empty if there is nothing to change)"""
+    update_fields = {}
+    if data.get('name'):
+        update_fields['name'] = data['name']
+    if update_fields:
+        update_fields['updated_at'] = datetime.utcnow()
+    return update_fields
+
+def history_params(args):
+    """(limit, cursor, full, include_total) from the /history query string"""
+    limit = min(max(int(args.get('limit', 20)), 1), 100)
+    return limit, args.get('cursor'), args.get('view') == 'full', args.get('include_total') in ('1', 'true')
+
+def history_projection(full):
+    return None if full else ScanHistory.SUMMARY_PROJECTION
+
+def history_page(scans, limit):
+    """Split limit + 1 fetched scans into (page, has_more)"""
+    return scans[:limit], len(scans) > limit
+
+def history_response(scans, has_more, full):
+    """/history body for a page of scans (hydrated when full)"""
+    serialize = ScanHistory.serialize if full else ScanHistory.serialize_summary
+    return {
+        'history': [serialize(scan) for scan in scans],
+        'next_cursor': ScanHistory.encode_cursor(scans[-1]) if has_more else None
+    }
+
+def insights_start_date(period):
+    """Start of the window /insights covers for a ?period= of week, month or all"""
+    return datetime.utcnow() - timedelta(days=INSIGHTS_PERIOD_DAYS.get(period, INSIGHTS_DEFAULT_DAYS))
+
+def insights_from_pipeline(result):
+    """(statistics, daily_breakdown, top_foods) from ScanHistory.insights_pipeline()'s output"""
+    stats = ScanHistory.stats_from_totals(result['stats'][0] if result['stats'] else None)
+    return stats, result['daily_breakdown'], result['top_foods']
+
+def insights_response(period, stats, daily_breakdown, top_foods):
+    return {
+        'period': period,
+        'statistics': stats,
+        'daily_breakdown': daily_breakdown,
+        'top_foods': top_foods
+    }
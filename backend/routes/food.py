@@ -1,20 +1,32 @@
-from flask import Blueprint, request, jsonify, send_from_directory
-from werkzeug.utils import secure_filename
-from datetime import datetime, timedelta
+from flask import Blueprint, request, jsonify, g, send_file, send_from_directory, Response, stream_with_context, url_for
 from bson import ObjectId
+from pymongo.errors import BulkWriteError
+import io
+import json
+import mimetypes
 import os
 from models.scan_history import ScanHistory
-from services.ml_service import ml_service
-from services.nutrition_service import nutrition_service
+from services.ml_service import ml_service, InferenceQueueFull, InvalidImageError, ModelNotReady
 from services.health_scorer import health_scorer
-from routes.auth import verify_token
+from services.scan_templates import scan_templates
+from services.user_stats import user_stats
+from services.daily_rollups import daily_rollups
+from services.food_catalog import food_catalog
+from services.scan_jobs import scan_jobs, ScanJobManager, JobQueueFull
+from services.upload_writer import UploadStorageError
+from services.blob_store import image_store, BlobStore, DERIVATIVE_QUALITY
+from routes.auth import require_auth
+from routes.common import (
+    HISTORY_SORT, history_params, history_projection, history_page, history_response,
+    insights_start_date, insights_from_pipeline, insights_response
+)
 from config import Config
 
 bp = Blueprint('food', __name__)
 
 def get_db():
     """Get database instance"""
-    from app import mongo
+    from extensions import mongo
     return mongo.db
 
 def allowed_file(filename):
@@ -23,20 +35,10 @@ def allowed_file(filename):
            filename.rsplit('.', 1)[1].lower() in Config.ALLOWED_EXTENSIONS
 
 @bp.route('/scan', methods=['POST'])
+@require_auth
 def scan_food():
-    """Scan food image and return nutrition analysis"""
+    """Scan food image and return nutrition analysis (queued as a job with ?async=1)"""
     try:
-        # Verify authentication
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
-            return jsonify({'error': 'No token provided'}), 401
-        
-        token = auth_header.split(' ')[1]
-        user_id = verify_token(token)
-        
-        if not user_id:
-            return jsonify({'error': 'Invalid or expired token'}), 401
-        
         # Check if file is present
         if 'image' not in request.files:
             return jsonify({'error': 'No image file provided'}), 400
@@ -49,218 +51,396 @@ def scan_food():
         if not allowed_file(file.filename):
             return jsonify({'error': 'Invalid file type'}), 400
         
-        # Save file
-        filename = secure_filename(f"{user_id}_{datetime.utcnow().timestamp()}_{file.filename}")
-        filepath = os.path.join(Config.UPLOAD_FOLDER, filename)
-        file.save(filepath)
-        
+        # Read the upload once: it is decoded from memory and persisted in the background
+        image_data = file.stream.getvalue() if isinstance(file.stream, io.BytesIO) else file.read()
+        image_store.check_space(len(image_data))
+        
+        # Content-addressed: identical images are stored once and reference-counted
+        image_key, saved = image_store.save(get_db(), image_data, file.filename.rsplit('.', 1)[1])
+        
+        if request.args.get('async') in ('1', 'true'):
+            try:
+                job_id = scan_jobs.submit(get_db(), g.user_id, _run_scan_job, g.user_id, image_data, file.filename, image_key, saved)
+            except BaseException:
+                # No job took over the reference (queue full, job insert failed, ...)
+                image_store.release(get_db(), image_key)
+                raise
+            return jsonify({
+                'job_id': job_id,
+                'status': 'queued',
+                'status_url': url_for('food.get_scan_job', job_id=job_id),
+                'events_url': url_for('food.stream_scan_job', job_id=job_id)
+            }), 202
+        
+        body, status_code = _run_scan(g.user_id, image_data, file.filename, image_key, saved)
+        return jsonify(body), status_code
+    
+    except UploadStorageError as e:
+        return jsonify({'error': str(e)}), 507
+    except JobQueueFull as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '5'}
+    except Exception as e:
+        body, status_code = _scan_error(e)
+        headers = {'Retry-After': '5'} if status_code == 503 else {}
+        return jsonify(body), status_code, headers
+
+def _run_scan(user_id, image_data, original_filename, image_key, saved):
+    """
+    Predict, analyse and record one upload, returns (response body, status code).
+    image_key is the blob the upload was saved as (one reference is held for
+    this scan) and saved the Future of its background write.
+    """
+    db = get_db()
+    
+    try:
         # Predict food item
-        predictions = ml_service.predict(filepath)
+        predictions = ml_service.predict(image_data, filename=original_filename)
         
         if not predictions:
-            return jsonify({'error': 'Could not identify food'}), 400
+            image_store.release(db, image_key)
+            return {'error': 'Could not identify food'}, 400
         
         # Get top prediction
         top_prediction = predictions[0]
         food_name = top_prediction['food_name']
         confidence = top_prediction['confidence']
         
-        # Get nutrition data
-        nutrition_data = nutrition_service.get_nutrition_data(food_name)
-        
-        # Calculate health score
-        health_score = health_scorer.calculate_score(nutrition_data)
-        
-        # Get alternatives
-        alternatives = nutrition_service.get_healthier_alternatives(food_name)
+        # Nutrition, health score and alternatives are precomputed per food
+        template = scan_templates.get(food_name)
+        nutrition_data = template['nutrition']
+        health_score = template['health_score']
+        alternatives = template['alternatives']
         
         # Save to history
-        db = get_db()
         scan = ScanHistory(
             user_id=user_id,
             food_name=food_name,
-            image_path=filepath,
+            image_path=image_key,
             nutrition_data=nutrition_data,
             health_score=health_score,
-            alternatives=alternatives
+            alternatives=alternatives,
+            confidence=confidence,
+            model_version=ml_service.model_version
         )
-        result = db.scan_history.insert_one(scan.to_dict())
+        # Stored compactly: the per-food payload is a food_catalog entry shared by every scan of it
+        catalog_ref = food_catalog.store(db, food_name, nutrition_data, health_score, alternatives)
+        result = db.scan_history.insert_one(scan.to_compact_dict(catalog_ref))
+    except Exception:
+        image_store.release(db, image_key)
+        raise
+    
+    # From here the scan is stored: it owns the image reference and the request succeeds
+    _track_upload(saved, result.inserted_id, image_key)
+    try:
+        user_stats.record_scan(db, scan.user_id, health_score['status'])
+        daily_rollups.record_scan(db, scan.to_dict())
+    except Exception as e:
+        # Retrying would store the scan twice; rebuild-user-stats / reconcile-rollups repair the counters
+        print(f"⚠️ Counters not updated for scan {result.inserted_id}: {str(e)}")
+    
+    return _scan_body(result.inserted_id, predictions, template), 200
+
+def _scan_body(scan_id, predictions, template):
+    """Response body for one recorded scan"""
+    return {
+        'scan_id': str(scan_id),
+        'food_name': predictions[0]['food_name'],
+        'confidence': predictions[0]['confidence'],
+        'nutrition': template['nutrition'],
+        'health_score': template['health_score'],
+        'alternatives': template['alternatives'],
+        'all_predictions': predictions
+    }
+
+@bp.route('/scan/batch', methods=['POST'])
+@require_auth
+def scan_food_batch():
+    """Scan several food images (multipart field 'images') in one request"""
+    try:
+        files = request.files.getlist('images')
+        if not files:
+            return jsonify({'error': 'No image files provided'}), 400
+        
+        if len(files) > Config.SCAN_BATCH_MAX_IMAGES:
+            return jsonify({'error': f'At most {Config.SCAN_BATCH_MAX_IMAGES} images per batch'}), 400
+        
+        # A bad file only fails its own entry, the others are still scanned
+        results = [None] * len(files)
+        uploads = []  # (position, filename, bytes)
+        for i, file in enumerate(files):
+            if file.filename == '':
+                results[i] = {'error': 'No file selected'}
+            elif not allowed_file(file.filename):
+                results[i] = {'error': 'Invalid file type'}
+            else:
+                data = file.stream.getvalue() if isinstance(file.stream, io.BytesIO) else file.read()
+                uploads.append((i, file.filename, data))
+        
+        if uploads:
+            image_store.check_space(sum(len(data) for _, _, data in uploads))
+            for i, body in _run_scan_batch(g.user_id, uploads):
+                results[i] = body
         
         return jsonify({
-            'scan_id': str(result.inserted_id),
-            'food_name': food_name,
-            'confidence': confidence,
-            'nutrition': nutrition_data,
-            'health_score': health_score,
-            'alternatives': alternatives,
-            'all_predictions': predictions
+            'results': [dict(result, filename=file.filename) for file, result in zip(files, results)]
         }), 200
+    
+    except UploadStorageError as e:
+        return jsonify({'error': str(e)}), 507
+    except Exception as e:
+        body, status_code = _scan_error(e)
+        headers = {'Retry-After': '5'} if status_code == 503 else {}
+        return jsonify(body), status_code, headers
+
+def _run_scan_batch(user_id, uploads):
+    """
+    Predict, analyse and record several uploads with one forward pass and one
+    insert, returns (position, response body) pairs
+    """
+    db = get_db()
+    saved = []  # (image_key, Future of its write), one reference held for each
+    
+    try:
+        for _, filename, data in uploads:
+            saved.append(image_store.save(db, data, filename.rsplit('.', 1)[1]))
+        all_predictions = ml_service.predict_many(
+            [data for _, _, data in uploads],
+            [filename for _, filename, _ in uploads]
+        )
+    except Exception:
+        for image_key, _ in saved:
+            image_store.release(db, image_key)
+        raise
+    
+    bodies = []
+    recorded = []  # (position, scan, catalog_ref, image_key, saved, predictions, template)
+    for (i, _, _), (image_key, image_saved), predictions in zip(uploads, saved, all_predictions):
+        if isinstance(predictions, Exception) or not predictions:
+            image_store.release(db, image_key)
+            bodies.append((i, _scan_error(predictions)[0] if predictions else {'error': 'Could not identify food'}))
+            continue
+        
+        template = scan_templates.get(predictions[0]['food_name'])
+        scan = ScanHistory(
+            user_id=user_id,
+            food_name=predictions[0]['food_name'],
+            image_path=image_key,
+            nutrition_data=template['nutrition'],
+            health_score=template['health_score'],
+            alternatives=template['alternatives'],
+            confidence=predictions[0]['confidence'],
+            model_version=ml_service.model_version
+        )
+        catalog_ref = food_catalog.store(db, scan.food_name, scan.nutrition_data, scan.health_score, scan.alternatives)
+        recorded.append((i, scan, catalog_ref, image_key, image_saved, predictions, template))
+    
+    if recorded:
+        try:
+            result = db.scan_history.insert_many([scan.to_compact_dict(ref) for _, scan, ref, *_ in recorded])
+        except Exception as e:
+            # An ordered insert stops at the first error: the scans before it are stored and keep their images
+            inserted = e.details.get('nInserted', 0) if isinstance(e, BulkWriteError) else 0
+            for _, _, _, image_key, *_ in recorded[inserted:]:
+                image_store.release(db, image_key)
+            raise
+        
+        for (i, _, _, image_key, image_saved, predictions, template), scan_id in zip(recorded, result.inserted_ids):
+            _track_upload(image_saved, scan_id, image_key)
+            bodies.append((i, _scan_body(scan_id, predictions, template)))
+        
+        try:
+            user_stats.record_scans(db, ObjectId(user_id), [scan.health_score['status'] for _, scan, *_ in recorded])
+            daily_rollups.record_scans(db, [scan.to_dict() for _, scan, *_ in recorded])
+        except Exception as e:
+            # Same as _run_scan: the scans are stored, so the batch still succeeds
+            print(f"⚠️ Counters not updated for {len(recorded)} batch scan(s): {str(e)}")
+    
+    return bodies
+
+def _track_upload(saved, scan_id, image_key):
+    """If the background image write fails, record it on the scan instead of a dangling key"""
+    def on_done(future):
+        error = future.exception()
+        if error is not None:
+            db = get_db()
+            db.scan_history.update_one(
+                {'_id': scan_id},
+                {'$set': {'image_path': None, 'image_error': str(error)}}
+            )
+            image_store.release(db, image_key)
+    
+    saved.add_done_callback(on_done)
+
+def _run_scan_job(*args):
+    """Background job wrapper: errors become the same bodies the sync endpoint returns"""
+    try:
+        return _run_scan(*args)
+    except Exception as e:
+        return _scan_error(e)
+
+def _scan_error(e):
+    """Map a scan pipeline exception to (response body, status code)"""
+    if isinstance(e, InvalidImageError):
+        return {'error': str(e)}, 400
+    if isinstance(e, (InferenceQueueFull, ModelNotReady)):
+        return {'error': str(e)}, 503
+    return {'error': str(e)}, 500
+
+@bp.route('/scan/jobs/<job_id>', methods=['GET'])
+@require_auth
+def get_scan_job(job_id):
+    """Poll an asynchronous scan job"""
+    try:
+        job = scan_jobs.get(get_db(), job_id, g.user_id)
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+        
+        return jsonify(ScanJobManager.serialize(job)), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@bp.route('/scan/jobs/<job_id>/events', methods=['GET'])
+@require_auth(query_token=True)  # EventSource cannot send headers
+def stream_scan_job(job_id):
+    """Server-sent events for an asynchronous scan job, ends with the result"""
+    user_id = g.user_id
+    db = get_db()
+    job = scan_jobs.get(db, job_id, user_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    def events(job):
+        while True:
+            payload = json.dumps(ScanJobManager.serialize(job))
+            if job['status'] in ScanJobManager.TERMINAL_STATES:
+                yield f"event: result\ndata: {payload}\n\n"
+                return
+            yield f"event: status\ndata: {payload}\n\n"
+            
+            version = job['version']
+            while True:
+                job = scan_jobs.wait_for_change(db, job_id, user_id, version, Config.SCAN_JOB_KEEPALIVE_SECONDS)
+                if job is None:
+                    return
+                if job['version'] != version:
+                    break
+                yield ": keepalive\n\n"
+    
+    return Response(
+        stream_with_context(events(job)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @bp.route('/history', methods=['GET'])
+@require_auth
 def get_history():
     """Get user's scan history"""
     try:
-        # Verify authentication
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
-            return jsonify({'error': 'No token provided'}), 401
-        
-        token = auth_header.split(' ')[1]
-        user_id = verify_token(token)
-        
-        if not user_id:
-            return jsonify({'error': 'Invalid or expired token'}), 401
-        
         # Get query parameters
-        limit = int(request.args.get('limit', 20))
-        skip = int(request.args.get('skip', 0))
+        limit, cursor, full, include_total = history_params(request.args)
         
-        # Get history
+        try:
+            query = ScanHistory.page_query(g.user_oid, cursor)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # Keyset pagination: stable under new inserts, cost independent of page depth
         db = get_db()
-        scans = list(db.scan_history.find(
-            {'user_id': ObjectId(user_id)}
-        ).sort('scanned_at', -1).skip(skip).limit(limit))
+        scans, has_more = history_page(list(
+            db.scan_history.find(query, history_projection(full)).sort(HISTORY_SORT).limit(limit + 1)
+        ), limit)
         
         # Serialize scans
-        history = [ScanHistory.serialize(scan) for scan in scans]
+        if full:
+            food_catalog.hydrate_many(db, scans)
+        response = history_response(scans, has_more, full)
         
-        return jsonify({
-            'history': history,
-            'total': db.scan_history.count_documents({'user_id': ObjectId(user_id)})
-        }), 200
+        # Total comes from the maintained per-user counters, only when asked for
+        if include_total:
+            response['total'] = user_stats.get(db, g.user_oid)['total_scans']
+        
+        return jsonify(response), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @bp.route('/history/<scan_id>', methods=['GET'])
+@require_auth
 def get_scan_detail(scan_id):
     """Get detailed information about a specific scan"""
     try:
-        # Verify authentication
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
-            return jsonify({'error': 'No token provided'}), 401
-        
-        token = auth_header.split(' ')[1]
-        user_id = verify_token(token)
-        
-        if not user_id:
-            return jsonify({'error': 'Invalid or expired token'}), 401
-        
         # Get scan
         db = get_db()
         scan = db.scan_history.find_one({
             '_id': ObjectId(scan_id),
-            'user_id': ObjectId(user_id)
+            'user_id': g.user_oid
         })
         
         if not scan:
             return jsonify({'error': 'Scan not found'}), 404
         
         return jsonify({
-            'scan': ScanHistory.serialize(scan)
+            'scan': ScanHistory.serialize(food_catalog.hydrate(db, scan))
         }), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@bp.route('/insights', methods=['GET'])
-def get_insights():
-    """Get nutrition insights and statistics"""
+@bp.route('/history/<scan_id>', methods=['DELETE'])
+@require_auth
+def delete_scan(scan_id):
+    """Delete a scan and release its image"""
     try:
-        # Verify authentication
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
-            return jsonify({'error': 'No token provided'}), 401
+        db = get_db()
+        scan = db.scan_history.find_one_and_delete({
+            '_id': ObjectId(scan_id),
+            'user_id': g.user_oid
+        })
+        
+        if not scan:
+            return jsonify({'error': 'Scan not found'}), 404
         
-        token = auth_header.split(' ')[1]
-        user_id = verify_token(token)
+        food_catalog.hydrate(db, scan)
+        image_store.release(db, scan.get('image_path'))
+        user_stats.record_delete(db, scan['user_id'], scan.get('status', scan.get('health_score', {}).get('status')))
+        daily_rollups.record_delete(db, scan)
         
-        if not user_id:
-            return jsonify({'error': 'Invalid or expired token'}), 401
+        return jsonify({'message': 'Scan deleted'}), 200
         
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/insights', methods=['GET'])
+@require_auth
+def get_insights():
+    """Get nutrition insights and statistics"""
+    try:
         # Get time period
         period = request.args.get('period', 'week')  # week, month, all
+        start_date = insights_start_date(period)
         
-        # Calculate date range
-        if period == 'week':
-            start_date = datetime.utcnow() - timedelta(days=7)
-        elif period == 'month':
-            start_date = datetime.utcnow() - timedelta(days=30)
-        else:
-            start_date = datetime.utcnow() - timedelta(days=365)
-        
-        # Get scans in period
         db = get_db()
-        scans = list(db.scan_history.find({
-            'user_id': ObjectId(user_id),
-            'scanned_at': {'$gte': start_date}
-        }).sort('scanned_at', 1))
-        
-        # Calculate statistics
-        stats = ScanHistory.get_weekly_stats(scans)
-        
-        # Get daily breakdown
-        daily_data = {}
-        for scan in scans:
-            date_key = scan['scanned_at'].strftime('%Y-%m-%d')
-            if date_key not in daily_data:
-                daily_data[date_key] = {
-                    'date': date_key,
-                    'scans': 0,
-                    'calories': 0,
-                    'healthy': 0,
-                    'unhealthy': 0
-                }
-            
-            daily_data[date_key]['scans'] += 1
-            daily_data[date_key]['calories'] += scan['nutrition_data'].get('calories', 0)
-            
-            status = scan['health_score'].get('status', '')
-            if status == 'healthy':
-                daily_data[date_key]['healthy'] += 1
-            elif status == 'unhealthy':
-                daily_data[date_key]['unhealthy'] += 1
-        
-        # Convert to list
-        daily_breakdown = list(daily_data.values())
-        
-        # Get most scanned foods
-        food_counts = {}
-        for scan in scans:
-            food_name = scan['food_name']
-            food_counts[food_name] = food_counts.get(food_name, 0) + 1
+        if Config.INSIGHTS_FROM_ROLLUPS:
+            # At most one small document per day, however many scans there are
+            stats, daily_breakdown, top_foods = daily_rollups.get_insights(db, g.user_oid, start_date)
+        else:
+            # Statistics, daily breakdown and top foods in one aggregation
+            stats, daily_breakdown, top_foods = insights_from_pipeline(next(db.scan_history.aggregate(
+                ScanHistory.insights_pipeline(g.user_oid, start_date)
+            )))
         
-        top_foods = sorted(food_counts.items(), key=lambda x: x[1], reverse=True)[:5]
-        
-        return jsonify({
-            'period': period,
-            'statistics': stats,
-            'daily_breakdown': daily_breakdown,
-            'top_foods': [{'name': name, 'count': count} for name, count in top_foods]
-        }), 200
+        return jsonify(insights_response(period, stats, daily_breakdown, top_foods)), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @bp.route('/compare', methods=['POST'])
+@require_auth
 def compare_foods():
     """Compare two foods"""
     try:
-        # Verify authentication
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
-            return jsonify({'error': 'No token provided'}), 401
-        
-        token = auth_header.split(' ')[1]
-        user_id = verify_token(token)
-        
-        if not user_id:
-            return jsonify({'error': 'Invalid or expired token'}), 401
-        
         data = request.get_json()
         food1_name = data.get('food1')
         food2_name = data.get('food2')
@@ -268,16 +448,14 @@ def compare_foods():
         if not food1_name or not food2_name:
             return jsonify({'error': 'Both food names are required'}), 400
         
-        # Get nutrition data
-        nutrition1 = nutrition_service.get_nutrition_data(food1_name)
-        nutrition2 = nutrition_service.get_nutrition_data(food2_name)
-        
-        # Calculate health scores
-        score1 = health_scorer.calculate_score(nutrition1)
-        score2 = health_scorer.calculate_score(nutrition2)
+        # Nutrition data and health scores
+        template1 = scan_templates.get(food1_name)
+        template2 = scan_templates.get(food2_name)
+        nutrition1, score1 = template1['nutrition'], template1['health_score']
+        nutrition2, score2 = template2['nutrition'], template2['health_score']
         
         # Compare
-        comparison = health_scorer.compare_foods(nutrition1, nutrition2)
+        comparison = health_scorer.compare_foods(nutrition1, nutrition2, score1, score2)
         
         return jsonify({
             'food1': {
@@ -298,5 +476,59 @@ def compare_foods():
 
 @bp.route('/uploads/<filename>')
 def uploaded_file(filename):
-    """Serve uploaded files"""
-    return send_from_directory(Config.UPLOAD_FOLDER, filename)
+    """
+    Serve uploaded files (blob keys, or legacy flat upload names).
+    ?size=thumb|medium serves a resized JPEG, generated on first request.
+    """
+    if not BlobStore.is_key(filename):
+        return send_from_directory(Config.UPLOAD_FOLDER, filename, max_age=Config.IMAGE_CACHE_MAX_AGE)
+    
+    size = request.args.get('size')
+    if size and size not in Config.IMAGE_DERIVATIVE_SIZES:
+        return jsonify({'error': f"Unknown size, expected one of: {', '.join(Config.IMAGE_DERIVATIVE_SIZES)}"}), 400
+    
+    digest = filename.split('.', 1)[0]
+    if size:
+        try:
+            key = image_store.get_derivative(filename, size)
+        except Exception as e:
+            return jsonify({'error': f'Could not resize image: {e}'}), 500
+        if key is None:
+            return jsonify({'error': 'Not found'}), 404
+        # Content is fully determined by the original, size and encoder quality
+        etag = f"{digest}-{size}-q{DERIVATIVE_QUALITY}"
+    else:
+        key = filename
+        etag = digest
+    
+    path = image_store.store.local_path(key)
+    if path and Config.UPLOAD_ACCEL_REDIRECT_PREFIX:
+        # Let the front proxy send the file; it also handles Range requests
+        if not os.path.exists(path):
+            return jsonify({'error': 'Not found'}), 404
+        response = Response(mimetype=mimetypes.guess_type(key)[0])
+        response.headers['X-Accel-Redirect'] = f"{Config.UPLOAD_ACCEL_REDIRECT_PREFIX.rstrip('/')}/{BlobStore.shard_path(key)}"
+        response.set_etag(etag)
+        response = response.make_conditional(request)
+    elif path:
+        if not os.path.exists(path):
+            return jsonify({'error': 'Not found'}), 404
+        # Streams via wsgi.file_wrapper (sendfile), or X-Sendfile when USE_X_SENDFILE is on
+        response = send_file(path, etag=etag, conditional=True, max_age=Config.IMAGE_CACHE_MAX_AGE)
+    else:
+        if request.if_none_match.contains(etag):
+            # Answer revalidation without fetching the object
+            response = Response(status=304)
+            response.set_etag(etag)
+        else:
+            data = image_store.store.get(key)
+            if data is None:
+                return jsonify({'error': 'Not found'}), 404
+            response = send_file(io.BytesIO(data), download_name=key, etag=etag,
+                                 conditional=True, max_age=Config.IMAGE_CACHE_MAX_AGE)
+    
+    # Blob keys are content hashes: a URL's bytes never change
+    response.cache_control.public = True
+    response.cache_control.max_age = Config.IMAGE_CACHE_MAX_AGE
+    response.cache_control.immutable = True
+    return response
@@ -0,0 +1,125 @@
+"""
+Production Server - gunicorn with the model files read once, before forking workers
+
+The master process reads the labels and the model file and builds the scan
+templates once, then forks WEB_WORKERS workers that inherit them instead of
+reading and computing them again. The nutrition catalog is a memory-mapped
+file, so its pages come from the shared page cache in every process.
+
+The inference runtime (TensorFlow or TFLite, with its thread pools) is not
+fork-safe, so each worker builds it from the inherited model bytes after the
+fork, capped to its share of the CPU cores, and warms it up in the
+background. The TFLite interpreter runs from those bytes; Keras builds its
+own copy of the weights in every worker, then drops the bytes. Each worker
+also builds its own Flask app and MongoDB client with create_app().
+
+Asynchronous scan jobs keep their state in MongoDB, so any worker can answer
+polls and event streams. With INFERENCE_MODE=pool the model lives in
+inference_server.py and workers only connect to it.
+
+--check forks one worker the same way, loads the model in it and runs a
+prediction, then exits: 0 if the forked worker answered within WEB_TIMEOUT.
+
+Usage:
+    python serve.py [--workers N] [--threads N] [--bind HOST:PORT] [--check]
+"""
+
+import argparse
+import io
+import multiprocessing
+import os
+import time
+from PIL import Image
+from gunicorn.app.base import BaseApplication
+from config import Config
+from app import create_app
+from services.inference_backends import configure_threads
+from services.ml_service import ml_service
+from services.scan_templates import scan_templates
+
+class NutriScanServer(BaseApplication):
+    """gunicorn application that builds the Flask app in each worker"""
+
+    def __init__(self, options):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        return create_app()
+
+def tf_threads_per_worker(workers):
+    """(intra_op, inter_op) TensorFlow threads so the workers together use each core once"""
+    intra_op = Config.TF_INTRA_OP_THREADS or max(1, (os.cpu_count() or 1) // workers)
+    return intra_op, Config.TF_INTER_OP_THREADS
+
+def preload():
+    """Read the model file and nutrition/label data in the master; the runtime is built per worker"""
+    ml_service.preload()
+    scan_templates.prebuild(ml_service.labels)
+
+def post_fork(server, worker):
+    ml_service.after_fork()
+
+def _check_worker():
+    """Body of the --check child: what a gunicorn worker does, then one prediction"""
+    started = time.monotonic()
+    post_fork(None, None)
+    ml_service.wait_until_ready(Config.WEB_TIMEOUT)
+    if ml_service.state != 'ready':
+        print(f"❌ Forked worker could not load the model ({ml_service.state}: {ml_service.load_error})")
+        raise SystemExit(1)
+
+    image = io.BytesIO()
+    Image.new('RGB', (256, 256), (180, 120, 60)).save(image, format='JPEG')
+    predictions = ml_service.predict(image.getvalue(), filename='check.jpg')
+    print(f"✅ Forked worker (pid {os.getpid()}) loaded the model and predicted "
+          f"{predictions[0]['food_name']} in {time.monotonic() - started:.1f}s")
+
+def check():
+    """Fork one worker after preload() and make sure its model loads and predicts"""
+    process = multiprocessing.get_context('fork').Process(target=_check_worker)
+    process.start()
+    process.join(Config.WEB_TIMEOUT)
+    if process.is_alive():
+        process.terminate()
+        print(f"❌ Forked worker did not finish loading and predicting within {Config.WEB_TIMEOUT}s")
+        return False
+    return process.exitcode == 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='NutriScan production server')
+    parser.add_argument('--workers', type=int, default=Config.WEB_WORKERS,
+                        help='number of web worker processes')
+    parser.add_argument('--threads', type=int, default=Config.WEB_THREADS,
+                        help='request threads per worker')
+    parser.add_argument('--bind', default=Config.WEB_BIND,
+                        help='host:port or unix:PATH to listen on')
+    parser.add_argument('--check', action='store_true',
+                        help='fork one worker, load the model and predict once, then exit')
+    args = parser.parse_args()
+
+    intra_op, inter_op = tf_threads_per_worker(args.workers)
+    configure_threads(intra_op, inter_op)
+
+    if Config.PRELOAD_MODEL or args.check:
+        preload()
+
+    if args.check:
+        raise SystemExit(0 if check() else 1)
+
+    print(f"🚀 Serving on {args.bind} with {args.workers} worker(s) x {args.threads} thread(s), "
+          f"TensorFlow {intra_op} intra-op / {inter_op} inter-op thread(s) per worker")
+
+    NutriScanServer({
+        'bind': args.bind,
+        'workers': args.workers,
+        'threads': args.threads,
+        'timeout': Config.WEB_TIMEOUT,
+        'graceful_timeout': Config.WEB_GRACEFUL_TIMEOUT,
+        'keepalive': Config.WEB_KEEPALIVE,
+        'post_fork': post_fork
+    }).run()
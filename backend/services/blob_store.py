@@ -0,0 +1,314 @@
+import hashlib
+import io
+import os
+import re
+import shutil
+import threading
+import time
+from datetime import datetime, timedelta
+from PIL import Image, ImageOps
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from config import Config
+from services.upload_writer import upload_writer, UploadStorageError
+
+BLOB_KEY_PATTERN = re.compile(r'^[0-9a-f]{64}\.[a-z0-9]+$')
+DERIVATIVE_QUALITY = 85  # JPEG quality of thumbnails; part of their ETag
+DELETING_WAIT_SECONDS = 5  # how long a new reference waits for the garbage collector to finish a blob
+
+class BlobStore:
+    """
+    Content-addressed storage for uploaded images.
+    Keys are '<sha256 of the bytes>.<extension>' and are sharded by the first
+    two byte pairs of the hash, so identical bytes are stored once.
+    """
+
+    @staticmethod
+    def make_key(data, extension):
+        extension = extension.lower().lstrip('.')
+        if extension == 'jpeg':
+            extension = 'jpg'
+        return f"{hashlib.sha256(data).hexdigest()}.{extension}"
+
+    @staticmethod
+    def is_key(value):
+        return bool(value) and BLOB_KEY_PATTERN.match(value) is not None
+
+    @staticmethod
+    def derivative_key(key, size_name):
+        """'<hash>.png' -> '<hash>.thumb.jpg' (derivatives are always JPEG)"""
+        return f"{key.split('.', 1)[0]}.{size_name}.jpg"
+
+    @staticmethod
+    def shard_path(key):
+        """'abcd...' -> 'ab/cd/abcd...'"""
+        return f"{key[:2]}/{key[2:4]}/{key}"
+
+    def exists(self, key):
+        raise NotImplementedError
+
+    def put(self, key, data):
+        """Store data under key (a no-op if it is already stored)"""
+        raise NotImplementedError
+
+    def get(self, key):
+        """Return the stored bytes, or None"""
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def local_path(self, key):
+        """Filesystem path of the blob when the backend has one, else None"""
+        return None
+
+    def check_space(self, size, min_free_bytes):
+        """Raise OSError if size more bytes would leave less than min_free_bytes free"""
+        pass
+
+class LocalBlobStore(BlobStore):
+    """Blobs as files under root/ab/cd/<key>"""
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(self.root, exist_ok=True)
+
+    def local_path(self, key):
+        return os.path.join(self.root, *self.shard_path(key).split('/'))
+
+    def exists(self, key):
+        return os.path.exists(self.local_path(key))
+
+    def put(self, key, data):
+        path = self.local_path(key)
+        if os.path.exists(path):
+            return
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename so a partially written file is never served; concurrent
+        # writers of the same key (the same image uploaded twice) each use their own file
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            # Keys are content addresses: if another writer stored it, the bytes are ours
+            if os.path.exists(path):
+                return
+            raise
+
+    def get(self, key):
+        try:
+            with open(self.local_path(key), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def delete(self, key):
+        try:
+            os.remove(self.local_path(key))
+        except FileNotFoundError:
+            pass
+
+    def check_space(self, size, min_free_bytes):
+        if shutil.disk_usage(self.root).free - size < min_free_bytes:
+            raise OSError('Not enough storage space to save the image')
+
+class S3BlobStore(BlobStore):
+    """Blobs as objects in an S3-compatible bucket (AWS, MinIO, ...) under prefix/ab/cd/<key>"""
+
+    def __init__(self, bucket, prefix='', endpoint_url=None):
+        try:
+            import boto3
+        except ImportError:
+            raise ImportError("S3 blob store requires boto3 (pip install boto3)")
+
+        self.bucket = bucket
+        self.prefix = prefix.strip('/')
+        self.client = boto3.client('s3', endpoint_url=endpoint_url)
+
+    def _object_key(self, key):
+        path = self.shard_path(key)
+        return f"{self.prefix}/{path}" if self.prefix else path
+
+    def exists(self, key):
+        from botocore.exceptions import ClientError
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._object_key(key))
+            return True
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return False
+            raise
+
+    def put(self, key, data):
+        if self.exists(key):
+            return
+        self.client.put_object(Bucket=self.bucket, Key=self._object_key(key), Body=data)
+
+    def get(self, key):
+        from botocore.exceptions import ClientError
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=self._object_key(key))
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return None
+            raise
+        return response['Body'].read()
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=self._object_key(key))
+
+def create_blob_store():
+    """Build the blob store selected by Config.BLOB_STORE"""
+    if Config.BLOB_STORE == 'local':
+        return LocalBlobStore(Config.BLOB_STORE_ROOT)
+    if Config.BLOB_STORE == 's3':
+        return S3BlobStore(Config.S3_BUCKET, prefix=Config.S3_PREFIX, endpoint_url=Config.S3_ENDPOINT_URL)
+    raise ValueError(f"Unknown blob store '{Config.BLOB_STORE}' (expected local or s3)")
+
+class ImageStore:
+    """
+    Reference-counted images on top of a BlobStore.
+    The 'blobs' collection holds one document per key with the number of
+    scans referencing it. Blobs whose count drops to zero are only deleted
+    by collect_garbage() after a grace period, so re-uploading the same
+    bytes shortly after a scan is deleted still finds the stored file.
+    """
+
+    def __init__(self, store, writer):
+        self.store = store
+        self.writer = writer
+        self._derivative_locks = {}
+        self._locks_lock = threading.Lock()
+
+    def check_space(self, size):
+        """Raise UploadStorageError if an upload of size bytes cannot be stored"""
+        self.writer.check_space(self.store, size)
+
+    def save(self, db, data, extension):
+        """
+        Reference the image (storing it if new) and return (key, Future of the write).
+        The write runs in the background through the upload writer.
+        """
+        key = BlobStore.make_key(data, extension)
+        self._reference(db, key, len(data))
+        return key, self.writer.submit(self.store, key, data)
+
+    def import_file(self, db, path):
+        """Store an existing image file synchronously and reference it, returns the key"""
+        with open(path, 'rb') as f:
+            data = f.read()
+
+        key = BlobStore.make_key(data, path.rsplit('.', 1)[-1])
+        self.store.put(key, data)
+        self._reference(db, key, len(data))
+        return key
+
+    def add_reference(self, db, key, size):
+        """Take one more reference on an already stored image of size bytes"""
+        self._reference(db, key, size)
+
+    def _reference(self, db, key, size):
+        # A blob marked as deleting is not revived: once the collector has removed its
+        # files and document the upsert creates a fresh one and the bytes are written again
+        deadline = time.monotonic() + DELETING_WAIT_SECONDS
+        while True:
+            try:
+                db.blobs.update_one(
+                    {'_id': key, 'deleting': {'$exists': False}},
+                    {
+                        '$inc': {'refs': 1},
+                        '$setOnInsert': {'size': size, 'created_at': datetime.utcnow()},
+                        '$unset': {'orphaned_at': ''}
+                    },
+                    upsert=True
+                )
+                return
+            except DuplicateKeyError:
+                if time.monotonic() > deadline:
+                    raise UploadStorageError('The image is being cleaned up, please try again')
+                time.sleep(0.05)
+
+    def release(self, db, key):
+        """Drop one reference; unreferenced blobs become eligible for garbage collection"""
+        if not BlobStore.is_key(key):
+            return
+
+        result = db.blobs.find_one_and_update(
+            {'_id': key},
+            {'$inc': {'refs': -1}},
+            return_document=ReturnDocument.AFTER
+        )
+        if result and result['refs'] <= 0:
+            db.blobs.update_one(
+                {'_id': key, 'refs': {'$lte': 0}},
+                {'$set': {'orphaned_at': datetime.utcnow()}}
+            )
+
+    def get_derivative(self, key, size_name):
+        """
+        Key of a resized JPEG of the image (size from Config.IMAGE_DERIVATIVE_SIZES),
+        generating and storing it on first request. None if the original is missing.
+        """
+        derived = BlobStore.derivative_key(key, size_name)
+        if self.store.exists(derived):
+            return derived
+
+        # One generation per derivative at a time in this process
+        with self._locks_lock:
+            lock = self._derivative_locks.setdefault(derived, threading.Lock())
+
+        with lock:
+            try:
+                if self.store.exists(derived):
+                    return derived
+
+                data = self.store.get(key)
+                if data is None:
+                    return None
+
+                self.store.put(derived, self._resize(data, Config.IMAGE_DERIVATIVE_SIZES[size_name]))
+                return derived
+            finally:
+                with self._locks_lock:
+                    self._derivative_locks.pop(derived, None)
+
+    @staticmethod
+    def _resize(data, max_side):
+        """Downscale to fit max_side x max_side, encoded as JPEG"""
+        with Image.open(io.BytesIO(data)) as img:
+            img.draft('RGB', (max_side, max_side))  # JPEG: decode at reduced scale
+            img = ImageOps.exif_transpose(img).convert('RGB')
+            img.thumbnail((max_side, max_side))
+
+            output = io.BytesIO()
+            img.save(output, format='JPEG', quality=DERIVATIVE_QUALITY, optimize=True)
+            return output.getvalue()
+
+    def collect_garbage(self, db, grace_seconds):
+        """Delete blobs unreferenced for longer than grace_seconds, returns how many"""
+        cutoff = datetime.utcnow() - timedelta(seconds=grace_seconds)
+        deleted = 0
+
+        unreferenced = {'refs': {'$lte': 0}, 'orphaned_at': {'$lte': cutoff}}
+        for doc in db.blobs.find(unreferenced, {'_id': 1}):
+            # Mark it atomically (a new reference may have arrived since the find), then
+            # remove the files before the document so a new upload never finds a dying file
+            result = db.blobs.update_one({'_id': doc['_id'], **unreferenced}, {'$set': {'deleting': True}})
+            if result.matched_count:
+                self.store.delete(doc['_id'])
+                for size_name in Config.IMAGE_DERIVATIVE_SIZES:
+                    self.store.delete(BlobStore.derivative_key(doc['_id'], size_name))
+                db.blobs.delete_one({'_id': doc['_id'], 'deleting': True})
+                deleted += 1
+
+        return deleted
+
+# Global instance
+image_store = ImageStore(create_blob_store(), upload_writer)
@@ -0,0 +1,275 @@
+import hashlib
+from datetime import datetime, timedelta
+from pymongo import ReplaceOne, UpdateOne
+from models.scan_history import ScanHistory
+from services.nutrition_catalog import NUTRIENT_COLUMNS
+
+STATUSES = ('healthy', 'moderate', 'unhealthy')
+
+class DailyRollups:
+    """
+    Per-user, per-day scan totals in 'scan_daily_rollups', one document per
+    (user_id, day) with day the UTC midnight of the scans it covers:
+
+        {user_id, day, date: 'YYYY-MM-DD', scans,
+         nutrients: {calories: total, ...}, statuses: {healthy: n, ...},
+         foods: {<key>: {name, count, first_scanned}}}
+
+    Food names are user-visible strings, so they are keyed by a hash (field
+    names must not contain '.' or start with '$'). Documents are upserted as
+    scans are inserted and decremented when scans are deleted; reconcile()
+    rebuilds them from scan_history.
+    """
+
+    @staticmethod
+    def day_of(moment):
+        return datetime(moment.year, moment.month, moment.day)
+
+    @staticmethod
+    def food_key(food_name):
+        return hashlib.sha1(food_name.encode('utf-8')).hexdigest()[:16]
+
+    @staticmethod
+    def _amount(value):
+        return value if isinstance(value, (int, float)) and not isinstance(value, bool) else 0
+
+    def _update(self, scan, sign):
+        """Increments for adding (sign=1) or removing (sign=-1) one scan"""
+        nutrition = scan.get('nutrition_data') or {}
+        status = scan.get('status', (scan.get('health_score') or {}).get('status'))
+        food = f"foods.{self.food_key(scan['food_name'])}"
+
+        inc = {'scans': sign, f'{food}.count': sign}
+        for nutrient in NUTRIENT_COLUMNS:
+            inc[f'nutrients.{nutrient}'] = sign * self._amount(nutrition.get(nutrient, 0))
+        if status in STATUSES:
+            inc[f'statuses.{status}'] = sign
+        return inc, food
+
+    def _upsert(self, scan):
+        """(filter, update) adding one scan document to its day"""
+        day = self.day_of(scan['scanned_at'])
+        inc, food = self._update(scan, 1)
+        return {'user_id': scan['user_id'], 'day': day}, {
+            '$inc': inc,
+            '$min': {f'{food}.first_scanned': scan['scanned_at']},
+            '$set': {f'{food}.name': scan['food_name']},
+            '$setOnInsert': {'date': day.strftime('%Y-%m-%d')}
+        }
+
+    def record_scan(self, db, scan):
+        """Add an inserted scan document to its day"""
+        db.scan_daily_rollups.update_one(*self._upsert(scan), upsert=True)
+
+    def record_scans(self, db, scans):
+        """Add several inserted scan documents in one round trip (applied in order)"""
+        operations = [UpdateOne(*self._upsert(scan), upsert=True) for scan in scans]
+        if operations:
+            db.scan_daily_rollups.bulk_write(operations, ordered=True)
+
+    def record_delete(self, db, scan):
+        """Remove a deleted (hydrated) scan document from its day"""
+        inc, _ = self._update(scan, -1)
+        db.scan_daily_rollups.update_one(
+            {'user_id': scan['user_id'], 'day': self.day_of(scan['scanned_at'])},
+            {'$inc': inc}
+        )
+
+    def from_scans(self, db, match):
+        """
+        Rollup documents computed from scan_history for the scans matching match,
+        ordered by user and day. Nothing is written.
+        """
+        return self._assemble(db.scan_history.aggregate(self._scans_pipeline(match), allowDiskUse=True))
+
+    @staticmethod
+    def _scans_pipeline(match):
+        """Per user, day and food totals of the scans matching match"""
+        group = {
+            '_id': {
+                'user_id': '$user_id',
+                'date': {'$dateToString': {'format': '%Y-%m-%d', 'date': '$scanned_at'}},
+                'food_name': '$food_name'
+            },
+            'count': {'$sum': 1},
+            'first_scanned': {'$min': '$scanned_at'}
+        }
+        for nutrient in NUTRIENT_COLUMNS:
+            group[nutrient] = {'$sum': {'$ifNull': [f'$nutrition_data.{nutrient}', 0]}}
+        for status in STATUSES:
+            group[status] = {'$sum': {'$cond': [{'$eq': ['$status', status]}, 1, 0]}}
+
+        return [
+            {'$match': match},
+            *ScanHistory.hydrate_stages(),
+            {'$group': group},
+            {'$sort': {'_id.user_id': 1, '_id.date': 1}}
+        ]
+
+    def _assemble(self, rows):
+        """Rollup documents from _scans_pipeline() rows (ordered by user and day)"""
+        current = None
+        for row in rows:
+            user_id, date, food_name = row['_id']['user_id'], row['_id']['date'], row['_id']['food_name']
+            if current is None or (current['user_id'], current['date']) != (user_id, date):
+                if current is not None:
+                    yield current
+                current = {
+                    'user_id': user_id,
+                    'day': datetime.strptime(date, '%Y-%m-%d'),
+                    'date': date,
+                    'scans': 0,
+                    'nutrients': {nutrient: 0 for nutrient in NUTRIENT_COLUMNS},
+                    'statuses': {status: 0 for status in STATUSES},
+                    'foods': {}
+                }
+
+            current['scans'] += row['count']
+            for nutrient in NUTRIENT_COLUMNS:
+                current['nutrients'][nutrient] += row[nutrient]
+            for status in STATUSES:
+                current['statuses'][status] += row[status]
+            current['foods'][self.food_key(food_name)] = {
+                'name': food_name,
+                'count': row['count'],
+                'first_scanned': row['first_scanned']
+            }
+
+        if current is not None:
+            yield current
+
+    def get_insights(self, db, user_id, start_date):
+        """
+        (statistics, daily_breakdown, top_foods) for /insights over scans since
+        start_date. Whole days come from the rollups; the first, partial day is
+        aggregated from the raw scans so the cut-off stays exact.
+        """
+        scan_match, rollup_query = self._insights_queries(user_id, start_date)
+        days = list(self.from_scans(db, scan_match))
+        days.extend(db.scan_daily_rollups.find(*rollup_query).sort('day', 1))
+        return self.summarize(days)
+
+    async def get_insights_async(self, db, user_id, start_date):
+        """get_insights() on an async (Motor) database"""
+        scan_match, rollup_query = self._insights_queries(user_id, start_date)
+        rows = await db.scan_history.aggregate(self._scans_pipeline(scan_match)).to_list(None)
+        days = list(self._assemble(rows))
+        days.extend(await db.scan_daily_rollups.find(*rollup_query).sort('day', 1).to_list(None))
+        return self.summarize(days)
+
+    def _insights_queries(self, user_id, start_date):
+        """(raw scan match for the partial first day, (filter, projection) for the whole days)"""
+        next_day = self.day_of(start_date) + timedelta(days=1)
+        return (
+            {'user_id': user_id, 'scanned_at': {'$gte': start_date, '$lt': next_day}},
+            (
+                {'user_id': user_id, 'day': {'$gte': next_day}},
+                {'_id': 0, 'date': 1, 'scans': 1, 'nutrients.calories': 1, 'statuses': 1, 'foods': 1}
+            )
+        )
+
+    @staticmethod
+    def summarize(days):
+        """Combine rollup documents (in day order) into the /insights response parts"""
+        total_scans = total_calories = healthy = unhealthy = 0
+        daily_breakdown = []
+        foods = {}
+
+        for day in days:
+            if day.get('scans', 0) <= 0:
+                continue  # every scan of the day was deleted
+            statuses = day.get('statuses', {})
+            calories = day.get('nutrients', {}).get('calories', 0)
+
+            total_scans += day['scans']
+            total_calories += calories
+            healthy += statuses.get('healthy', 0)
+            unhealthy += statuses.get('unhealthy', 0)
+            daily_breakdown.append({
+                'date': day['date'],
+                'scans': day['scans'],
+                'calories': calories,
+                'healthy': statuses.get('healthy', 0),
+                'unhealthy': statuses.get('unhealthy', 0)
+            })
+
+            for food in day.get('foods', {}).values():
+                if food.get('count', 0) <= 0:
+                    continue
+                entry = foods.setdefault(food['name'], {'count': 0, 'first_scanned': food['first_scanned']})
+                entry['count'] += food['count']
+                entry['first_scanned'] = min(entry['first_scanned'], food['first_scanned'])
+
+        statistics = ScanHistory.stats_from_totals({
+            'total_scans': total_scans,
+            'total_calories': total_calories,
+            'healthy_count': healthy,
+            'unhealthy_count': unhealthy
+        })
+
+        # Most scanned first; ties go to the food scanned first
+        ranked = sorted(foods.items(), key=lambda item: (-item[1]['count'], item[1]['first_scanned'], item[0]))
+        top_foods = [{'name': name, 'count': food['count']} for name, food in ranked[:5]]
+
+        return statistics, daily_breakdown, top_foods
+
+    def reconcile(self, db, user_id=None, since=None, dry_run=False, batch_size=500):
+        """
+        Compare rollups with the raw scans (optionally one user's, from the day
+        of since onwards) and rewrite every day that differs; rollup days
+        without scans are deleted. Returns {'checked', 'fixed', 'removed'}.
+        """
+        match, rollup_match = {}, {}
+        if user_id is not None:
+            match['user_id'] = rollup_match['user_id'] = user_id
+        if since is not None:
+            match['scanned_at'] = rollup_match['day'] = {'$gte': self.day_of(since)}
+
+        result = {'checked': 0, 'fixed': 0, 'removed': 0}
+        seen = set()
+        operations = []
+
+        for expected in self.from_scans(db, match):
+            key = {'user_id': expected['user_id'], 'day': expected['day']}
+            seen.add((expected['user_id'], expected['day']))
+            result['checked'] += 1
+
+            actual = db.scan_daily_rollups.find_one(key, {'_id': 0})
+            if self._normalize(actual) == self._normalize(expected):
+                continue
+
+            result['fixed'] += 1
+            operations.append(ReplaceOne(key, expected, upsert=True))
+            if len(operations) >= batch_size and not dry_run:
+                db.scan_daily_rollups.bulk_write(operations, ordered=False)
+                operations = []
+
+        if operations and not dry_run:
+            db.scan_daily_rollups.bulk_write(operations, ordered=False)
+
+        # Rollup days in the same range that no longer have any scans
+        for doc in db.scan_daily_rollups.find(rollup_match, {'user_id': 1, 'day': 1}):
+            if (doc['user_id'], doc['day']) not in seen:
+                result['removed'] += 1
+                if not dry_run:
+                    db.scan_daily_rollups.delete_one({'_id': doc['_id']})
+
+        return result
+
+    @staticmethod
+    def _normalize(doc):
+        """Comparable form of a rollup document (zero counters and float noise ignored)"""
+        if doc is None:
+            return None
+        return (
+            doc.get('scans', 0),
+            tuple(round(doc.get('nutrients', {}).get(n, 0), 6) for n in NUTRIENT_COLUMNS),
+            tuple(doc.get('statuses', {}).get(s, 0) for s in STATUSES),
+            tuple(sorted(
+                (key, food.get('name'), food.get('count'), food.get('first_scanned'))
+                for key, food in doc.get('foods', {}).items() if food.get('count', 0) > 0
+            ))
+        )
+
+# Global instance
+daily_rollups = DailyRollups()
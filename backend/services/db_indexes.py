@@ -0,0 +1,105 @@
+from datetime import datetime
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+class IndexVerificationError(Exception):
+    """Raised when a hot query would not use an index"""
+    pass
+
+# Indexes every deployment needs, by collection
+INDEXES = {
+    'scan_history': [
+        # /history keyset pages, /insights, stats rebuilds: one user's scans, newest first
+        IndexModel([('user_id', ASCENDING), ('scanned_at', DESCENDING), ('_id', DESCENDING)], name='user_scanned_at_id'),
+    ],
+    'users': [
+        # login and registration
+        IndexModel([('email', ASCENDING)], name='email_unique', unique=True),
+    ],
+    'scan_daily_rollups': [
+        # /insights: one document per user and day
+        IndexModel([('user_id', ASCENDING), ('day', ASCENDING)], name='user_day', unique=True),
+    ],
+    'scan_jobs': [
+        # asynchronous scan jobs disappear ttl seconds after their last change
+        IndexModel([('expires_at', ASCENDING)], name='expires', expireAfterSeconds=0),
+    ],
+    'blobs': [
+        # gc-blobs: unreferenced images past the grace period
+        IndexModel([('refs', ASCENDING), ('orphaned_at', ASCENDING)], name='orphaned'),
+    ],
+}
+
+# Indexes superseded by the ones above, dropped by ensure_indexes()
+OBSOLETE_INDEXES = {
+    'scan_history': ['user_scanned_at'],
+}
+
+def hot_queries():
+    """
+    (name, collection, filter, sort) for the queries the routes run on every
+    request. Placeholder values only need the right types for the planner.
+    """
+    user_id = ObjectId()
+    now = datetime.utcnow()
+    return [
+        ('history first page', 'scan_history', {'user_id': user_id}, [('scanned_at', DESCENDING), ('_id', DESCENDING)]),
+        ('history next page', 'scan_history', {
+            'user_id': user_id,
+            '$or': [{'scanned_at': {'$lt': now}}, {'scanned_at': now, '_id': {'$lt': ObjectId()}}]
+        }, [('scanned_at', DESCENDING), ('_id', DESCENDING)]),
+        ('scan detail', 'scan_history', {'_id': ObjectId(), 'user_id': user_id}, None),
+        ('insights', 'scan_history', {'user_id': user_id, 'scanned_at': {'$gte': now}}, [('scanned_at', ASCENDING)]),
+        ('insights rollups', 'scan_daily_rollups', {'user_id': user_id, 'day': {'$gte': now}}, [('day', ASCENDING)]),
+        ('login', 'users', {'email': 'someone@example.com'}, None),
+        ('user by id', 'users', {'_id': user_id}, None),
+        ('user stats', 'user_stats', {'_id': user_id}, None),
+        ('scan job', 'scan_jobs', {'_id': 'job-id', 'user_id': str(user_id)}, None),
+        ('blob gc', 'blobs', {'refs': {'$lte': 0}, 'orphaned_at': {'$lte': now}}, None),
+    ]
+
+def ensure_indexes(db):
+    """Create any missing indexes and drop obsolete ones, returns the index names"""
+    names = []
+    for collection, indexes in INDEXES.items():
+        names.extend(db[collection].create_indexes(indexes))
+
+    for collection, obsolete in OBSOLETE_INDEXES.items():
+        existing = db[collection].index_information()
+        for name in obsolete:
+            if name in existing:
+                db[collection].drop_index(name)
+    return names
+
+def _plan_stages(plan):
+    """Every 'stage' named anywhere in an explain() plan tree"""
+    if isinstance(plan, dict):
+        if 'stage' in plan:
+            yield plan['stage']
+        for value in plan.values():
+            yield from _plan_stages(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            yield from _plan_stages(value)
+
+def verify_query_plans(db):
+    """
+    explain() every hot query and raise IndexVerificationError if any would
+    scan the whole collection or sort in memory. Returns {name: stages}.
+    """
+    plans, problems = {}, []
+    for name, collection, query, sort in hot_queries():
+        cursor = db[collection].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        stages = list(_plan_stages(cursor.explain().get('queryPlanner', {}).get('winningPlan', {})))
+        plans[name] = stages
+
+        if 'COLLSCAN' in stages:
+            problems.append(f"{name} ({collection}): COLLSCAN")
+        elif sort and 'SORT' in stages:
+            problems.append(f"{name} ({collection}): in-memory SORT")
+
+    if problems:
+        raise IndexVerificationError('Queries not served by an index: ' + '; '.join(problems))
+    return plans
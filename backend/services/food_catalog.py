@@ -0,0 +1,135 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from pymongo.errors import DuplicateKeyError
+from config import Config
+from services.scan_templates import freeze
+
+class FoodCatalog:
+    """
+    Versioned per-food scan payloads in the 'food_catalog' collection:
+
+        {_id: <version>, food_name, nutrition_data, health_score, alternatives, created_at}
+
+    The _id is a hash of the content, so entries never change: new nutrition
+    data or scoring rules produce a new version, and older scans keep pointing
+    at the one they were scored against. Compact scan documents store only that
+    reference (catalog_ref); hydrate() fills the payload back in from an
+    in-process LRU of entries.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0}
+
+    @staticmethod
+    def version_of(food_name, nutrition_data, health_score, alternatives):
+        content = json.dumps(
+            [food_name, nutrition_data, health_score, alternatives],
+            sort_keys=True, separators=(',', ':'), default=str
+        )
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()[:24]
+
+    def _remember(self, version, entry):
+        with self._lock:
+            self._entries[version] = entry
+            self._entries.move_to_end(version)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def store(self, db, food_name, nutrition_data, health_score, alternatives):
+        """Version of this payload, inserting the catalog entry if it is new"""
+        version = self.version_of(food_name, nutrition_data, health_score, alternatives)
+        with self._lock:
+            if version in self._entries:
+                return version
+
+        entry = {
+            'food_name': food_name,
+            'nutrition_data': nutrition_data,
+            'health_score': health_score,
+            'alternatives': list(alternatives or [])
+        }
+        try:
+            db.food_catalog.insert_one(dict(entry, _id=version, created_at=datetime.utcnow()))
+        except DuplicateKeyError:
+            pass  # stored earlier (or by another worker), content is identical
+        self._remember(version, freeze(entry))
+        return version
+
+    def _cached(self, versions):
+        """({version: entry} already in memory, set of versions that are not)"""
+        found, missing = {}, set()
+        with self._lock:
+            for version in versions:
+                entry = self._entries.get(version)
+                if entry is None:
+                    missing.add(version)
+                else:
+                    self._entries.move_to_end(version)
+                    found[version] = entry
+            self._stats['hits'] += len(found)
+            self._stats['misses'] += len(missing)
+        return found, missing
+
+    @staticmethod
+    def _missing_query(missing):
+        return {'_id': {'$in': list(missing)}}, {'created_at': 0}
+
+    def _add_docs(self, found, docs):
+        """Cache catalog documents read from the database and add them to found"""
+        for doc in docs:
+            entry = freeze({key: value for key, value in doc.items() if key != '_id'})
+            self._remember(doc['_id'], entry)
+            found[doc['_id']] = entry
+        return found
+
+    def get_many(self, db, versions):
+        """{version: entry} for the given versions, reading only uncached ones from the database"""
+        found, missing = self._cached(versions)
+        if missing:
+            self._add_docs(found, db.food_catalog.find(*self._missing_query(missing)))
+        return found
+
+    def hydrate_many(self, db, scans):
+        """Fill nutrition_data, health_score and alternatives into compact scan documents (in place)"""
+        versions = {scan['catalog_ref'] for scan in scans if scan.get('catalog_ref')}
+        if versions:
+            self._apply(scans, self.get_many(db, versions))
+        return scans
+
+    async def hydrate_many_async(self, db, scans):
+        """hydrate_many() on an async (Motor) database"""
+        versions = {scan['catalog_ref'] for scan in scans if scan.get('catalog_ref')}
+        if versions:
+            found, missing = self._cached(versions)
+            if missing:
+                self._add_docs(found, await db.food_catalog.find(*self._missing_query(missing)).to_list(None))
+            self._apply(scans, found)
+        return scans
+
+    @staticmethod
+    def _apply(scans, entries):
+        for scan in scans:
+            entry = entries.get(scan.get('catalog_ref'))
+            if entry is not None:
+                scan['nutrition_data'] = entry['nutrition_data']
+                scan['health_score'] = entry['health_score']
+                scan['alternatives'] = entry['alternatives']
+
+    def hydrate(self, db, scan):
+        """hydrate_many() for a single scan document, returns it"""
+        if scan is not None:
+            self.hydrate_many(db, [scan])
+        return scan
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self._stats, cached=len(self._entries))
+
+# Global instance
+food_catalog = FoodCatalog(max_entries=Config.FOOD_CATALOG_CACHE_ENTRIES)
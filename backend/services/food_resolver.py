@@ -0,0 +1,143 @@
+import heapq
+import re
+from collections import Counter, defaultdict
+from functools import lru_cache
+
+# Common names and model labels -> canonical food names
+FOOD_ALIASES = {
+    'fries': 'french fries',
+    'burger': 'hamburger',
+    'cheeseburger': 'hamburger',
+    'doughnut': 'donut',
+    'icecream': 'ice cream',
+    'hotdog': 'hot dog',
+    'pasta': 'spaghetti',
+    'salmon': 'grilled salmon',
+    'wings': 'chicken wings',
+    'pancake': 'pancakes',
+    'waffle': 'waffles',
+    'taco': 'tacos',
+}
+
+_SEPARATORS = re.compile(r'[\s_\-]+')
+
+class FoodResolver:
+    """
+    Maps free-form food names (model labels like 'french_fries', user input)
+    to the canonical names of a food table.
+
+    Matching, in order of preference:
+      1. exact match after normalization
+      2. alias (only if the alias target is in the table)
+      3. token containment: every token of one name appears in the other
+         (a table entry contained in the query ranks above the reverse)
+      4. character trigram similarity (Dice coefficient) >= min_similarity
+
+    Candidates come from a token index and a trigram index, so a lookup only
+    scores names sharing something with the query. Ties are broken by name,
+    so the result never depends on table order. Lookups are memoized.
+    """
+
+    MAX_TRIGRAM_CANDIDATES = 50
+
+    def __init__(self, names, aliases=None, min_similarity=0.6, cache_size=4096):
+        self.min_similarity = min_similarity
+        self._exact = {}
+        self._tokens = {}
+        self._trigram_counts = {}
+        self._token_index = defaultdict(set)
+        self._trigram_index = defaultdict(set)
+
+        for name in names:
+            normalized = self.normalize(name)
+            if not normalized or normalized in self._exact:
+                continue
+            self._exact[normalized] = name
+
+            tokens = frozenset(self._stem(t) for t in normalized.split())
+            self._tokens[name] = tokens
+            for token in tokens:
+                self._token_index[token].add(name)
+
+            trigrams = self._trigrams(normalized)
+            self._trigram_counts[name] = len(trigrams)
+            for trigram in trigrams:
+                self._trigram_index[trigram].add(name)
+
+        self._aliases = {}
+        for alias, target in (aliases or {}).items():
+            target = self._exact.get(self.normalize(target))
+            if target is not None:
+                self._aliases[self.normalize(alias)] = target
+
+        self.resolve = lru_cache(maxsize=cache_size)(self._resolve)
+
+    @staticmethod
+    def normalize(name):
+        """'Rice_bath' -> 'rice bath'"""
+        return _SEPARATORS.sub(' ', str(name).lower()).strip()
+
+    @staticmethod
+    def _stem(token):
+        """Crude plural folding so 'tacos' and 'taco' share a token"""
+        return token[:-1] if len(token) > 3 and token.endswith('s') else token
+
+    @staticmethod
+    def _trigrams(normalized):
+        padded = f" {normalized} "
+        return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+    def resolve_exact(self, name):
+        """Canonical table name for an exact or alias match only, or None"""
+        normalized = self.normalize(name)
+        return self._exact.get(normalized) or self._aliases.get(normalized)
+
+    def _resolve(self, name):
+        """Canonical table name for name, or None"""
+        normalized = self.normalize(name)
+        if not normalized:
+            return None
+
+        if normalized in self._exact:
+            return self._exact[normalized]
+        if normalized in self._aliases:
+            return self._aliases[normalized]
+
+        query_tokens = frozenset(self._stem(t) for t in normalized.split())
+        query_trigrams = self._trigrams(normalized)
+
+        # Shared trigrams per candidate (the trigram sets are deduplicated,
+        # so this count is exactly the size of the intersection)
+        shared = Counter()
+        for trigram in query_trigrams:
+            shared.update(self._trigram_index.get(trigram, ()))
+
+        candidates = set()
+        for token in query_tokens:
+            candidates.update(self._token_index.get(token, ()))
+        candidates.update(
+            key for key, _ in heapq.nsmallest(self.MAX_TRIGRAM_CANDIDATES, shared.items(), key=lambda item: (-item[1], item[0]))
+        )
+
+        best, best_rank = None, None
+        for key in candidates:
+            key_tokens = self._tokens[key]
+            if key_tokens <= query_tokens:
+                containment = 2
+            elif query_tokens <= key_tokens:
+                containment = 1
+            else:
+                containment = 0
+
+            similarity = 2.0 * shared[key] / (len(query_trigrams) + self._trigram_counts[key])
+            if containment == 0 and similarity < self.min_similarity:
+                continue
+
+            rank = (-containment, -similarity, key)
+            if best_rank is None or rank < best_rank:
+                best, best_rank = key, rank
+
+        return best
+
+    def cache_info(self):
+        return self.resolve.cache_info()
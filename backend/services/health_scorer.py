@@ -1,4 +1,6 @@
+import numpy as np
 from config import Config
+from services.nutrition_catalog import NUTRIENT_COLUMNS
 
 class HealthScorer:
     """Service for calculating health scores"""
@@ -33,7 +35,7 @@ class HealthScorer:
         overall_score = sum(scores.values()) / len(scores)
         
         # Determine status
-        status = self._determine_status(scores, nutrition_data)
+        status = self._determine_status(overall_score, nutrition_data)
         
         # Generate reasons
         reasons = self._generate_reasons(nutrition_data, scores)
@@ -109,10 +111,8 @@ class HealthScorer:
         else:
             return 40
     
-    def _determine_status(self, scores, nutrition_data):
+    def _determine_status(self, avg_score, nutrition_data):
         """Determine overall health status"""
-        avg_score = sum(scores.values()) / len(scores)
-        
         # Check critical thresholds
         calories = nutrition_data.get('calories', 0)
         sugar = nutrition_data.get('sugar', 0)
@@ -202,10 +202,83 @@ class HealthScorer:
         }
         return emoji_map.get(status, '❓')
     
-    def compare_foods(self, food1_nutrition, food2_nutrition):
-        """Compare two foods and return which is healthier"""
-        score1 = self.calculate_score(food1_nutrition)
-        score2 = self.calculate_score(food2_nutrition)
+    def score_batch(self, values, columns=NUTRIENT_COLUMNS):
+        """
+        Score N foods at once.
+        values: N x len(columns) array of nutrient amounts (missing nutrients count as 0)
+        Returns arrays equal to what calculate_score gives row by row:
+        {'score', 'average' (unrounded), 'status', 'detailed_scores': {nutrient: array}}
+        """
+        values = np.asarray(values, dtype=np.float64).reshape(-1, len(columns))
+        zeros = np.zeros(len(values))
+        column = {name: values[:, i] for i, name in enumerate(columns)}
+        get = lambda name: column.get(name, zeros)
+        
+        moderate = self.moderate_thresholds
+        calories, sugar, fat, sodium = get('calories'), get('sugar'), get('fat'), get('sodium')
+        
+        # Same piecewise functions as the _score_* methods
+        scores = {
+            'calories': self._limit_scores(calories, 'calories', np.maximum(0, 60 - (calories - moderate['calories']) / 10)),
+            'sugar': self._limit_scores(sugar, 'sugar', np.maximum(0, 60 - (sugar - moderate['sugar']) * 2)),
+            'fat': self._limit_scores(fat, 'fat', np.maximum(0, 60 - (fat - moderate['fat']) * 2)),
+            'sodium': self._limit_scores(sodium, 'sodium', np.maximum(0, 60 - (sodium - moderate['sodium']) / 20)),
+            'protein': np.select([get('protein') >= 20, get('protein') >= 10, get('protein') >= 5], [100.0, 80.0, 60.0], 40.0),
+            'fiber': np.select([get('fiber') >= 5, get('fiber') >= 3, get('fiber') >= 1], [100.0, 80.0, 60.0], 40.0)
+        }
+        
+        # Add in the scalar path's order so the floating point sums are identical
+        total = zeros.copy()
+        for name in ('calories', 'sugar', 'fat', 'sodium', 'protein', 'fiber'):
+            total += scores[name]
+        average = total / len(scores)
+        
+        critical = (calories > moderate['calories']) | (sugar > moderate['sugar']) | (fat > moderate['fat'])
+        status = np.where(
+            critical | (average < 60), 'unhealthy',
+            np.where(average >= 80, 'healthy', 'moderate')
+        )
+        
+        return {
+            'score': self._round_scores(average),
+            'average': average,
+            'status': status,
+            'detailed_scores': scores
+        }
+    
+    def _limit_scores(self, values, nutrient, above_moderate):
+        """100 up to the healthy threshold, 60 up to the moderate one, then the penalized score"""
+        return np.where(
+            values <= self.healthy_thresholds[nutrient], 100.0,
+            np.where(values <= self.moderate_thresholds[nutrient], 60.0, above_moderate)
+        )
+    
+    @staticmethod
+    def _round_scores(values):
+        """round(value, 1) element-wise, exactly as Python rounds"""
+        rounded = np.round(values, 1)
+        # np.round scales by 10 before rounding, which can land on the other side
+        # of a tie than Python's correctly rounded round(); redo those with round()
+        scaled = values * 10
+        for i in np.flatnonzero(np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6):
+            rounded[i] = round(float(values[i]), 1)
+        return rounded
+    
+    @staticmethod
+    def nutrition_matrix(nutrition_rows, columns=NUTRIENT_COLUMNS):
+        """Stack nutrition dicts into the array score_batch expects"""
+        return np.array(
+            [[row.get(name, 0) for name in columns] for row in nutrition_rows],
+            dtype=np.float64
+        ).reshape(-1, len(columns))
+    
+    def compare_foods(self, food1_nutrition, food2_nutrition, score1=None, score2=None):
+        """
+        Compare two foods and return which is healthier.
+        Pass score1/score2 when the calculate_score results are already known.
+        """
+        score1 = score1 or self.calculate_score(food1_nutrition)
+        score2 = score2 or self.calculate_score(food2_nutrition)
         
         return {
             'food1_score': score1['score'],
@@ -0,0 +1,191 @@
+import hashlib
+import io
+import os
+import threading
+import numpy as np
+from config import Config
+
+class InferenceBackend:
+    """
+    Runs batched forward passes for the food classifier.
+    Input: float32 array N x 224 x 224 x 3 scaled to [0, 1]
+    Output: N x num_classes array of class probabilities
+    """
+
+    name = None
+
+    def __init__(self, model_path):
+        self.model_path = model_path
+        self.model_bytes = None
+
+    def available(self):
+        """True if the model can be loaded"""
+        return os.path.exists(self.model_path)
+
+    def preload(self):
+        """
+        Read the model file into memory without starting an inference runtime
+        (its thread pools do not survive a fork); load() then builds the model
+        from these bytes, in each forked process.
+        """
+        with open(self.model_path, 'rb') as f:
+            self.model_bytes = f.read()
+
+    def load(self):
+        """Load the model into memory"""
+        raise NotImplementedError
+
+    def fingerprint(self):
+        """Identifies the backend and model weights"""
+        digest = hashlib.sha256(self.name.encode('utf-8'))
+        if self.model_bytes is not None:
+            digest.update(self.model_bytes)
+            return digest.hexdigest()[:16]
+        with open(self.model_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()[:16]
+
+    def input_buffer(self, batch_size):
+        """Array for a batch to be assembled in before predict_batch"""
+        return np.empty((batch_size, 224, 224, 3), dtype=np.float32)
+
+    def release_buffer(self):
+        """Give back the calling thread's input_buffer() when it will not reach predict_batch"""
+        pass
+
+    def predict_batch(self, batch):
+        """Run one forward pass over a batch"""
+        raise NotImplementedError
+
+class KerasBackend(InferenceBackend):
+    """Full TensorFlow/Keras inference on the .h5 model"""
+
+    name = 'keras'
+
+    def __init__(self, model_path):
+        super().__init__(model_path)
+        self.model = None
+
+    def load(self):
+        import tensorflow as tf
+        if _threads is not None:
+            intra_op, inter_op = _threads
+            tf.config.threading.set_intra_op_parallelism_threads(intra_op)
+            tf.config.threading.set_inter_op_parallelism_threads(inter_op)
+
+        if self.model_bytes is None:
+            self.model = tf.keras.models.load_model(self.model_path)
+            return
+
+        import h5py
+        with h5py.File(io.BytesIO(self.model_bytes), 'r') as f:
+            self.model = tf.keras.models.load_model(f)
+        self.model_bytes = None  # the runtime holds its own copy of the weights
+
+    def predict_batch(self, batch):
+        return self.model.predict(batch, verbose=0)
+
+class TFLiteBackend(InferenceBackend):
+    """
+    TFLite interpreter inference (float32, float16 or int8 exports).
+    Quantized models are detected from their input/output tensor types,
+    so the same backend serves every export produced by export_tflite.py.
+    """
+
+    name = 'tflite'
+
+    def __init__(self, model_path, num_threads=None):
+        super().__init__(model_path)
+        self.num_threads = num_threads
+        self.interpreter = None
+        self._lock = threading.Lock()  # an interpreter must not be invoked concurrently
+        self._batch_size = None
+
+    def load(self):
+        Interpreter = _import_tflite_interpreter()
+        if self.model_bytes is not None:
+            self.interpreter = Interpreter(model_content=self.model_bytes, num_threads=self.num_threads)
+        else:
+            self.interpreter = Interpreter(model_path=self.model_path, num_threads=self.num_threads)
+        self.interpreter.allocate_tensors()
+
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self._batch_size = int(self._input['shape'][0])
+
+    def predict_batch(self, batch):
+        with self._lock:
+            if len(batch) != self._batch_size:
+                self._resize(len(batch))
+
+            self.interpreter.set_tensor(self._input['index'], self._quantize_input(batch))
+            self.interpreter.invoke()
+            output = self.interpreter.get_tensor(self._output['index'])
+            return self._dequantize_output(output)
+
+    def _resize(self, batch_size):
+        """Resize the input tensor for a new batch size (reallocates interpreter buffers)"""
+        shape = list(self._input['shape'])
+        shape[0] = batch_size
+        self.interpreter.resize_tensor_input(self._input['index'], shape)
+        self.interpreter.allocate_tensors()
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self._batch_size = batch_size
+
+    def _quantize_input(self, batch):
+        dtype = self._input['dtype']
+        if dtype == np.float32:
+            return batch.astype(np.float32, copy=False)
+
+        scale, zero_point = self._input['quantization']
+        info = np.iinfo(dtype)
+        return np.clip(np.round(batch / scale + zero_point), info.min, info.max).astype(dtype)
+
+    def _dequantize_output(self, output):
+        if output.dtype == np.float32:
+            return output.copy()  # the interpreter reuses its output buffer
+
+        scale, zero_point = self._output['quantization']
+        return (output.astype(np.float32) - zero_point) * scale
+
+def _import_tflite_interpreter():
+    """Prefer the lightweight tflite_runtime package, fall back to full TensorFlow"""
+    try:
+        from tflite_runtime.interpreter import Interpreter
+    except ImportError:
+        import tensorflow as tf
+        Interpreter = tf.lite.Interpreter
+    return Interpreter
+
+# (intra_op, inter_op) set by configure_threads(), applied when a backend loads
+_threads = None
+
+def configure_threads(intra_op, inter_op):
+    """
+    Cap the threads one forward pass (intra_op) and concurrent ops (inter_op)
+    may use in every backend loaded afterwards, in this process and the ones
+    it forks. TFLite uses intra_op unless TFLITE_NUM_THREADS is set.
+    """
+    global _threads
+    _threads = (intra_op, inter_op)
+    os.environ['TF_NUM_INTRAOP_THREADS'] = str(intra_op)
+    os.environ['TF_NUM_INTEROP_THREADS'] = str(inter_op)
+    os.environ.setdefault('OMP_NUM_THREADS', str(intra_op))
+
+def _intra_op_threads():
+    return _threads[0] if _threads is not None else None
+
+def create_backend(name):
+    """Build an inference backend by name (Config.INFERENCE_BACKEND, or 'pool')"""
+    if name == 'keras':
+        return KerasBackend(Config.MODEL_PATH)
+    if name == 'tflite':
+        return TFLiteBackend(Config.TFLITE_MODEL_PATH, num_threads=Config.TFLITE_NUM_THREADS or _intra_op_threads())
+    if name == 'tflite-int8':
+        return TFLiteBackend(Config.TFLITE_INT8_MODEL_PATH, num_threads=Config.TFLITE_NUM_THREADS or _intra_op_threads())
+    if name == 'pool':
+        from services.inference_pool import PoolBackend
+        return PoolBackend(Config.INFERENCE_POOL_ADDRESS, capacity=Config.INFERENCE_BATCH_MAX_SIZE)
+    raise ValueError(f"Unknown inference backend '{name}' (expected keras, tflite or tflite-int8)")
@@ -0,0 +1,344 @@
+"""
+Inference pool: N model-holding worker processes shared by all web processes.
+
+Web processes write preprocessed input tensors into shared memory segments
+they own and send only the segment name and batch size over a local socket.
+Workers map the segment (no pickling or copying of the tensor) and reply
+with the small class-probability array.
+"""
+
+import atexit
+import os
+import queue
+import signal
+import threading
+import time
+import multiprocessing
+from multiprocessing import resource_tracker
+from multiprocessing.connection import Listener, Client
+from multiprocessing.shared_memory import SharedMemory
+import numpy as np
+from config import Config
+from services.inference_backends import InferenceBackend, create_backend
+
+class PoolAuthKeyError(Exception):
+    """Raised when INFERENCE_POOL_AUTHKEY is missing or a known public value"""
+    pass
+
+INPUT_SHAPE = (224, 224, 3)
+ITEM_BYTES = int(np.prod(INPUT_SHAPE)) * np.dtype(np.float32).itemsize
+
+# Pool messages are pickles, so anyone holding the key can run code in the
+# workers (and in web processes, through replies): refuse published keys
+INSECURE_AUTHKEYS = {'change-this-inference-key'}
+MIN_AUTHKEY_LENGTH = 16
+
+# A worker that dies sooner than this after starting is restarted with backoff
+WORKER_STABLE_SECONDS = 30
+WORKER_RESPAWN_MAX_DELAY = 60
+
+def authkey():
+    """INFERENCE_POOL_AUTHKEY as bytes, raises PoolAuthKeyError if it is unset or unsafe"""
+    key = Config.INFERENCE_POOL_AUTHKEY
+    if not key or key in INSECURE_AUTHKEYS or len(key) < MIN_AUTHKEY_LENGTH:
+        raise PoolAuthKeyError(
+            f"Set INFERENCE_POOL_AUTHKEY to a random secret of at least {MIN_AUTHKEY_LENGTH} characters "
+            "(e.g. python -c \"import secrets; print(secrets.token_hex(32))\") for the pool and web processes"
+        )
+    return key.encode('utf-8')
+
+def parse_address(address):
+    """'host:port' for TCP, anything else is a Unix socket path"""
+    if ':' in address and not address.startswith('/'):
+        host, port = address.rsplit(':', 1)
+        return (host, int(port))
+    return address
+
+def _attach(name):
+    """Map an existing segment without letting this process's resource tracker unlink it"""
+    shm = SharedMemory(name=name)
+    try:
+        resource_tracker.unregister(shm._name, 'shared_memory')
+    except Exception:
+        pass
+    return shm
+
+# ---------------------------------------------------------------------------
+# Worker side
+# ---------------------------------------------------------------------------
+
+class _Worker:
+    """One model-holding process serving connections from web processes"""
+
+    def __init__(self, listener, worker_id):
+        self.listener = listener
+        self.worker_id = worker_id
+        self.backend = None
+        self.model_version = None
+        self._predict_lock = threading.Lock()  # one forward pass at a time per worker
+
+    def run(self):
+        self.backend = create_backend(Config.INFERENCE_BACKEND)
+        self.backend.load()
+        self.model_version = self.backend.fingerprint()
+        if Config.MODEL_WARMUP_ENABLED:
+            self.backend.predict_batch(np.zeros((1,) + INPUT_SHAPE, dtype=np.float32))
+        print(f"✅ Inference worker {self.worker_id} (pid {os.getpid()}) ready, {self.backend.name} backend")
+
+        while True:
+            try:
+                conn = self.listener.accept()
+            except Exception as e:
+                print(f"⚠️ Inference worker {self.worker_id} accept failed: {e}")
+                continue
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn):
+        """Handle requests from one client connection until it closes"""
+        segments = {}  # shm name -> SharedMemory, mapped once per connection
+        try:
+            while True:
+                try:
+                    message = conn.recv()
+                except (EOFError, OSError):
+                    break
+
+                try:
+                    conn.send(('ok', self._handle(message, segments)))
+                except Exception as e:
+                    conn.send(('error', str(e)))
+        finally:
+            for shm in segments.values():
+                shm.close()
+            conn.close()
+
+    def _handle(self, message, segments):
+        command = message[0]
+
+        if command == 'info':
+            return {
+                'backend': self.backend.name,
+                'model_version': self.model_version,
+                'worker': self.worker_id,
+                'pid': os.getpid()
+            }
+
+        if command == 'predict':
+            _, name, batch_size = message
+            shm = segments.get(name)
+            if shm is None:
+                shm = segments[name] = _attach(name)
+            batch = np.ndarray((batch_size,) + INPUT_SHAPE, dtype=np.float32, buffer=shm.buf)
+            with self._predict_lock:
+                return np.asarray(self.backend.predict_batch(batch), dtype=np.float32)
+
+        raise ValueError(f"Unknown command '{command}'")
+
+def _worker_main(listener, worker_id):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # the parent handles shutdown
+    _Worker(listener, worker_id).run()
+
+def serve(address=None, workers=None):
+    """Start the pool: bind the socket, fork workers that share it, supervise them"""
+    address = parse_address(address or Config.INFERENCE_POOL_ADDRESS)
+    workers = workers or Config.INFERENCE_POOL_WORKERS
+    key = authkey()
+
+    if isinstance(address, str) and os.path.exists(address):
+        os.unlink(address)  # stale socket from a previous run
+
+    # A Unix socket is created owner-only (no window before a chmod)
+    old_umask = os.umask(0o177)
+    try:
+        listener = Listener(address, authkey=key)
+    finally:
+        os.umask(old_umask)
+    if isinstance(address, str):
+        os.chmod(address, 0o600)
+    print(f"🚀 Inference pool listening on {address} with {workers} worker(s)")
+
+    # Workers inherit the listening socket through fork and accept on it directly
+    ctx = multiprocessing.get_context('fork')
+    processes = {}
+    started_at = {}
+    failures = {}  # worker_id -> consecutive early exits
+    restart_at = {}
+
+    def spawn(worker_id):
+        process = ctx.Process(target=_worker_main, args=(listener, worker_id), daemon=True)
+        process.start()
+        processes[worker_id] = process
+        started_at[worker_id] = time.monotonic()
+
+    for worker_id in range(workers):
+        spawn(worker_id)
+
+    def shutdown(signum, frame):
+        for process in processes.values():
+            process.terminate()
+        listener.close()
+        raise SystemExit(0)
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    # Restart workers that die so pool capacity stays fixed; one that keeps dying
+    # right away (e.g. the model fails to load) is retried with exponential backoff
+    while True:
+        time.sleep(1)
+        now = time.monotonic()
+        for worker_id, process in list(processes.items()):
+            if process.is_alive():
+                if now - started_at[worker_id] >= WORKER_STABLE_SECONDS:
+                    failures[worker_id] = 0
+                continue
+
+            if worker_id not in restart_at:
+                early = now - started_at[worker_id] < WORKER_STABLE_SECONDS
+                failures[worker_id] = failures.get(worker_id, 0) + 1 if early else 0
+                delay = min(2 ** failures[worker_id], WORKER_RESPAWN_MAX_DELAY) if failures[worker_id] else 0
+                print(f"⚠️ Inference worker {worker_id} exited ({process.exitcode}), restarting in {delay}s")
+                restart_at[worker_id] = now + delay
+
+            if now >= restart_at[worker_id]:
+                del restart_at[worker_id]
+                spawn(worker_id)
+
+# ---------------------------------------------------------------------------
+# Web process side
+# ---------------------------------------------------------------------------
+
+class _Channel:
+    """A connection to the pool plus a shared memory segment owned by this process"""
+
+    def __init__(self, address, authkey, capacity):
+        self.conn = Client(address, authkey=authkey)
+        self.shm = SharedMemory(create=True, size=capacity * ITEM_BYTES)
+        self.capacity = capacity
+        self.pid = os.getpid()
+
+    def view(self, batch_size):
+        return np.ndarray((batch_size,) + INPUT_SHAPE, dtype=np.float32, buffer=self.shm.buf)
+
+    def close(self):
+        try:
+            self.conn.close()
+        finally:
+            self.shm.close()
+            self.shm.unlink()
+
+class PoolBackend(InferenceBackend):
+    """Backend that forwards batches to the inference pool over shared memory"""
+
+    name = 'pool'
+
+    def __init__(self, address, capacity):
+        super().__init__(model_path=None)
+        self.address = parse_address(address)
+        self.authkey = authkey()
+        self.capacity = capacity  # images per shared memory segment
+        self.info = None
+        self._idle = queue.LifoQueue()  # reusable channels, most recently used first
+        self._channels = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        atexit.register(self.close)
+
+    def available(self):
+        return True  # reachability is checked by load()
+
+    def load(self):
+        channel = self._acquire()
+        try:
+            self.info = self._call(channel, ('info',))
+        finally:
+            self._release(channel)
+        print(f"✅ Connected to inference pool at {self.address} ({self.info['backend']} backend)")
+
+    def fingerprint(self):
+        return f"pool-{self.info['model_version']}"
+
+    def input_buffer(self, batch_size):
+        """Shared memory view for the calling thread to fill; predict_batch then sends it as is"""
+        # A channel still held from a batch that never reached predict_batch goes back first
+        self.release_buffer()
+        channel = self._acquire(batch_size)
+        self._local.channel = channel
+        return channel.view(batch_size)
+
+    def release_buffer(self):
+        channel = getattr(self._local, 'channel', None)
+        self._local.channel = None
+        if channel is not None:
+            self._release(channel)
+
+    def predict_batch(self, batch):
+        batch_size = len(batch)
+        channel = getattr(self._local, 'channel', None)
+        self._local.channel = None
+
+        if channel is None or channel.capacity < batch_size or not np.may_share_memory(batch, channel.view(batch_size)):
+            if channel is not None:
+                self._release(channel)
+            channel = self._acquire(batch_size)
+            channel.view(batch_size)[:] = batch
+
+        try:
+            return self._call(channel, ('predict', channel.shm.name, batch_size))
+        except (EOFError, OSError):
+            # The worker went away: retry once on a fresh connection (and another worker)
+            self._discard(channel)
+            channel = self._acquire(batch_size)
+            channel.view(batch_size)[:] = batch
+            return self._call(channel, ('predict', channel.shm.name, batch_size))
+        finally:
+            self._release(channel)
+
+    def _call(self, channel, message):
+        channel.conn.send(message)
+        status, payload = channel.conn.recv()
+        if status != 'ok':
+            raise RuntimeError(f"Inference pool error: {payload}")
+        return payload
+
+    def _acquire(self, batch_size=1):
+        """Take an idle channel large enough for batch_size, or open a new one"""
+        while True:
+            try:
+                channel = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if channel.pid != os.getpid():
+                continue  # inherited across a fork, belongs to the parent
+            if channel.capacity >= batch_size:
+                return channel
+            self._discard(channel)
+
+        channel = _Channel(self.address, self.authkey, max(self.capacity, batch_size))
+        with self._lock:
+            self._channels.append(channel)
+        return channel
+
+    def _release(self, channel):
+        if channel in self._channels:
+            self._idle.put(channel)
+
+    def _discard(self, channel):
+        with self._lock:
+            if channel in self._channels:
+                self._channels.remove(channel)
+        try:
+            channel.close()
+        except Exception:
+            pass
+
+    def close(self):
+        """Close connections and unlink the shared memory segments this process created"""
+        with self._lock:
+            channels, self._channels = self._channels, []
+        for channel in channels:
+            if channel.pid == os.getpid():
+                try:
+                    channel.close()
+                except Exception:
+                    pass
@@ -1,52 +1,389 @@
 import numpy as np
 from PIL import Image
+import hashlib
+import io
 import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from multiprocessing import AuthenticationError
 from config import Config
+from services.prediction_cache import PredictionCache
+from services.inference_backends import create_backend
+from services.inference_pool import PoolAuthKeyError
+from services.food_resolver import FoodResolver, FOOD_ALIASES
+
+class InvalidImageError(ValueError):
+    """Raised when an upload is rejected before decoding (oversized or decompression bomb)"""
+    pass
+
+class ModelNotReady(Exception):
+    """Raised when a prediction is requested before the model has finished loading"""
+    pass
+
+class InferenceQueueFull(Exception):
+    """Raised when the inference queue cannot accept more requests"""
+    pass
+
+class BatchScheduler:
+    """
+    Groups concurrent prediction requests into batched forward passes.
+    Requests wait in a bounded queue; a batch is dispatched once it reaches
+    max_batch_size or the oldest request has waited max_wait_ms.
+    """
+    
+    STATS_WINDOW = 512  # number of recent batches kept for wait/size stats
+    
+    def __init__(self, predict_fn, max_batch_size, max_wait_ms, max_queue_size, allocate_fn=None):
+        self.predict_fn = predict_fn
+        self.allocate_fn = allocate_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._lock = threading.Lock()
+        self._worker = None
+        self._worker_pid = None
+        self._recent = deque(maxlen=self.STATS_WINDOW)
+        self._totals = {
+            'batches': 0,
+            'items': 0,
+            'rejected': 0,
+            'errors': 0,
+            'max_batch_size_seen': 0
+        }
+    
+    def submit(self, img_array):
+        """Queue one preprocessed image (1 x H x W x C), returns a Future of its output row"""
+        self._ensure_worker()
+        future = Future()
+        try:
+            self._queue.put_nowait((img_array, future, time.monotonic()))
+        except queue.Full:
+            with self._lock:
+                self._totals['rejected'] += 1
+            raise InferenceQueueFull('Inference queue is full, try again shortly')
+        return future
+    
+    def _ensure_worker(self):
+        """Start the dispatcher thread (again after a fork, threads do not survive it)"""
+        if self._worker is not None and self._worker_pid == os.getpid() and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is not None and self._worker_pid == os.getpid() and self._worker.is_alive():
+                return
+            if self._worker_pid != os.getpid():
+                self._queue = queue.Queue(maxsize=self._queue.maxsize)
+            self._worker = threading.Thread(target=self._run, name='inference-batcher', daemon=True)
+            self._worker_pid = os.getpid()
+            self._worker.start()
+    
+    def _run(self):
+        """Dispatcher loop: collect a batch, run it, repeat"""
+        while True:
+            first = self._queue.get()
+            batch = [first]
+            deadline = first[2] + self.max_wait
+            
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    if remaining > 0:
+                        batch.append(self._queue.get(timeout=remaining))
+                    else:
+                        # Deadline passed: take whatever is already queued, don't wait
+                        batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            
+            self._process(batch)
+    
+    def _process(self, batch):
+        """Run a single forward pass for the batch and resolve each caller's future"""
+        # Skip requests whose caller timed out and cancelled them
+        batch = [item for item in batch if item[1].set_running_or_notify_cancel()]
+        if not batch:
+            return
+        
+        started = time.monotonic()
+        waits = [started - enqueued_at for _, _, enqueued_at in batch]
+        failed = False
+        
+        try:
+            arrays = [img_array for img_array, _, _ in batch]
+            out = self.allocate_fn(len(batch)) if self.allocate_fn else None
+            inputs = np.concatenate(arrays, axis=0, out=out)
+            outputs = self.predict_fn(inputs)
+        except Exception as e:
+            failed = True
+            for _, future, _ in batch:
+                future.set_exception(e)
+        else:
+            for i, (_, future, _) in enumerate(batch):
+                future.set_result(outputs[i])
+        
+        inference_time = time.monotonic() - started
+        with self._lock:
+            self._totals['batches'] += 1
+            self._totals['items'] += len(batch)
+            self._totals['max_batch_size_seen'] = max(self._totals['max_batch_size_seen'], len(batch))
+            if failed:
+                self._totals['errors'] += 1
+            self._recent.append((len(batch), max(waits), sum(waits) / len(waits), inference_time))
+    
+    def get_stats(self):
+        """Batch size and queue wait statistics (waits and timings in milliseconds)"""
+        with self._lock:
+            totals = dict(self._totals)
+            recent = list(self._recent)
+        
+        stats = {
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000,
+            'queue_depth': self._queue.qsize(),
+            'queue_capacity': self._queue.maxsize,
+            **totals,
+            'avg_batch_size': round(totals['items'] / totals['batches'], 2) if totals['batches'] else 0
+        }
+        
+        if recent:
+            sizes = np.array([r[0] for r in recent])
+            max_waits = np.array([r[1] for r in recent]) * 1000
+            avg_waits = np.array([r[2] for r in recent]) * 1000
+            inference_times = np.array([r[3] for r in recent]) * 1000
+            stats['recent'] = {
+                'batches': len(recent),
+                'avg_batch_size': round(float(sizes.mean()), 2),
+                'p50_queue_wait_ms': round(float(np.percentile(avg_waits, 50)), 2),
+                'p95_queue_wait_ms': round(float(np.percentile(max_waits, 95)), 2),
+                'max_queue_wait_ms': round(float(max_waits.max()), 2),
+                'avg_inference_ms': round(float(inference_times.mean()), 2)
+            }
+        
+        return stats
 
 class MLService:
     """Machine Learning service for food classification"""
     
+    INPUT_SIZE = 224  # Standard size for most food models
+    POOL_RETRY_SECONDS = 2
+    POOL_RETRY_MAX_SECONDS = 30
+    
+    CATEGORY_KEYWORDS = {
+        'fast_food': ['pizza', 'burger', 'fries', 'hot dog', 'nachos'],
+        'dessert': ['cake', 'ice cream', 'donut', 'pie', 'cookie'],
+        'healthy': ['salad', 'salmon', 'soup', 'vegetables', 'fruit'],
+        'asian': ['sushi', 'ramen', 'curry', 'dumplings', 'fried rice'],
+        'breakfast': ['pancakes', 'waffles', 'omelette', 'toast'],
+        'mexican': ['tacos', 'burrito', 'quesadilla', 'nachos']
+    }
+    
     def __init__(self):
-        self.model = None
+        self.backend = None
         self.labels = []
         self.model_loaded = False
-        self._load_model()
+        self.model_version = None
+        self.state = 'not_started'  # not_started -> loading -> ready | fallback | failed
+        self.load_error = None
+        self.load_seconds = None
+        self.warmup_seconds = None
+        self._ready = threading.Event()
+        self._start_lock = threading.Lock()
+        self.batcher = None
+        self._preloaded = None  # backend whose model file was read by preload()
+        self._labels_preloaded = False
+        self._buffers = threading.local()
+        self._decode_executor = None
+        self._decode_executor_pid = None
+        # Keyword -> category; a keyword listed twice keeps its first category
+        self.keyword_categories = {}
+        for category, keywords in self.CATEGORY_KEYWORDS.items():
+            for keyword in keywords:
+                self.keyword_categories.setdefault(keyword, category)
+        self.category_resolver = FoodResolver(self.keyword_categories, aliases=FOOD_ALIASES)
+        self.cache = None
+        if Config.PREDICTION_CACHE_ENABLED:
+            self.cache = PredictionCache(
+                max_bytes=Config.PREDICTION_CACHE_MAX_BYTES,
+                disk_dir=Config.PREDICTION_CACHE_DIR
+            )
+        if Config.INFERENCE_BATCHING_ENABLED:
+            self.batcher = BatchScheduler(
+                self._predict_batch,
+                max_batch_size=Config.INFERENCE_BATCH_MAX_SIZE,
+                max_wait_ms=Config.INFERENCE_BATCH_MAX_WAIT_MS,
+                max_queue_size=Config.INFERENCE_QUEUE_MAX_SIZE,
+                allocate_fn=self._allocate_batch
+            )
+    
+    def start(self, background=True):
+        """
+        Load the model and labels (and warm the model up) once.
+        TensorFlow is only imported here, so creating the service is cheap.
+        """
+        with self._start_lock:
+            if self.state != 'not_started':
+                return
+            self.state = 'loading'
+        
+        if background:
+            threading.Thread(target=self._load_and_warm_up, name='model-loader', daemon=True).start()
+        else:
+            self._load_and_warm_up()
+    
+    def preload(self):
+        """
+        Read the labels and the model file in a process that is about to fork,
+        so workers inherit them instead of reading them again. No inference
+        runtime is started: its thread pools do not survive a fork. Workers
+        call after_fork().
+        """
+        self._load_labels()
+        self._labels_preloaded = True
+        if Config.INFERENCE_MODE == 'pool':
+            return
+        backend = create_backend(Config.INFERENCE_BACKEND)
+        if backend.available():
+            backend.preload()
+            self._preloaded = backend
+            print(f"✅ Model file read from {backend.model_path} ({len(backend.model_bytes)} bytes)")
+    
+    def after_fork(self):
+        """In a worker forked after preload(): build the runtime and warm up (in the background)"""
+        if self._labels_preloaded:
+            self.start()
+    
+    def _load_and_warm_up(self):
+        """Loader entry point: load, warm up, then mark the service ready"""
+        started = time.monotonic()
+        try:
+            self._load_model()
+            
+            # The inference pool may come up after the web process: keep trying, backing off
+            delay = self.POOL_RETRY_SECONDS
+            deadline = started + Config.INFERENCE_POOL_CONNECT_TIMEOUT
+            while Config.INFERENCE_MODE == 'pool' and not self.model_loaded:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise ModelNotReady(
+                        f"Inference pool unreachable for {Config.INFERENCE_POOL_CONNECT_TIMEOUT:.0f}s: {self.load_error}"
+                    )
+                time.sleep(min(delay, remaining))
+                delay = min(delay * 2, self.POOL_RETRY_MAX_SECONDS)
+                self._load_model()
+            
+            self.load_seconds = round(time.monotonic() - started, 3)
+            
+            if self.model_loaded and Config.MODEL_WARMUP_ENABLED:
+                try:
+                    self._warm_up()
+                except Exception as e:
+                    # The model loaded; the first real scans just pay the tracing cost
+                    print(f"⚠️ Model warm-up failed, serving without it: {str(e)}")
+            
+            self.state = 'ready' if self.model_loaded else 'fallback'
+        except Exception as e:
+            print(f"❌ Model startup failed: {str(e)}")
+            self.load_error = str(e)
+            self.state = 'failed'
+        finally:
+            self._ready.set()
+    
+    def _warm_up(self):
+        """Run dummy inferences so graph tracing happens before the first real scan"""
+        started = time.monotonic()
+        batch_sizes = {1}
+        if self.batcher:
+            batch_sizes.add(self.batcher.max_batch_size)
+        
+        for batch_size in sorted(batch_sizes):
+            self._predict_batch(np.zeros((batch_size, self.INPUT_SIZE, self.INPUT_SIZE, 3), dtype=np.float32))
+        
+        self.warmup_seconds = round(time.monotonic() - started, 3)
+        print(f"🔥 Model warmed up in {self.warmup_seconds}s")
+    
+    def is_ready(self):
+        """True once predictions can be served (by the model or the fallback mode)"""
+        return self._ready.is_set() and self.state in ('ready', 'fallback')
+    
+    def wait_until_ready(self, timeout):
+        """Block up to timeout seconds for startup to finish, starting it if needed"""
+        if self.state == 'not_started':
+            self.start()
+        if timeout > 0:
+            self._ready.wait(timeout)
+        return self.is_ready()
+    
+    def get_readiness(self):
+        """Model startup state for the readiness endpoint"""
+        return {
+            'ready': self.is_ready(),
+            'state': self.state,
+            'backend': self.backend.name if self.backend else Config.INFERENCE_BACKEND,
+            'model_loaded': self.model_loaded,
+            'model_version': self.model_version,
+            'labels': len(self.labels),
+            'load_seconds': self.load_seconds,
+            'warmup_seconds': self.warmup_seconds,
+            'error': self.load_error
+        }
     
     def _load_model(self):
         """Load the pre-trained model and labels"""
         try:
-            # Try to load TensorFlow model
-            import tensorflow as tf
+            # Load the model with the configured inference backend (or connect to the pool)
+            backend = self._preloaded or create_backend('pool' if Config.INFERENCE_MODE == 'pool' else Config.INFERENCE_BACKEND)
+            self._preloaded = None
             
-            if os.path.exists(Config.MODEL_PATH):
-                self.model = tf.keras.models.load_model(Config.MODEL_PATH)
-                print(f"✅ Model loaded from {Config.MODEL_PATH}")
+            if backend.available():
+                backend.load()
+                self.backend = backend
+                if backend.model_path:
+                    print(f"✅ Model loaded from {backend.model_path} ({backend.name} backend)")
             else:
-                print(f"⚠️ Model file not found at {Config.MODEL_PATH}")
+                print(f"⚠️ Model file not found at {backend.model_path}")
                 print("Using fallback prediction mode")
             
-            # Load labels from your trained model
-            if os.path.exists(Config.MODEL_LABELS_PATH):
-                with open(Config.MODEL_LABELS_PATH, 'r') as f:
-                    self.labels = [line.strip() for line in f.readlines()]
-                print(f"✅ Loaded {len(self.labels)} food labels from your dataset")
-            else:
-                # Try to detect labels from food_data directory
-                self.labels = self._detect_labels_from_dataset()
-                if not self.labels:
-                    # Final fallback
-                    self.labels = self._get_fallback_labels()
-                    print(f"⚠️ Using fallback labels ({len(self.labels)} items)")
+            if not self._labels_preloaded:
+                self._load_labels()
+            self._labels_preloaded = False
             
-            self.model_loaded = True if self.model else False
+            self.model_loaded = True if self.backend else False
+            if self.model_loaded:
+                self.model_version = self._compute_model_version()
+                self.load_error = None
             
+        except (PoolAuthKeyError, AuthenticationError):
+            raise  # misconfigured pool key: retrying cannot help
         except ImportError:
-            print("⚠️ TensorFlow not available, using fallback mode")
+            print(f"⚠️ TensorFlow not available for the {Config.INFERENCE_BACKEND} backend, using fallback mode")
             self.labels = self._get_fallback_labels()
         except Exception as e:
             print(f"❌ Error loading model: {str(e)}")
+            self.load_error = str(e)
             self.labels = self._get_fallback_labels()
     
+    def _load_labels(self):
+        """Load labels from your trained model"""
+        if os.path.exists(Config.MODEL_LABELS_PATH):
+            with open(Config.MODEL_LABELS_PATH, 'r') as f:
+                self.labels = [line.strip() for line in f.readlines()]
+            print(f"✅ Loaded {len(self.labels)} food labels from your dataset")
+        else:
+            # Try to detect labels from food_data directory
+            self.labels = self._detect_labels_from_dataset()
+            if not self.labels:
+                # Final fallback
+                self.labels = self._get_fallback_labels()
+                print(f"⚠️ Using fallback labels ({len(self.labels)} items)")
+    
+    def _compute_model_version(self):
+        """Short fingerprint of the backend, model weights and labels, used to key cached predictions"""
+        digest = hashlib.sha256(self.backend.fingerprint().encode('utf-8'))
+        digest.update('\n'.join(self.labels).encode('utf-8'))
+        return digest.hexdigest()[:16]
+    
     def _detect_labels_from_dataset(self):
         """Detect food labels from your food_data directory"""
         try:
@@ -70,60 +407,267 @@ class MLService:
             'sushi', 'ice_cream', 'donut', 'cake', 'sandwich'
         ]
     
-    def preprocess_image(self, image_path):
-        """Preprocess image for model prediction"""
+    def preprocess_image(self, image):
+        """Preprocess image (file path or binary file object) for model prediction"""
         try:
-            # Load and resize image
-            img = Image.open(image_path)
-            img = img.convert('RGB')
-            img = img.resize((224, 224))  # Standard size for most food models
-            
-            # Convert to array and normalize
-            img_array = np.array(img)
-            img_array = img_array / 255.0  # Normalize to [0, 1]
-            img_array = np.expand_dims(img_array, axis=0)  # Add batch dimension
-            
-            return img_array
+            if Config.PREPROCESS_MODE == 'legacy':
+                return self._preprocess_image_legacy(image)
+            return self._preprocess_image_fast(image)
+        except InvalidImageError:
+            raise
         except Exception as e:
             print(f"Error preprocessing image: {str(e)}")
             return None
     
-    def predict(self, image_path):
-        """Predict food item from image"""
+    def _preprocess_image_legacy(self, image):
+        """Full decode, float64 normalization (original path, kept for comparison)"""
+        # Load and resize image
+        img = Image.open(image)
+        img = img.convert('RGB')
+        img = img.resize((self.INPUT_SIZE, self.INPUT_SIZE))
+        
+        # Convert to array and normalize
+        img_array = np.array(img)
+        img_array = img_array / 255.0  # Normalize to [0, 1]
+        img_array = np.expand_dims(img_array, axis=0)  # Add batch dimension
+        
+        return img_array
+    
+    def _preprocess_image_fast(self, image):
+        """
+        Reduced-size decode straight into a reusable float32 buffer.
+        The returned array belongs to the calling thread and is overwritten
+        by its next call, so it must be consumed (or copied) before then.
+        """
         try:
-            # Preprocess image
-            img_array = self.preprocess_image(image_path)
-            if img_array is None:
-                return self._fallback_prediction(image_path)
+            img = Image.open(image)
+        except Image.DecompressionBombError as e:
+            raise InvalidImageError(str(e))
+        
+        with img:
+            # Image.open only parses the header, so this check costs no decoding
+            width, height = img.size
+            if width * height > Config.MAX_IMAGE_PIXELS:
+                raise InvalidImageError(
+                    f'Image is too large ({width}x{height}), limit is {Config.MAX_IMAGE_PIXELS} pixels'
+                )
             
-            # Make prediction
-            if self.model and self.model_loaded:
-                predictions = self.model.predict(img_array)
-                top_indices = np.argsort(predictions[0])[-3:][::-1]  # Top 3 predictions
-                
-                results = []
-                for idx in top_indices:
-                    if idx < len(self.labels):
-                        results.append({
-                            'food_name': self.labels[idx].replace('_', ' ').title(),
-                            'confidence': float(predictions[0][idx])
-                        })
-                
-                return results
+            # JPEG: let the decoder downscale by 1/2, 1/4 or 1/8 while decoding
+            img.draft('RGB', (self.INPUT_SIZE, self.INPUT_SIZE))
+            rgb = img.convert('RGB')
+        
+        resized = rgb.resize((self.INPUT_SIZE, self.INPUT_SIZE))
+        
+        buffer = self._get_input_buffer()
+        np.divide(np.asarray(resized, dtype=np.uint8), np.float32(255.0), out=buffer[0])
+        return buffer
+    
+    def _get_input_buffer(self):
+        """Per-thread 1 x H x W x 3 float32 input buffer"""
+        buffer = getattr(self._buffers, 'input', None)
+        if buffer is None:
+            buffer = np.empty((1, self.INPUT_SIZE, self.INPUT_SIZE, 3), dtype=np.float32)
+            self._buffers.input = buffer
+        return buffer
+    
+    def predict(self, image, filename=None):
+        """
+        Predict food item from an image given as a file path or as the uploaded bytes.
+        filename is only used as a hint by the fallback mode.
+        """
+        if not self.wait_until_ready(Config.MODEL_READY_TIMEOUT):
+            if self.state == 'failed':
+                raise ModelNotReady('Food recognition model failed to load')
+            raise ModelNotReady('Food recognition model is still loading, try again shortly')
+        
+        if isinstance(image, str):
+            filename = filename or image
+        
+        try:
+            if not (self.backend and self.model_loaded):
+                return self._fallback_prediction(filename or '')
+            
+            if self.cache:
+                if isinstance(image, str):
+                    with open(image, 'rb') as f:
+                        image = f.read()
+                key = self.cache.make_key(image, self.model_version)
+                results = self.cache.get_or_compute(key, lambda: self._predict_model(image))
             else:
-                return self._fallback_prediction(image_path)
-                
+                results = self._predict_model(image)
+            
+            if results is None:
+                return self._fallback_prediction(filename or '')
+            return results
+        
+        except (InferenceQueueFull, InvalidImageError, ModelNotReady):
+            raise
         except Exception as e:
             print(f"Error during prediction: {str(e)}")
-            return self._fallback_prediction(image_path)
+            return self._fallback_prediction(filename or '')
+    
+    def predict_many(self, images, filenames=None):
+        """
+        Predict several uploaded images (bytes) with one forward pass over those
+        not already cached; images are decoded in parallel straight into the
+        batch. Returns one entry per image, in order: its predictions, or the
+        InvalidImageError it was rejected with.
+        """
+        filenames = filenames or [None] * len(images)
+        if not self.wait_until_ready(Config.MODEL_READY_TIMEOUT):
+            if self.state == 'failed':
+                raise ModelNotReady('Food recognition model failed to load')
+            raise ModelNotReady('Food recognition model is still loading, try again shortly')
+        
+        if not (self.backend and self.model_loaded):
+            return [self._fallback_prediction(filename or '') for filename in filenames]
+        
+        results = [None] * len(images)
+        keys = [None] * len(images)
+        pending = []
+        duplicates = {}  # position -> earlier position with the same image
+        first_seen = {}
+        for i, image in enumerate(images):
+            if self.cache:
+                keys[i] = self.cache.make_key(image, self.model_version)
+                if keys[i] in first_seen:
+                    duplicates[i] = first_seen[keys[i]]
+                    continue
+                first_seen[keys[i]] = i
+                results[i] = self.cache.get(keys[i])
+            if results[i] is None:
+                pending.append(i)
+        
+        if pending:
+            self._predict_pending(images, filenames, keys, pending, results)
+        for i, original in duplicates.items():
+            earlier = results[original]
+            results[i] = [dict(prediction) for prediction in earlier] if isinstance(earlier, list) else earlier
+        return results
+    
+    def _predict_pending(self, images, filenames, keys, pending, results):
+        """predict_many() for the uncached images at positions pending, fills results"""
+        
+        batch = self._allocate_batch(len(pending))
+        try:
+            decoded = list(self._get_decode_executor().map(
+                lambda row: self._decode_into(images[pending[row]], batch[row:row + 1]),
+                range(len(pending))
+            ))
+        except Exception:
+            # The batch will not be sent: return it (a pool channel) to the backend
+            self.backend.release_buffer()
+            raise
+        
+        try:
+            probabilities = self._predict_batch(batch)
+        except Exception as e:
+            print(f"Error during batch prediction: {str(e)}")
+            probabilities = None
+        
+        for row, i in enumerate(pending):
+            if isinstance(decoded[row], InvalidImageError):
+                results[i] = decoded[row]
+            elif decoded[row] and probabilities is not None:
+                results[i] = self._decode_predictions(probabilities[row])
+                if self.cache:
+                    self.cache.put(keys[i], results[i])
+            else:
+                results[i] = self._fallback_prediction(filenames[i] or '')
     
-    def _fallback_prediction(self, image_path):
+    def _decode_into(self, image, out):
+        """
+        Preprocess image bytes into out (a 1 x H x W x 3 row of a batch).
+        Returns True, False if it could not be decoded, or the InvalidImageError.
+        """
+        try:
+            img_array = self.preprocess_image(io.BytesIO(image))
+        except InvalidImageError as e:
+            out.fill(0)
+            return e
+        if img_array is None:
+            out.fill(0)
+            return False
+        out[...] = img_array
+        return True
+    
+    def _get_decode_executor(self):
+        """Thread pool decoding batch uploads (PIL releases the GIL; recreated after a fork)"""
+        if self._decode_executor_pid != os.getpid():
+            with self._start_lock:
+                if self._decode_executor_pid != os.getpid():
+                    self._decode_executor = ThreadPoolExecutor(
+                        max_workers=Config.SCAN_BATCH_DECODE_THREADS,
+                        thread_name_prefix='batch-decode'
+                    )
+                    self._decode_executor_pid = os.getpid()
+        return self._decode_executor
+    
+    def _predict_model(self, image):
+        """Run the model on one image, None if it could not be preprocessed"""
+        # Preprocess image (bytes are decoded in place, BytesIO does not copy them)
+        img_array = self.preprocess_image(image if isinstance(image, str) else io.BytesIO(image))
+        if img_array is None:
+            return None
+        
+        # Make prediction
+        if self.batcher:
+            future = self.batcher.submit(img_array)
+            try:
+                probabilities = future.result(timeout=Config.INFERENCE_RESULT_TIMEOUT)
+            except FutureTimeout:
+                # img_array is this thread's buffer and may still be queued or being
+                # copied: stop sharing it so the next request decodes into a new one
+                future.cancel()
+                self._buffers.input = None
+                # The model is overloaded, not broken: answer 503 rather than a fallback guess
+                raise InferenceQueueFull('Inference timed out, try again shortly')
+        else:
+            probabilities = self._predict_batch(img_array)[0]
+        
+        return self._decode_predictions(probabilities)
+    
+    def _allocate_batch(self, batch_size):
+        """Batch input array provided by the backend (shared memory for the inference pool)"""
+        return self.backend.input_buffer(batch_size)
+    
+    def _predict_batch(self, batch):
+        """Run one forward pass over a batch of preprocessed images"""
+        return self.backend.predict_batch(batch)
+    
+    def _decode_predictions(self, probabilities):
+        """Turn one row of class probabilities into the top 3 predictions"""
+        top_indices = np.argsort(probabilities)[-3:][::-1]  # Top 3 predictions
+        
+        results = []
+        for idx in top_indices:
+            if idx < len(self.labels):
+                results.append({
+                    'food_name': self.labels[idx].replace('_', ' ').title(),
+                    'confidence': float(probabilities[idx])
+                })
+        
+        return results
+    
+    def get_stats(self):
+        """Inference statistics for the metrics endpoint"""
+        return {
+            'state': self.state,
+            'backend': self.backend.name if self.backend else Config.INFERENCE_BACKEND,
+            'model_loaded': self.model_loaded,
+            'model_version': self.model_version,
+            'batching_enabled': self.batcher is not None,
+            'batching': self.batcher.get_stats() if self.batcher else None,
+            'cache': self.cache.get_stats() if self.cache else None
+        }
+    
+    def _fallback_prediction(self, filename):
         """Fallback prediction when model is not available"""
         # Simple demo prediction based on image name or random selection
         import random
         
         # Try to guess from filename
-        filename = os.path.basename(image_path).lower()
+        filename = os.path.basename(filename).lower()
         
         for label in self.labels:
             if label.replace('_', '') in filename.replace('_', '').replace('-', ''):
@@ -141,22 +685,8 @@ class MLService:
     
     def get_food_category(self, food_name):
         """Categorize food into general categories"""
-        food_lower = food_name.lower()
-        
-        categories = {
-            'fast_food': ['pizza', 'burger', 'fries', 'hot dog', 'nachos'],
-            'dessert': ['cake', 'ice cream', 'donut', 'pie', 'cookie'],
-            'healthy': ['salad', 'salmon', 'soup', 'vegetables', 'fruit'],
-            'asian': ['sushi', 'ramen', 'curry', 'dumplings', 'fried rice'],
-            'breakfast': ['pancakes', 'waffles', 'omelette', 'toast'],
-            'mexican': ['tacos', 'burrito', 'quesadilla', 'nachos']
-        }
-        
-        for category, keywords in categories.items():
-            if any(keyword in food_lower for keyword in keywords):
-                return category
-        
-        return 'other'
+        keyword = self.category_resolver.resolve(food_name)
+        return self.keyword_categories[keyword] if keyword else 'other'
 
 # Global instance
 ml_service = MLService()
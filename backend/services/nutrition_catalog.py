@@ -0,0 +1,187 @@
+"""
+Binary nutrition catalog layout (little-endian, sections 8-byte aligned):
+
+    header      MAGIC, then offsets of the sections below (HEADER_FORMAT)
+    metadata    UTF-8 JSON: columns, serving sizes, version, row count
+    matrix      float32 [rows x columns] nutrient values
+    servings    uint16  [rows] index into metadata serving_sizes
+    offsets     uint32  [rows + 1] byte offsets of each name in the string table
+    strings     UTF-8 food names, concatenated
+    sorted      uint32  [rows] row ids ordered by normalized name (binary search)
+
+Everything is read through a read-only mmap, so opening a catalog costs only
+the header and metadata, and worker processes share the page cache.
+"""
+
+import csv
+import hashlib
+import json
+import mmap
+import struct
+import numpy as np
+from services.food_resolver import FoodResolver
+
+MAGIC = b'NUTCAT01'
+HEADER_FORMAT = '<8s6Q'  # magic, then offsets of metadata, matrix, servings, offsets, strings, sorted
+NUTRIENT_COLUMNS = ('calories', 'protein', 'carbs', 'fat', 'sugar', 'fiber', 'sodium')
+DEFAULT_SERVING_SIZE = '100g'
+
+class NutritionCatalog:
+    """Read-only, memory-mapped view of a catalog written by build_catalog()"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        header_size = struct.calcsize(HEADER_FORMAT)
+        if len(self._mmap) < header_size:
+            raise ValueError('Not a nutrition catalog (file too short)')
+        magic, meta_at, matrix_at, servings_at, offsets_at, strings_at, sorted_at = \
+            struct.unpack_from(HEADER_FORMAT, self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError('Not a nutrition catalog (bad magic)')
+
+        metadata = json.loads(self._mmap[meta_at:matrix_at].rstrip(b'\0').decode('utf-8'))
+        self.columns = tuple(metadata['columns'])
+        self.serving_sizes = metadata['serving_sizes']
+        self.version = metadata['version']
+        rows = self.rows = metadata['rows']
+
+        self._matrix = np.frombuffer(self._mmap, dtype='<f4', count=rows * len(self.columns), offset=matrix_at) \
+            .reshape(rows, len(self.columns))
+        self._servings = np.frombuffer(self._mmap, dtype='<u2', count=rows, offset=servings_at)
+        self._offsets = np.frombuffer(self._mmap, dtype='<u4', count=rows + 1, offset=offsets_at)
+        self._strings_at = strings_at
+        self._sorted = np.frombuffer(self._mmap, dtype='<u4', count=rows, offset=sorted_at)
+
+    def __len__(self):
+        return self.rows
+
+    def name(self, row):
+        start = self._strings_at + int(self._offsets[row])
+        end = self._strings_at + int(self._offsets[row + 1])
+        return self._mmap[start:end].decode('utf-8')
+
+    def find(self, food_name):
+        """Row id of the food whose normalized name equals food_name's, or None"""
+        target = FoodResolver.normalize(food_name)
+        lo, hi = 0, self.rows
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if FoodResolver.normalize(self.name(int(self._sorted[mid]))) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.rows:
+            row = int(self._sorted[lo])
+            if FoodResolver.normalize(self.name(row)) == target:
+                return row
+        return None
+
+    def get(self, food_name):
+        """Nutrition dict for food_name (same shape as the built-in table), or None"""
+        row = self.find(food_name)
+        return None if row is None else self.row_data(row)
+
+    def row_data(self, row):
+        data = {column: _to_number(value) for column, value in zip(self.columns, self._matrix[row].tolist())}
+        data['serving_size'] = self.serving_sizes[int(self._servings[row])]
+        return data
+
+    def close(self):
+        self._matrix = self._servings = self._offsets = self._sorted = None
+        self._mmap.close()
+
+def _to_number(value):
+    """float32 -> the value as written in the source (266 not 266.0, 3.8 not 3.7999999)"""
+    value = float('%.6g' % value)
+    return int(value) if value.is_integer() else value
+
+def load_records(source_path):
+    """
+    Read (name, nutrition dict) pairs from a source file:
+      .csv   header row with 'name', the nutrient columns and optionally 'serving_size'
+      .json  {name: {nutrient: value, ...}} or [{'name': ..., nutrient: value, ...}]
+    Missing nutrients are stored as 0.
+    """
+    if source_path.lower().endswith('.csv'):
+        with open(source_path, newline='', encoding='utf-8') as f:
+            reader = csv.DictReader(f)
+            if 'name' not in (reader.fieldnames or []):
+                raise ValueError(f"{source_path} has no 'name' column")
+            return [(row.pop('name'), row) for row in reader]
+
+    with open(source_path, encoding='utf-8') as f:
+        source = json.load(f)
+    if isinstance(source, dict):
+        return list(source.items())
+    return [(entry.pop('name'), entry) for entry in source]
+
+def build_catalog(records, output_path):
+    """
+    Write (name, nutrition dict) pairs to output_path in catalog format.
+    Names that normalize to the same key keep their first occurrence.
+    Returns (rows written, duplicates skipped).
+    """
+    names, values, servings = [], [], []
+    serving_sizes = {}
+    seen = set()
+    duplicates = 0
+
+    for name, data in records:
+        name = str(name).strip()
+        key = FoodResolver.normalize(name)
+        if not key or key in seen:
+            duplicates += 1
+            continue
+        seen.add(key)
+
+        names.append(name)
+        values.append([float(data.get(column) or 0) for column in NUTRIENT_COLUMNS])
+        serving = str(data.get('serving_size') or DEFAULT_SERVING_SIZE)
+        servings.append(serving_sizes.setdefault(serving, len(serving_sizes)))
+
+    if len(serving_sizes) > np.iinfo(np.uint16).max:
+        raise ValueError('Too many distinct serving sizes')
+
+    matrix = np.asarray(values, dtype='<f4').reshape(len(names), len(NUTRIENT_COLUMNS))
+    encoded = [name.encode('utf-8') for name in names]
+    offsets = np.zeros(len(names) + 1, dtype='<u4')
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    order = np.array(sorted(range(len(names)), key=lambda i: FoodResolver.normalize(names[i])), dtype='<u4')
+
+    sections = [
+        matrix.tobytes(),
+        np.asarray(servings, dtype='<u2').tobytes(),
+        offsets.tobytes(),
+        b''.join(encoded),
+        order.tobytes()
+    ]
+    version = hashlib.sha256(json.dumps(list(serving_sizes)).encode('utf-8'))
+    for section in sections:
+        version.update(section)
+    metadata = json.dumps({
+        'columns': list(NUTRIENT_COLUMNS),
+        'serving_sizes': list(serving_sizes),
+        'rows': len(names),
+        'version': version.hexdigest()[:16]
+    }).encode('utf-8')
+
+    header_size = struct.calcsize(HEADER_FORMAT)
+    positions = []
+    position = header_size
+    for section in [metadata] + sections:
+        positions.append(position)
+        position = _align(position + len(section))
+
+    with open(output_path, 'wb') as f:
+        f.write(struct.pack(HEADER_FORMAT, MAGIC, *positions))
+        for at, section in zip(positions, [metadata] + sections):
+            f.write(b'\0' * (at - f.tell()))
+            f.write(section)
+
+    return len(names), duplicates
+
+def _align(position, alignment=8):
+    return (position + alignment - 1) // alignment * alignment
@@ -1,10 +1,71 @@
+import os
+import threading
 from config import Config
+from services.food_resolver import FoodResolver, FOOD_ALIASES
+from services.nutrition_catalog import NutritionCatalog
 
 class NutritionService:
     """Service for nutrition data - uses custom database for your foods"""
     
+    DEFAULT_NUTRITION = {
+        'calories': 200,
+        'protein': 8,
+        'carbs': 25,
+        'fat': 8,
+        'sugar': 5,
+        'fiber': 2,
+        'sodium': 300,
+        'serving_size': '100g'
+    }
+    
+    DEFAULT_ALTERNATIVES = ['Grilled vegetables', 'Fresh salad', 'Lean protein with quinoa']
+    
     def __init__(self):
         self.fallback_data = self._load_fallback_data()
+        self.alternatives_map = self._load_alternatives()
+        self.resolver = FoodResolver(self.fallback_data, aliases=FOOD_ALIASES)
+        self.alternatives_resolver = FoodResolver(self.alternatives_map, aliases=FOOD_ALIASES)
+        self._catalog_stat = None
+        self._catalog_index = None  # (catalog, FoodResolver over its names), built on first fuzzy lookup
+        self._catalog_lock = threading.Lock()
+        self.catalog = self._open_catalog(Config.NUTRITION_CATALOG_PATH)
+    
+    def _open_catalog(self, path):
+        """Memory-map the compiled nutrition catalog if one has been built"""
+        self._catalog_stat = self._stat(path)
+        if self._catalog_stat is None:
+            return None
+        try:
+            catalog = NutritionCatalog(path)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Could not open nutrition catalog {path}: {e}")
+            return None
+        print(f"✅ Loaded nutrition catalog with {len(catalog)} foods")
+        return catalog
+    
+    @staticmethod
+    def _stat(path):
+        try:
+            st = os.stat(path)
+        except (OSError, TypeError):
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+    
+    def refresh_catalog(self):
+        """Re-open the catalog if build-catalog replaced the file, returns True if it changed"""
+        if self._stat(Config.NUTRITION_CATALOG_PATH) == self._catalog_stat:
+            return False
+        # Readers holding the old catalog keep their (still valid) mapping
+        self.catalog = self._open_catalog(Config.NUTRITION_CATALOG_PATH)
+        return True
+    
+    def _catalog_resolver(self, catalog):
+        """FoodResolver over the catalog's names (indexed once per catalog file, when first needed)"""
+        with self._catalog_lock:
+            if self._catalog_index is None or self._catalog_index[0] is not catalog:
+                names = (catalog.name(row) for row in range(len(catalog)))
+                self._catalog_index = (catalog, FoodResolver(names, aliases=FOOD_ALIASES))
+            return self._catalog_index[1]
     
     def _load_fallback_data(self):
         """Load fallback nutrition data for common foods"""
@@ -211,40 +272,9 @@ class NutritionService:
             }
         }
     
-    def get_nutrition_data(self, food_name):
-        """Get nutrition data for a food item"""
-        # Normalize food name
-        food_key = food_name.lower().strip()
-        
-        # PRIORITY 1: Try exact match in your custom database
-        if food_key in self.fallback_data:
-            print(f"✅ Found nutrition data for: {food_name}")
-            return self.fallback_data[food_key]
-        
-        # PRIORITY 2: Try partial match
-        for key, data in self.fallback_data.items():
-            if key in food_key or food_key in key:
-                print(f"✅ Found partial match: {key}")
-                return data
-        
-        # PRIORITY 3: Return generic data as last resort
-        print(f"⚠️ No nutrition data found for '{food_name}', using generic values")
-        print(f"💡 Run 'python auto_nutrition.py' to add nutrition data for your foods")
+    def _load_alternatives(self):
+        """Healthier swaps for common foods"""
         return {
-            'calories': 200,
-            'protein': 8,
-            'carbs': 25,
-            'fat': 8,
-            'sugar': 5,
-            'fiber': 2,
-            'sodium': 300,
-            'serving_size': '100g'
-        }
-    
-    
-    def get_healthier_alternatives(self, food_name):
-        """Get healthier alternatives for a food item"""
-        alternatives_map = {
             'pizza': ['Whole wheat veggie pizza', 'Cauliflower crust pizza', 'Grilled chicken salad'],
             'hamburger': ['Turkey burger', 'Veggie burger', 'Grilled chicken sandwich'],
             'french fries': ['Baked sweet potato fries', 'Air-fried vegetables', 'Roasted chickpeas'],
@@ -258,20 +288,39 @@ class NutritionService:
             'pancakes': ['Whole wheat pancakes', 'Oatmeal pancakes', 'Protein pancakes'],
             'waffles': ['Whole grain waffles', 'Oat waffles with fruit', 'Protein waffles']
         }
+    
+    def get_nutrition_data(self, food_name):
+        """
+        Get nutrition data for a food item (generic values if it is unknown).
+        Order: exact name or alias in the catalog, then in the built-in table,
+        then fuzzy match on the catalog, then on the built-in table.
+        """
+        catalog = self.catalog
+        if catalog is not None:
+            data = catalog.get(food_name)
+            if data is None:
+                alias = FOOD_ALIASES.get(FoodResolver.normalize(food_name))
+                data = alias and catalog.get(alias)
+            if data:
+                return data
         
-        food_key = food_name.lower().strip()
-        
-        # Try exact match
-        if food_key in alternatives_map:
-            return alternatives_map[food_key]
-        
-        # Try partial match
-        for key, alternatives in alternatives_map.items():
-            if key in food_key or food_key in key:
-                return alternatives
+        food_key = self.resolver.resolve_exact(food_name)
+        if food_key is None and catalog is not None:
+            catalog_name = self._catalog_resolver(catalog).resolve(food_name)
+            if catalog_name is not None:
+                return catalog.get(catalog_name)
         
-        # Default alternatives
-        return ['Grilled vegetables', 'Fresh salad', 'Lean protein with quinoa']
+        food_key = food_key or self.resolver.resolve(food_name)
+        if food_key is None:
+            return dict(self.DEFAULT_NUTRITION)
+        return self.fallback_data[food_key]
+    
+    def get_healthier_alternatives(self, food_name):
+        """Get healthier alternatives for a food item"""
+        food_key = self.alternatives_resolver.resolve(food_name)
+        if food_key is None:
+            return list(self.DEFAULT_ALTERNATIVES)
+        return self.alternatives_map[food_key]
 
 # Global instance
 nutrition_service = NutritionService()
@@ -0,0 +1,168 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+import bcrypt
+from config import Config
+
+class PasswordHasherBusy(Exception):
+    """Raised when a password hash cannot be computed in time (pool saturated or timed out)"""
+    pass
+
+class PasswordHasher:
+    """
+    bcrypt hashing and verification on a dedicated, bounded thread pool.
+    bcrypt releases the GIL, so a login burst queues here instead of holding
+    request threads; beyond max_pending outstanding hashes callers get
+    PasswordHasherBusy right away, and waits are capped at timeout seconds.
+    """
+
+    def __init__(self, workers, max_pending, timeout, rounds):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.rounds = rounds
+        self._pending = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._executor_pid = None
+        self._stats = {
+            'hashed': 0,
+            'verified': 0,
+            'rehashed': 0,
+            'rejected_busy': 0,
+            'timed_out': 0,
+            'work_seconds': 0.0
+        }
+
+    def hash(self, password):
+        """bcrypt hash of password at the configured cost"""
+        return self._wait(self.submit_hash(password))
+
+    def verify(self, password, hashed):
+        """True if password matches the stored hash"""
+        return self._wait(self.submit_verify(password, hashed))
+
+    def submit_hash(self, password, rehash=False):
+        """Future of hash() without waiting for it (wait with wait_async() from asyncio code)"""
+        names = ('hashed', 'rehashed') if rehash else ('hashed',)
+        return self._submit(names, self._hash, password.encode('utf-8'), self.rounds)
+
+    def submit_verify(self, password, hashed):
+        """Future of verify() without waiting for it"""
+        return self._submit(('verified',), bcrypt.checkpw, password.encode('utf-8'), hashed.encode('utf-8'))
+
+    async def wait_async(self, future):
+        """Await a submitted hash or check from asyncio code, with the same timeout"""
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            self._count('timed_out')
+            raise PasswordHasherBusy('Password check timed out, try again shortly')
+
+    def needs_rehash(self, hashed):
+        """True if hashed was made with a different cost than the configured one"""
+        return self.cost_of(hashed) != self.rounds
+
+    def rehash(self, password):
+        """hash() for upgrading a stored hash to the configured cost"""
+        return self._wait(self.submit_hash(password, rehash=True))
+
+    @staticmethod
+    def cost_of(hashed):
+        """Work factor of a '$2b$12$...' hash, None if it is not a bcrypt hash"""
+        parts = hashed.split('$')
+        try:
+            return int(parts[2])
+        except (IndexError, ValueError):
+            return None
+
+    @staticmethod
+    def _hash(password, rounds):
+        return bcrypt.hashpw(password, bcrypt.gensalt(rounds)).decode('utf-8')
+
+    def _submit(self, names, fn, *args):
+        if not self._pending.acquire(blocking=False):
+            self._count('rejected_busy')
+            raise PasswordHasherBusy('Too many logins in progress, try again shortly')
+
+        try:
+            future = self._get_executor().submit(self._timed, names, fn, *args)
+        except Exception:
+            self._pending.release()
+            raise
+        # The slot is held until the hash finishes, even if the caller stops waiting
+        future.add_done_callback(lambda _: self._pending.release())
+        return future
+
+    def _wait(self, future):
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            self._count('timed_out')
+            raise PasswordHasherBusy('Password check timed out, try again shortly')
+
+    def _timed(self, names, fn, *args):
+        started = time.perf_counter()
+        result = fn(*args)
+        with self._lock:
+            for name in names:
+                self._stats[name] += 1
+            self._stats['work_seconds'] += time.perf_counter() - started
+        return result
+
+    def _get_executor(self):
+        """Thread pool for this process (recreated after a fork)"""
+        if self._executor_pid != os.getpid():
+            with self._lock:
+                if self._executor_pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='password-hasher')
+                    self._executor_pid = os.getpid()
+        return self._executor
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        work_seconds = stats.pop('work_seconds')
+        done = stats['hashed'] + stats['verified']
+        return dict(
+            stats,
+            rounds=self.rounds,
+            workers=self.workers,
+            max_pending=self.max_pending,
+            avg_ms=round(work_seconds / done * 1000, 2) if done else 0
+        )
+
+def calibrate(target_ms, min_rounds=4, max_rounds=16, samples=3):
+    """
+    Time bcrypt on this host from min_rounds upwards. Returns (rounds, timings):
+    the highest cost whose median hash time stays within target_ms (at least
+    min_rounds), and {rounds: median ms} for every cost measured.
+    """
+    timings = {}
+    best = min_rounds
+    for rounds in range(min_rounds, max_rounds + 1):
+        durations = []
+        for _ in range(samples):
+            started = time.perf_counter()
+            bcrypt.hashpw(b'calibration-password', bcrypt.gensalt(rounds))
+            durations.append((time.perf_counter() - started) * 1000)
+        timings[rounds] = round(sorted(durations)[len(durations) // 2], 1)
+
+        if timings[rounds] > target_ms:
+            break
+        best = rounds
+    return best, timings
+
+# Global instance
+password_hasher = PasswordHasher(
+    workers=Config.PASSWORD_HASH_WORKERS,
+    max_pending=Config.PASSWORD_HASH_MAX_PENDING,
+    timeout=Config.PASSWORD_HASH_TIMEOUT,
+    rounds=Config.BCRYPT_ROUNDS
+)
@@ -0,0 +1,193 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+class PredictionCache:
+    """
+    Two-tier cache of prediction results keyed by image content and model version.
+    The memory tier is an LRU bounded by the approximate size of its entries;
+    the optional disk tier stores one JSON file per key and survives restarts.
+    Concurrent lookups for the same key share a single computation.
+    """
+
+    ENTRY_OVERHEAD = 200  # rough bytes per entry for key, OrderedDict node and list objects
+
+    def __init__(self, max_bytes, disk_dir=None):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self._entries = OrderedDict()  # key -> (results, size)
+        self._size = 0
+        self._inflight = {}  # key -> Future shared by concurrent callers
+        self._lock = threading.Lock()
+        self._stats = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'coalesced': 0,
+            'evictions': 0,
+            'disk_errors': 0
+        }
+
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(image_bytes, model_version):
+        """Cache key for an uploaded image under a given model/labels version"""
+        return f"{model_version}-{hashlib.sha256(image_bytes).hexdigest()}"
+
+    def get_or_compute(self, key, compute):
+        """
+        Return cached results for key, computing them at most once.
+        Results of None are passed through but never cached.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._stats['memory_hits'] += 1
+                return self._copy(entry[0])
+
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+            else:
+                self._stats['coalesced'] += 1
+
+        if not owner:
+            return self._copy(future.result())
+
+        try:
+            results = self._disk_get(key)
+            if results is not None:
+                self._count('disk_hits')
+            else:
+                self._count('misses')
+                results = compute()
+                if results is not None:
+                    self._disk_put(key, results)
+
+            if results is not None:
+                self._memory_put(key, results)
+            future.set_result(results)
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+        return self._copy(results)
+
+    def get(self, key):
+        """Cached results for key (memory, then disk), or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._stats['memory_hits'] += 1
+                return self._copy(entry[0])
+
+        results = self._disk_get(key)
+        if results is None:
+            self._count('misses')
+            return None
+        self._count('disk_hits')
+        self._memory_put(key, results)
+        return self._copy(results)
+
+    def put(self, key, results):
+        """Store results computed outside get_or_compute() (e.g. by a batch)"""
+        if results is not None:
+            self._disk_put(key, results)
+            self._memory_put(key, results)
+
+    def _memory_put(self, key, results):
+        """Insert into the LRU, evicting least recently used entries over max_bytes"""
+        size = len(json.dumps(results)) + len(key) + self.ENTRY_OVERHEAD
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= previous[1]
+
+            self._entries[key] = (results, size)
+            self._size += size
+
+            while self._size > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._size -= evicted_size
+                self._stats['evictions'] += 1
+
+    def _disk_path(self, key):
+        """Disk tier location, sharded by the first two hex digits of the image hash"""
+        version, digest = key.split('-', 1)
+        return os.path.join(self.disk_dir, version, digest[:2], f"{digest}.json")
+
+    def _disk_get(self, key):
+        if not self.disk_dir:
+            return None
+
+        path = self._disk_path(key)
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Prediction cache read failed for {path}: {e}")
+            self._count('disk_errors')
+            return None
+
+    def _disk_put(self, key, results):
+        if not self.disk_dir:
+            return
+
+        path = self._disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write then rename so readers never see a partial file
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(results, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"⚠️ Prediction cache write failed for {path}: {e}")
+            self._count('disk_errors')
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    @staticmethod
+    def _copy(results):
+        """Hand out copies so callers cannot mutate cached entries"""
+        if results is None:
+            return None
+        return [dict(result) for result in results]
+
+    def clear(self):
+        """Drop the memory tier (the disk tier is versioned and left in place)"""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def get_stats(self):
+        """Hit/miss counters and memory usage"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+            stats['memory_bytes'] = self._size
+
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses'] + stats['coalesced']
+        stats['max_bytes'] = self.max_bytes
+        stats['disk_enabled'] = bool(self.disk_dir)
+        stats['hit_rate'] = round((lookups - stats['misses']) / lookups, 4) if lookups else 0
+        return stats
@@ -0,0 +1,155 @@
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from config import Config
+
+class JobQueueFull(Exception):
+    """Raised when too many scan jobs are queued or running"""
+    pass
+
+class ScanJobManager:
+    """
+    Runs scan jobs on a local thread pool and keeps their state in the
+    'scan_jobs' collection, so any web worker can answer polls and event
+    streams for a job another worker is running. At most max_pending jobs
+    may be queued or running at once per process; job documents expire
+    ttl_seconds after their last change (TTL index).
+    """
+
+    TERMINAL_STATES = ('succeeded', 'failed')
+
+    def __init__(self, max_workers, max_pending, ttl_seconds, poll_seconds):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.ttl_seconds = ttl_seconds
+        self.poll_seconds = poll_seconds
+        self._active = 0
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)  # wakes waiters for jobs run by this process
+        self._executor = None
+        self._executor_pid = None
+
+    def submit(self, db, user_id, fn, *args):
+        """
+        Queue fn(*args) for user_id and return the job id.
+        fn must return (response body, HTTP status code).
+        """
+        with self._lock:
+            if self._active >= self.max_pending:
+                raise JobQueueFull('Too many scans in progress, try again shortly')
+            self._active += 1
+
+        job_id = uuid.uuid4().hex
+        now = datetime.utcnow()
+        try:
+            db.scan_jobs.insert_one({
+                '_id': job_id,
+                'user_id': str(user_id),
+                'status': 'queued',
+                'status_code': None,
+                'result': None,
+                'created_at': now,
+                'updated_at': now,
+                'expires_at': now + timedelta(seconds=self.ttl_seconds),
+                'version': 0
+            })
+            self._get_executor().submit(self._run, db, job_id, fn, args)
+        except Exception:
+            with self._lock:
+                self._active -= 1
+            raise
+        return job_id
+
+    def _get_executor(self):
+        """Thread pool for this process (recreated after a fork)"""
+        if self._executor_pid != os.getpid():
+            with self._lock:
+                if self._executor_pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='scan-job')
+                    self._executor_pid = os.getpid()
+        return self._executor
+
+    def _run(self, db, job_id, fn, args):
+        try:
+            self._update(db, job_id, status='running')
+            try:
+                body, status_code = fn(*args)
+            except Exception as e:
+                body, status_code = {'error': str(e)}, 500
+
+            self._update(
+                db,
+                job_id,
+                status='succeeded' if status_code < 400 else 'failed',
+                status_code=status_code,
+                result=body
+            )
+        finally:
+            with self._changed:
+                self._active -= 1
+                self._changed.notify_all()
+
+    def _update(self, db, job_id, **fields):
+        now = datetime.utcnow()
+        db.scan_jobs.update_one(
+            {'_id': job_id},
+            {
+                '$set': dict(fields, updated_at=now, expires_at=now + timedelta(seconds=self.ttl_seconds)),
+                '$inc': {'version': 1}
+            }
+        )
+        with self._changed:
+            self._changed.notify_all()
+
+    def get(self, db, job_id, user_id):
+        """Snapshot of a job owned by user_id, or None"""
+        job = db.scan_jobs.find_one({'_id': job_id, 'user_id': str(user_id)})
+        if job is None or job['expires_at'] <= datetime.utcnow():
+            return None  # the TTL monitor only runs every minute
+        job['job_id'] = job.pop('_id')
+        return job
+
+    def wait_for_change(self, db, job_id, user_id, version, timeout):
+        """
+        Block until the job's version differs from version (or timeout), return a snapshot.
+        Jobs run by this process wake the waiter at once, others are polled every poll_seconds.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            job = self.get(db, job_id, user_id)
+            remaining = deadline - time.monotonic()
+            if job is None or job['version'] != version or remaining <= 0:
+                return job
+            with self._changed:
+                self._changed.wait(min(self.poll_seconds, remaining))
+
+    @staticmethod
+    def serialize(job):
+        """Serialize a job snapshot for JSON response"""
+        return {
+            'job_id': job['job_id'],
+            'status': job['status'],
+            'status_code': job['status_code'],
+            'result': job['result'],
+            'created_at': job['created_at'].isoformat(),
+            'updated_at': job['updated_at'].isoformat()
+        }
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'active': self._active,
+                'max_pending': self.max_pending,
+                'workers': self.max_workers
+            }
+
+# Global instance
+scan_jobs = ScanJobManager(
+    max_workers=Config.SCAN_JOB_WORKERS,
+    max_pending=Config.SCAN_JOB_MAX_PENDING,
+    ttl_seconds=Config.SCAN_JOB_TTL_SECONDS,
+    poll_seconds=Config.SCAN_JOB_POLL_SECONDS
+)
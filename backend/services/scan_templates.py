@@ -0,0 +1,145 @@
+import threading
+import time
+from collections import OrderedDict
+from config import Config
+from services.food_resolver import FoodResolver
+from services.nutrition_service import nutrition_service
+from services.health_scorer import health_scorer
+
+class FrozenDict(dict):
+    """dict that refuses modification (still a dict for jsonify and BSON encoding)"""
+
+    def _immutable(self, *args, **kwargs):
+        raise TypeError('Scan templates are shared and cannot be modified')
+
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = _immutable
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+def freeze(value):
+    """Recursively turn dicts into FrozenDicts and lists into tuples"""
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+class ScanTemplateStore:
+    """
+    Per-food scan results that do not depend on the user or the image:
+    nutrition, health score (with reasons and recommendations) and alternatives.
+
+    Templates are keyed by normalized food name, which is all the underlying
+    lookups depend on. Model labels are built eagerly by prebuild(); any other
+    name (e.g. further catalog foods) is built on first use and kept in an LRU
+    of max_entries. Everything is dropped and the labels rebuilt when the
+    scoring thresholds or the nutrition catalog change.
+    """
+
+    def __init__(self, max_entries, check_seconds):
+        self.max_entries = max_entries
+        self.check_seconds = check_seconds
+        self._labels = {}  # normalized label -> template, never evicted
+        self._others = OrderedDict()
+        self._label_names = []
+        self._lock = threading.Lock()
+        self._fingerprint = self._current_fingerprint()
+        self._checked_at = time.monotonic()
+        self._stats = {'hits': 0, 'misses': 0, 'rebuilds': 0}
+
+    def _current_fingerprint(self):
+        """Everything besides the food name that a template depends on"""
+        catalog = nutrition_service.catalog
+        return (
+            tuple(sorted(health_scorer.healthy_thresholds.items())),
+            tuple(sorted(health_scorer.moderate_thresholds.items())),
+            catalog.version if catalog is not None else None
+        )
+
+    def _check_fingerprint(self):
+        now = time.monotonic()
+        if now - self._checked_at < self.check_seconds:
+            return
+        self._checked_at = now
+
+        nutrition_service.refresh_catalog()
+        fingerprint = self._current_fingerprint()
+        if fingerprint == self._fingerprint:
+            return
+
+        print("🔄 Scoring thresholds or nutrition catalog changed, rebuilding scan templates")
+        with self._lock:
+            self._fingerprint = fingerprint
+            self._others.clear()
+            self._labels = self._build_labels(self._label_names)
+            self._stats['rebuilds'] += 1
+
+    @staticmethod
+    def build(food_name):
+        """Compute the template for one food (what the scan path used to do per request)"""
+        nutrition_data = nutrition_service.get_nutrition_data(food_name)
+        return freeze({
+            'nutrition': nutrition_data,
+            'health_score': health_scorer.calculate_score(nutrition_data),
+            'alternatives': nutrition_service.get_healthier_alternatives(food_name)
+        })
+
+    def _build_labels(self, labels):
+        return {FoodResolver.normalize(label): self.build(label) for label in labels}
+
+    def prebuild(self, labels):
+        """Build templates for every model label up front"""
+        templates = self._build_labels(labels)
+        with self._lock:
+            self._label_names = list(labels)
+            self._labels = templates
+        print(f"✅ Precomputed scan templates for {len(templates)} labels")
+
+    def prebuild_when_ready(self, ml_service):
+        """Prebuild the model's labels in the background once they are loaded"""
+        def run():
+            while ml_service.state in ('not_started', 'loading'):
+                ml_service.wait_until_ready(1)
+            self.prebuild(ml_service.labels)
+
+        threading.Thread(target=run, name='scan-templates', daemon=True).start()
+
+    def get(self, food_name):
+        """Template for food_name: {'nutrition', 'health_score', 'alternatives'}"""
+        self._check_fingerprint()
+        key = FoodResolver.normalize(food_name)
+
+        with self._lock:
+            template = self._labels.get(key)
+            if template is None:
+                template = self._others.get(key)
+                if template is not None:
+                    self._others.move_to_end(key)
+            if template is not None:
+                self._stats['hits'] += 1
+                return template
+            fingerprint = self._fingerprint
+
+        template = self.build(food_name)
+        with self._lock:
+            self._stats['misses'] += 1
+            if fingerprint != self._fingerprint:
+                return template  # built against settings that have since changed, don't keep it
+            self._others[key] = template
+            while len(self._others) > self.max_entries:
+                self._others.popitem(last=False)
+        return template
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self._stats, labels=len(self._labels), others=len(self._others))
+
+# Global instance
+scan_templates = ScanTemplateStore(
+    max_entries=Config.SCAN_TEMPLATE_MAX_ENTRIES,
+    check_seconds=Config.SCAN_TEMPLATE_CHECK_SECONDS
+)
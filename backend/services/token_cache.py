@@ -0,0 +1,85 @@
+import threading
+import time
+from collections import OrderedDict
+from config import Config
+
+class TokenCache:
+    """
+    LRU of JWTs whose signature has already been verified, so repeated
+    requests from a session skip jwt.decode. Each entry keeps the token's
+    exp claim and is dropped once it passes; tokens without exp are never
+    cached. Also keeps the auth timing counters for the metrics endpoint.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # token -> (user_id, exp)
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'rejected': 0,
+            'expired': 0,
+            'evictions': 0,
+            'hit_seconds': 0.0,
+            'miss_seconds': 0.0
+        }
+
+    def get(self, token):
+        """user_id of a cached, unexpired token, or None"""
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            if entry[1] <= time.time():
+                del self._entries[token]
+                self._stats['expired'] += 1
+                return None
+            self._entries.move_to_end(token)
+            return entry[0]
+
+    def put(self, token, user_id, exp):
+        """Remember a verified token until its exp (a POSIX timestamp)"""
+        if not self.max_entries or not isinstance(exp, (int, float)):
+            return
+        with self._lock:
+            self._entries[token] = (user_id, exp)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def observe(self, outcome, seconds):
+        """Count one verification: outcome is 'hit', 'miss' (verified) or 'rejected'"""
+        with self._lock:
+            if outcome == 'hit':
+                self._stats['hits'] += 1
+                self._stats['hit_seconds'] += seconds
+            else:
+                self._stats['misses' if outcome == 'miss' else 'rejected'] += 1
+                self._stats['miss_seconds'] += seconds
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            size = len(self._entries)
+
+        hits = stats.pop('hits')
+        verified = stats['misses'] + stats['rejected']
+        hit_seconds, miss_seconds = stats.pop('hit_seconds'), stats.pop('miss_seconds')
+        return {
+            'hits': hits,
+            **stats,
+            'entries': size,
+            'max_entries': self.max_entries,
+            'hit_rate': round(hits / (hits + verified), 4) if hits + verified else 0,
+            'avg_hit_ms': round(hit_seconds / hits * 1000, 4) if hits else 0,
+            'avg_verify_ms': round(miss_seconds / verified * 1000, 4) if verified else 0
+        }
+
+# Global instance
+token_cache = TokenCache(max_entries=Config.TOKEN_CACHE_MAX_ENTRIES)
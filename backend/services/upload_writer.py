@@ -0,0 +1,98 @@
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from config import Config
+
+class UploadStorageError(Exception):
+    """Raised when an upload cannot be stored (disk full or write error)"""
+    pass
+
+class UploadWriter:
+    """
+    Persists uploaded images off the request path.
+    Writes run on a small thread pool; when more than max_pending writes are
+    outstanding the caller writes synchronously instead, so memory held by
+    queued uploads stays bounded.
+    """
+
+    def __init__(self, workers, max_pending, min_free_bytes):
+        self.workers = workers
+        self.min_free_bytes = min_free_bytes
+        self._pending = threading.BoundedSemaphore(max_pending)
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._executor = None
+        self._executor_pid = None
+        self._stats = {
+            'written': 0,
+            'bytes_written': 0,
+            'failed': 0,
+            'synchronous': 0,
+            'rejected_disk_full': 0
+        }
+
+    def check_space(self, store, size):
+        """Fail fast (before any work is done) if the upload would not fit in the store"""
+        try:
+            store.check_space(size, self.min_free_bytes)
+        except OSError as e:
+            self._count('rejected_disk_full')
+            raise UploadStorageError(str(e))
+
+    def submit(self, store, key, data):
+        """Put data into the blob store in the background, returns a Future (exception set on failure)"""
+        if not self._pending.acquire(blocking=False):
+            # Too many writes in flight: apply backpressure by writing inline
+            self._count('synchronous')
+            future = Future()
+            try:
+                self._write(store, key, data)
+                future.set_result(key)
+            except UploadStorageError as e:
+                future.set_exception(e)
+            return future
+
+        try:
+            future = self._get_executor().submit(self._write, store, key, data)
+        except Exception:
+            self._pending.release()
+            raise
+        future.add_done_callback(lambda _: self._pending.release())
+        return future
+
+    def _get_executor(self):
+        """Thread pool for this process (recreated after a fork)"""
+        if self._executor_pid != os.getpid():
+            with self._lock:
+                if self._executor_pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='upload-writer')
+                    self._executor_pid = os.getpid()
+        return self._executor
+
+    def _write(self, store, key, data):
+        try:
+            store.put(key, data)
+        except Exception as e:
+            self._count('failed')
+            print(f"❌ Failed to save upload {key}: {e}")
+            raise UploadStorageError(f'Could not save image: {getattr(e, "strerror", None) or e}')
+
+        with self._lock:
+            self._stats['written'] += 1
+            self._stats['bytes_written'] += len(data)
+        return key
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self._stats, max_pending=self.max_pending)
+
+# Global instance
+upload_writer = UploadWriter(
+    workers=Config.UPLOAD_WRITER_THREADS,
+    max_pending=Config.UPLOAD_WRITER_MAX_PENDING,
+    min_free_bytes=Config.UPLOAD_MIN_FREE_BYTES
+)
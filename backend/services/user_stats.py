@@ -0,0 +1,168 @@
+from datetime import datetime
+from pymongo import UpdateOne, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from models.scan_history import STATUS_EXPR
+
+STATUSES = ('healthy', 'moderate', 'unhealthy')
+
+class UserStats:
+    """
+    Per-user scan counters in the 'user_stats' collection (one document per
+    user, _id = user id), kept current with $inc as scans are added or deleted.
+
+    Counters are only incremented once the document exists. A missing document
+    is rebuilt from scan_history on first read, so users whose scans predate
+    the collection are backfilled lazily; rebuild() repairs any drift. Every
+    increment also bumps 'version', which lets the backfill tell whether a
+    recount raced with an update.
+    """
+
+    BACKFILL_RECOUNTS = 3  # attempts to settle a backfill that raced with new scans
+
+    @staticmethod
+    def _increments(status, delta):
+        inc = {'total_scans': delta}
+        if status in STATUSES:
+            inc[f'{status}_count'] = delta
+        return inc
+
+    def record_scan(self, db, user_id, status):
+        """Count a newly inserted scan"""
+        db.user_stats.update_one({'_id': user_id}, {'$inc': dict(self._increments(status, 1), version=1)})
+
+    def record_scans(self, db, user_id, statuses):
+        """Count several newly inserted scans of one user in a single update"""
+        inc = {}
+        for status in statuses:
+            for field, delta in self._increments(status, 1).items():
+                inc[field] = inc.get(field, 0) + delta
+        if inc:
+            db.user_stats.update_one({'_id': user_id}, {'$inc': dict(inc, version=1)})
+
+    def record_delete(self, db, user_id, status):
+        """Uncount a deleted scan"""
+        db.user_stats.update_one({'_id': user_id}, {'$inc': dict(self._increments(status, -1), version=1)})
+
+    def get(self, db, user_id):
+        """Counters for user_id, computing them from scan_history the first time"""
+        stats = db.user_stats.find_one({'_id': user_id})
+        if stats is not None:
+            return stats
+
+        stats = dict(self._count_user(db, user_id), _id=user_id, version=0)
+        try:
+            db.user_stats.insert_one(stats)
+        except DuplicateKeyError:
+            # Another request backfilled first; its document is just as good
+            return db.user_stats.find_one({'_id': user_id})
+
+        # A scan stored between the count and the insert found no document to $inc:
+        # count again until the document matches a count no update raced with
+        for _ in range(self.BACKFILL_RECOUNTS):
+            counts = self._count_user(db, user_id)
+            if self._matches(stats, counts):
+                break
+            stats = db.user_stats.find_one_and_update(
+                {'_id': user_id, 'version': stats['version']},
+                {'$set': counts},
+                return_document=ReturnDocument.AFTER
+            ) or db.user_stats.find_one({'_id': user_id})
+            if stats is None:
+                return dict(counts, _id=user_id)
+        return stats
+
+    async def get_async(self, db, user_id):
+        """get() on an async (Motor) database"""
+        stats = await db.user_stats.find_one({'_id': user_id})
+        if stats is not None:
+            return stats
+
+        stats = dict(await self._count_user_async(db, user_id), _id=user_id, version=0)
+        try:
+            await db.user_stats.insert_one(stats)
+        except DuplicateKeyError:
+            return await db.user_stats.find_one({'_id': user_id})
+
+        for _ in range(self.BACKFILL_RECOUNTS):
+            counts = await self._count_user_async(db, user_id)
+            if self._matches(stats, counts):
+                break
+            stats = await db.user_stats.find_one_and_update(
+                {'_id': user_id, 'version': stats['version']},
+                {'$set': counts},
+                return_document=ReturnDocument.AFTER
+            ) or await db.user_stats.find_one({'_id': user_id})
+            if stats is None:
+                return dict(counts, _id=user_id)
+        return stats
+
+    def rebuild(self, db, user_id=None, batch_size=1000):
+        """Recompute counters from scan_history for one user or everyone, returns users written"""
+        match = {'user_id': user_id} if user_id is not None else {}
+        rebuilt_at = datetime.utcnow()
+        written = 0
+
+        operations = []
+        for uid, counts in self._count(db, match):
+            operations.append(UpdateOne({'_id': uid}, {'$set': dict(counts, rebuilt_at=rebuilt_at)}, upsert=True))
+            written += 1
+            if len(operations) >= batch_size:
+                db.user_stats.bulk_write(operations, ordered=False)
+                operations = []
+        if operations:
+            db.user_stats.bulk_write(operations, ordered=False)
+
+        # Users without any scans left: drop their document (it is recreated on read)
+        stale = {'rebuilt_at': {'$ne': rebuilt_at}}
+        if user_id is not None:
+            stale['_id'] = user_id
+        db.user_stats.delete_many(stale)
+
+        return written
+
+    @staticmethod
+    def _count_pipeline(match):
+        """Counters per user_id for the scans matching match"""
+        group = {'_id': '$user_id', 'total_scans': {'$sum': 1}}
+        for status in STATUSES:
+            group[f'{status}_count'] = {'$sum': {'$cond': [{'$eq': [STATUS_EXPR, status]}, 1, 0]}}
+        return [{'$match': match}, {'$group': group}]
+
+    def _count(self, db, match):
+        """(user_id, counters) pairs aggregated from scan_history, streamed"""
+        for row in db.scan_history.aggregate(self._count_pipeline(match), allowDiskUse=True):
+            yield row.pop('_id'), row
+
+    def _count_user(self, db, user_id):
+        """Counters of one user aggregated from scan_history"""
+        return next((counts for _, counts in self._count(db, {'user_id': user_id})), None) or self._empty()
+
+    async def _count_user_async(self, db, user_id):
+        rows = await db.scan_history.aggregate(self._count_pipeline({'user_id': user_id})).to_list(1)
+        counts = (rows[0] if rows else None) or self._empty()
+        counts.pop('_id', None)
+        return counts
+
+    @staticmethod
+    def _matches(stats, counts):
+        return all(stats.get(field) == value for field, value in counts.items())
+
+    @staticmethod
+    def _empty():
+        return dict({'total_scans': 0}, **{f'{status}_count': 0 for status in STATUSES})
+
+    @staticmethod
+    def serialize(stats):
+        """Serialize counters for the /user/stats response"""
+        total_scans = stats.get('total_scans', 0)
+        healthy_count = stats.get('healthy_count', 0)
+        return {
+            'total_scans': total_scans,
+            'healthy_count': healthy_count,
+            'moderate_count': stats.get('moderate_count', 0),
+            'unhealthy_count': stats.get('unhealthy_count', 0),
+            'health_percentage': round((healthy_count / total_scans * 100), 1) if total_scans > 0 else 0
+        }
+
+# Global instance
+user_stats = UserStats()
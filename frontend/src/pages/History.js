@@ -1,22 +1,29 @@
 import React, { useState, useEffect } from 'react';
 import { Calendar, Search, Filter } from 'lucide-react';
-import { foodAPI } from '../services/api';
+import { foodAPI, userAPI, getImageUrl } from '../services/api';
 import './History.css';
 
 function History() {
   const [history, setHistory] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [stats, setStats] = useState(null);
+  const [details, setDetails] = useState({});
+  const [expandedId, setExpandedId] = useState(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [searchTerm, setSearchTerm] = useState('');
   const [filterStatus, setFilterStatus] = useState('all');
 
   useEffect(() => {
     fetchHistory();
+    fetchStats();
   }, []);
 
   const fetchHistory = async () => {
     try {
       const response = await foodAPI.getHistory({ limit: 50 });
       setHistory(response.data.history);
+      setNextCursor(response.data.next_cursor);
     } catch (error) {
       console.error('Error fetching history:', error);
     } finally {
@@ -24,6 +31,44 @@ function History() {
     }
   };
 
+  const fetchStats = async () => {
+    try {
+      const response = await userAPI.getStats();
+      setStats(response.data);
+    } catch (error) {
+      console.error('Error fetching stats:', error);
+    }
+  };
+
+  const loadMore = async () => {
+    setLoadingMore(true);
+    try {
+      const response = await foodAPI.getHistory({ limit: 50, cursor: nextCursor });
+      setHistory((previous) => [...previous, ...response.data.history]);
+      setNextCursor(response.data.next_cursor);
+    } catch (error) {
+      console.error('Error fetching history:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  // List rows are summaries; nutrition and analysis are fetched when a row is opened
+  const toggleDetail = async (scanId) => {
+    if (expandedId === scanId) {
+      setExpandedId(null);
+      return;
+    }
+    setExpandedId(scanId);
+    if (details[scanId]) return;
+    try {
+      const response = await foodAPI.getScanDetail(scanId);
+      setDetails((previous) => ({ ...previous, [scanId]: response.data.scan }));
+    } catch (error) {
+      console.error('Error fetching scan detail:', error);
+    }
+  };
+
   const getHealthBadge = (status) => {
     const badges = {
       healthy: { emoji: '✅', text: 'Healthy', class: 'healthy' },
@@ -111,9 +156,21 @@ function History() {
             <div className="history-list">
               {filteredHistory.map((scan) => {
                 const badge = getHealthBadge(scan.health_score?.status);
+                const detail = expandedId === scan.id ? details[scan.id] : null;
                 return (
-                  <div key={scan.id} className="history-item">
+                  <div key={scan.id} className="history-item" onClick={() => toggleDetail(scan.id)}>
                     <div className="history-item-header">
+                      {scan.image_path && (
+                        <img
+                          className="history-item-thumb"
+                          src={getImageUrl(scan.image_path, 'thumb')}
+                          alt={scan.food_name}
+                          width={80}
+                          height={80}
+                          loading="lazy"
+                          decoding="async"
+                        />
+                      )}
                       <div className="history-item-info">
                         <h3>{scan.food_name}</h3>
                         <div className="history-item-meta">
@@ -136,32 +193,36 @@ function History() {
                     </div>
 
                     <div className="history-item-nutrition">
-                      <div className="nutrition-mini-item">
-                        <span className="label">Calories</span>
-                        <span className="value">{scan.nutrition_data?.calories || 0} kcal</span>
-                      </div>
-                      <div className="nutrition-mini-item">
-                        <span className="label">Protein</span>
-                        <span className="value">{scan.nutrition_data?.protein || 0}g</span>
-                      </div>
-                      <div className="nutrition-mini-item">
-                        <span className="label">Carbs</span>
-                        <span className="value">{scan.nutrition_data?.carbs || 0}g</span>
-                      </div>
-                      <div className="nutrition-mini-item">
-                        <span className="label">Fat</span>
-                        <span className="value">{scan.nutrition_data?.fat || 0}g</span>
-                      </div>
+                      {detail && (
+                        <>
+                          <div className="nutrition-mini-item">
+                            <span className="label">Calories</span>
+                            <span className="value">{detail.nutrition_data?.calories || 0} kcal</span>
+                          </div>
+                          <div className="nutrition-mini-item">
+                            <span className="label">Protein</span>
+                            <span className="value">{detail.nutrition_data?.protein || 0}g</span>
+                          </div>
+                          <div className="nutrition-mini-item">
+                            <span className="label">Carbs</span>
+                            <span className="value">{detail.nutrition_data?.carbs || 0}g</span>
+                          </div>
+                          <div className="nutrition-mini-item">
+                            <span className="label">Fat</span>
+                            <span className="value">{detail.nutrition_data?.fat || 0}g</span>
+                          </div>
+                        </>
+                      )}
                       <div className="nutrition-mini-item">
                         <span className="label">Score</span>
                         <span className="value score">{scan.health_score?.score || 0}/100</span>
                       </div>
                     </div>
 
-                    {scan.health_score?.reasons && scan.health_score.reasons.length > 0 && (
+                    {detail?.health_score?.reasons && detail.health_score.reasons.length > 0 && (
                       <div className="history-item-reasons">
                         <strong>Analysis:</strong>{' '}
-                        {scan.health_score.reasons.slice(0, 2).join(', ')}
+                        {detail.health_score.reasons.slice(0, 2).join(', ')}
                       </div>
                     )}
                   </div>
@@ -169,29 +230,35 @@ function History() {
               })}
             </div>
           )}
+
+          {nextCursor && (
+            <button className="history-load-more" onClick={loadMore} disabled={loadingMore}>
+              {loadingMore ? 'Loading...' : 'Load more'}
+            </button>
+          )}
         </div>
 
         <div className="history-stats">
           <div className="stat-box">
             <h4>Total Scans</h4>
-            <p className="stat-number">{history.length}</p>
+            <p className="stat-number">{stats ? stats.total_scans : '-'}</p>
           </div>
           <div className="stat-box">
             <h4>Healthy Foods</h4>
             <p className="stat-number healthy">
-              {history.filter((s) => s.health_score?.status === 'healthy').length}
+              {stats ? stats.healthy_count : '-'}
             </p>
           </div>
           <div className="stat-box">
             <h4>Moderate Foods</h4>
             <p className="stat-number moderate">
-              {history.filter((s) => s.health_score?.status === 'moderate').length}
+              {stats ? stats.moderate_count : '-'}
             </p>
           </div>
           <div className="stat-box">
             <h4>Unhealthy Foods</h4>
             <p className="stat-number unhealthy">
-              {history.filter((s) => s.health_score?.status === 'unhealthy').length}
+              {stats ? stats.unhealthy_count : '-'}
             </p>
           </div>
         </div>
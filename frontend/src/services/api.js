@@ -55,12 +55,27 @@ export const foodAPI = {
       },
     });
   },
+  // Several images in one request: append each file to formData as 'images'
+  scanFoodBatch: (formData) => {
+    return api.post('/food/scan/batch', formData, {
+      headers: {
+        'Content-Type': 'multipart/form-data',
+      },
+    });
+  },
   getHistory: (params) => api.get('/food/history', { params }),
   getScanDetail: (scanId) => api.get(`/food/history/${scanId}`),
   getInsights: (period) => api.get('/food/insights', { params: { period } }),
   compareFoods: (data) => api.post('/food/compare', data),
 };
 
+// URL of a scan's stored image; size is 'thumb' or 'medium' (omit for the original)
+export const getImageUrl = (imagePath, size) => {
+  if (!imagePath) return null;
+  const filename = encodeURIComponent(imagePath.split('/').pop());
+  return `${API_BASE_URL}/food/uploads/${filename}${size ? `?size=${size}` : ''}`;
+};
+
 // User APIs
 export const userAPI = {
   getStats: () => api.get('/user/stats'),